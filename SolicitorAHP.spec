@@ -13,7 +13,7 @@ hiddenimports = kivy_deps_all['hiddenimports'] + kivy_factory_modules
 a = Analysis(['main.py'],
              pathex=[],
              binaries=[],
-             datas=[("layout.kv", ".")],
+             datas=[("layout.kv", "."), ("popups.kv", ".")],
              hiddenimports=[],
              hookspath=[],
              hooksconfig={},
@@ -1,4 +1,5 @@
 from ahp.node import Node
 from ahp.alternative import Alternative
+from ahp.registry import AlternativeRegistry
 from ahp.criterion import Criterion
 from ahp.ahp import AHP
@@ -1,50 +1,149 @@
+import os
 import xml.etree.ElementTree as ET
-from . import Criterion
+from . import Criterion, AlternativeRegistry
+from . import stats
+from .snapshot import ModelSnapshot
+from .journal import Journal
+from . import export
+from .events import ALTERNATIVES_CHANGED, STRUCTURE_CHANGED
 
 
 class AHP:
     """Acts as an interface for interacting with the AHP tree """
 
-    def __init__(self, filename):
+    @stats.timed("load")
+    def __init__(self, filename, journal=False):
+        """ journal=True replays the journal of the xml file and saves the changes to it, see journal.py """
         try:
-            self.tree = ET.parse(filename)
-            root = self.tree.getroot()
-        except (FileNotFoundError, ET.ParseError) as e:
+            tree = ET.parse(filename)
+            self._build(tree, filename)
+        except (FileNotFoundError, ET.ParseError, ValueError) as e:
             raise ValueError("Exception while creating AHP object:" + str(e))
+        self.journal = None
+        if journal:
+            assert isinstance(filename, str), "Only a model loaded from a file can have a journal"
+            self.journal = Journal(self)
+
+    def _build(self, tree, filename):
+        self.tree = tree
+        root = tree.getroot()
         self.filename = filename
-        self.alternatives = []  # alist of alternatives' names
-        # the actual root of the tree
-        self.root_criterion = Criterion(root.find('./criterion'), root, None)  # root criterion has no parent
-        for alt_node in root.find('alternatives'):
-            self.alternatives.append(alt_node.get('name'))
-
-    def save_to_file(self, filename):
-        self.root_criterion._save_decision_matrices(self.tree.find('data'))
+        # saved with compact matrix nodes if it was loaded from them, see Criterion.create_matrix_node_at
+        self.compact = root.find('./data/matrix/triangle') is not None
+        # the alternatives shared by all final criteria, iterates over the names
+        self.alternatives = AlternativeRegistry.from_node(root.find('alternatives'))
+        # the actual root of the tree, root criterion has no parent
+        self.root_criterion = Criterion(root.find('./criterion'), root, None, self.alternatives)
+        self.events = self.root_criterion.events
+
+    @classmethod
+    def from_tree(cls, tree, filename=None):
+        """ model of an xml tree, e.g. one built in memory """
+        ahp = cls.__new__(cls)
+        ahp._build(tree, filename)
+        ahp.journal = None
+        return ahp
+
+    @classmethod
+    def from_snapshot(cls, snapshot, filename=None, tree=None):
+        """
+        new model in the state of the snapshot, sharing its arrays until they are changed. The xml nodes which are
+        not a part of the model are taken from the tree if given, see ModelSnapshot.to_tree
+        """
+        ahp = cls.__new__(cls)
+        ahp.tree = snapshot.to_tree(tree)
+        ahp.filename = filename
+        ahp.compact = False
+        ahp.alternatives = AlternativeRegistry(snapshot.alternatives)
+        ahp.root_criterion = Criterion.from_state(snapshot.root, ahp.tree.getroot(), None, ahp.alternatives)
+        ahp.events = ahp.root_criterion.events
+        ahp.journal = None
+        return ahp
+
+    def snapshot(self, label=''):
+        """ immutable version of the model, cheap - no arrays are copied, see snapshot.py """
+        return ModelSnapshot(self, label)
+
+    def restore(self, snapshot):
+        """ sets the model to the version of the snapshot, the criteria objects are created again """
+        root = self.tree.getroot()
+        root.remove(root.find('./criterion'))
+        root.remove(root.find('alternatives'))
+        snapshot.criterion_node_at(root)
+        snapshot.alternatives_node_at(root)
+        self.alternatives.reset(snapshot.alternatives)
+        self.root_criterion._restore(snapshot.root)
+        self.events.emit(STRUCTURE_CHANGED, self.root_criterion)
+
+    def fork(self, filename=None):
+        """ independent copy of the model for what-if changes, sharing the unchanged arrays with it """
+        return AHP.from_snapshot(self.snapshot('fork'), filename)
+
+    @stats.timed("save")
+    def save_to_file(self, filename, compact=None):
+        """ compact=True writes each matrix as a single node of its upper triangle, by default as it was loaded """
+        compact = self.compact if compact is None else compact
+        overwrites_journaled = self.journal and os.path.abspath(filename) == os.path.abspath(self.filename)
+        if overwrites_journaled:
+            self.journal.wait()  # a compaction writes the same file
+        self.root_criterion._save_decision_matrices(self.tree.find('data'), compact)
         ET.indent(self.tree, space="\t", level=0)
         with open(filename, 'wb') as f:
             self.tree.write(f)
+        if overwrites_journaled:
+            self.journal.reset()  # all the changes are in the file now
+
+    def save(self):
+        """ appends the changes to the journal if there is one - O(changes), otherwise rewrites the loaded file """
+        if self.journal:
+            self.journal.append()
+        else:
+            self.save_to_file(self.filename)
 
     def set_all_calc_weight_method(self, new_method):
         self.root_criterion.set_all_calc_weight_method(new_method)
 
+    def get_scores_for(self, indices):
+        """ overall scores and names of the alternatives selected by indices or a boolean mask """
+        return self.root_criterion.get_scores_for(indices)
+
+    def get_scores_for_many(self, selections):
+        return self.root_criterion.get_scores_for_many(selections)
+
+    def top_k(self, k):
+        """ scores and names of the k best alternatives overall, best first """
+        return self.root_criterion.top_k(k)
+
+    def export_contributions(self, filename, criterion=None, chunk_size=export.CHUNK):
+        """ writes the scores decomposed by the final criteria and the global weights, .npz or CSV, see export.py """
+        return export.export(criterion or self.root_criterion, filename, chunk_size)
+
+    def consistency_report(self, triad_count=3, workers=None):
+        """ inconsistency of every matrix in the model, workers > 1 calculates it in a process pool """
+        return self.root_criterion.consistency_report(triad_count, workers)
+
     def find_criterion(self, name):
         return self.root_criterion.find_criterion(name)
 
     def add_alternative(self, alt_name):
+        if alt_name in self.alternatives:
+            return False
         alternatives_node = self.tree.find('alternatives')
         new_node = ET.SubElement(alternatives_node, 'alternative')
         new_node.set('name', alt_name)
-        self.alternatives.append(alt_name)
+        self.alternatives.add(alt_name)
         self.root_criterion.add_alternative(alt_name)
+        self.events.emit(ALTERNATIVES_CHANGED, name=alt_name, added=True)
         return True
 
     def remove_alternative(self, name):
         alternatives_node = self.tree.find('alternatives')
         for node in alternatives_node:
             if node.get('name') == name:
-                self.alternatives.remove(name)
+                k = self.alternatives.remove(name)
                 alternatives_node.remove(node)
-                self.root_criterion.remove_alternative(name)
+                self.root_criterion.remove_alternative(name, k)
+                self.events.emit(ALTERNATIVES_CHANGED, name=name, added=False)
                 return True
         else:
             return False
@@ -2,10 +2,11 @@ from . import Node
 
 
 class Alternative(Node):
-    """ represents an alternative node - basically a name holder atm """
+    """ represents an alternative node - basically a name holder atm, shared by all final criteria """
+    __slots__ = ()
 
-    def __init__(self, name, parent):
+    def __init__(self, name, parent=None):
         super().__init__(name, parent)
 
     def __repr__(self):
-        return f"{self.name}: {round(self.weight, 3)} from {self.parent.name}"
+        return f"alternative {self.name}"
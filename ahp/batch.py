@@ -0,0 +1,196 @@
+""" Batch scoring of many model files in a process pool.
+
+python -m ahp.batch "studies/**/*.xml" --output results.csv [--workers 8] [--timeout 60] [--top 10]
+
+Each file is loaded, scored and checked for inconsistency by a worker process, the results are written as soon as
+they arrive - CSV rows of the alternatives' scores, or a JSON line per file (.jsonl output). At most a few files
+per worker are in flight, so the memory does not grow with the number of files. A file which fails or runs out of
+time gets a result with its error, the other files are not affected. A crashed worker process breaks the pool, it
+is started again and the files which were in flight are tried once more, each in a process of its own.
+The time limit is kept by the main process, so it works on every platform (there is no SIGALRM on Windows). With
+a limit, a file is only submitted when a worker is free and its time counts from the submission - including the
+start of a new worker process. A file past its deadline is reported as timed out and the pool is terminated, as
+a busy worker can not be stopped otherwise; the other files in flight are submitted again to a new pool.
+"""
+import argparse
+import contextlib
+import csv
+import glob
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from . import AHP
+
+OK = "ok"
+ERROR = "error"
+TIMEOUT = "timeout"
+IN_FLIGHT = 2  # files submitted ahead per worker, without a time limit
+CSV_FIELDS = ['file', 'status', 'rank', 'alternative', 'score', 'max_cr', 'worst_matrix', 'seconds', 'error']
+
+
+def expand(patterns):
+    """ the files matching the glob patterns (or plain paths), lazily and in the patterns' order """
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            yield from sorted(glob.iglob(pattern, recursive=True))
+        else:
+            yield pattern
+
+
+def score_file(filename, top=None):
+    """ scores and the worst consistency ratio of a model file, runs in a worker. Never raises """
+    start = time.perf_counter()
+    result = {'file': filename}
+    try:
+        ahp = AHP(filename)
+        scores, names = ahp.top_k(top if top else len(ahp.alternatives))
+        report = ahp.consistency_report(triad_count=1)
+        worst = report.worst(1)
+        result.update(status=OK, scores=[[name, score] for name, score in zip(names.tolist(), scores.tolist())],
+                      max_cr=worst[0].worst_ratio() if worst else None,
+                      worst_matrix=f"{worst[0].criterion} {worst[0].label()}" if worst else None)
+    except Exception as e:  # one broken file must not stop the batch
+        result.update(status=ERROR, error=f"{type(e).__name__}: {e}")
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+class CsvWriter:
+    """ a row per scored alternative, the best first, or a single row of a failed file """
+
+    def __init__(self, f):
+        self.writer = csv.DictWriter(f, CSV_FIELDS, extrasaction='ignore')
+        self.writer.writeheader()
+
+    def write(self, result):
+        common = {key: result.get(key) for key in CSV_FIELDS}
+        common['seconds'] = round(result['seconds'], 4)
+        if result['status'] != OK or not result['scores']:
+            self.writer.writerow(common)
+        for rank, (name, score) in enumerate(result.get('scores', []), 1):
+            self.writer.writerow(dict(common, rank=rank, alternative=name, score=score))
+
+
+class JsonLinesWriter:
+    def __init__(self, f):
+        self.f = f
+
+    def write(self, result):
+        self.f.write(json.dumps(result) + '\n')
+
+
+def timed_out(filename, timeout):
+    return {'file': filename, 'status': TIMEOUT, 'error': f"Timed out after {timeout} s", 'seconds': float(timeout)}
+
+
+def terminate(executor):
+    """ shuts the pool down without waiting for the running files, their worker processes are killed """
+    processes = list((getattr(executor, '_processes', None) or {}).values())  # no public access before Python 3.14
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.join()
+
+
+def score_isolated(filename, top=None, timeout=None):
+    """ scores a file in a process of its own, a file which was in flight when a worker crashed """
+    executor = ProcessPoolExecutor(max_workers=1)
+    try:
+        return executor.submit(score_file, filename, top).result(timeout=timeout)
+    except BrokenProcessPool:
+        return {'file': filename, 'status': ERROR, 'error': "Worker process crashed", 'seconds': 0.0}
+    except FutureTimeoutError:
+        return timed_out(filename, timeout)
+    finally:
+        terminate(executor)
+
+
+def run(files, write, workers=None, top=None, timeout=None):
+    """
+    Scores the files in a process pool, calls write(result) for each result as it arrives (in the completion
+    order). Returns the counts of the statuses
+    """
+    workers = workers or os.cpu_count() or 1
+    in_flight = workers if timeout else workers * IN_FLIGHT  # a file with a time limit must not wait in the queue
+    counts = {OK: 0, ERROR: 0, TIMEOUT: 0}
+
+    def done(result):
+        counts[result['status']] += 1
+        write(result)
+
+    files = iter(files)
+    again = []  # files in flight when the pool was terminated, submitted first
+    pending = {}  # future -> (filename, deadline)
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        while True:
+            while len(pending) < in_flight:
+                filename = again.pop(0) if again else next(files, None)
+                if filename is None:
+                    break
+                deadline = time.perf_counter() + timeout if timeout else None
+                pending[executor.submit(score_file, filename, top)] = filename, deadline
+            if not pending:
+                break
+            if timeout:
+                first = min(deadline for _, deadline in pending.values())
+                finished, _ = wait(pending, max(0, first - time.perf_counter()), FIRST_COMPLETED)
+            else:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            crashed = []
+            for future in finished:
+                filename, _ = pending.pop(future)
+                try:
+                    done(future.result())
+                except BrokenProcessPool:
+                    crashed.append(filename)
+            now = time.perf_counter()
+            expired = [future for future, (_, deadline) in pending.items() if deadline and deadline <= now]
+            for future in expired:
+                done(timed_out(pending.pop(future)[0], timeout))
+            if crashed or expired:
+                # a busy worker can only be stopped with its pool, a crashed one leaves the pool unusable
+                others = [filename for filename, _ in pending.values()]
+                pending.clear()
+                terminate(executor)
+                executor = ProcessPoolExecutor(max_workers=workers)
+                if crashed:
+                    # the other files in flight fail too, any of them could have crashed the worker
+                    for filename in crashed + others:
+                        done(score_isolated(filename, top, timeout))
+                else:
+                    again = others + again
+    except BaseException:
+        terminate(executor)
+        raise
+    executor.shutdown(wait=True)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scores many AHP model files in a process pool")
+    parser.add_argument('files', nargs='+', help="model files or glob patterns, e.g. 'xmls/**/*.xml'")
+    parser.add_argument('--output', help="results file, .jsonl for JSON lines, CSV otherwise. Default: stdout CSV")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes, the number of CPUs by default")
+    parser.add_argument('--timeout', type=float, default=None, help="seconds per file")
+    parser.add_argument('--top', type=int, default=None, help="only the k best alternatives of each file")
+    args = parser.parse_args()
+
+    logging.getLogger('mylogger').setLevel(logging.WARNING)
+    with (open(args.output, 'w', newline='') if args.output else contextlib.nullcontext(sys.stdout)) as f:
+        writer = JsonLinesWriter(f) if args.output and args.output.endswith('.jsonl') else CsvWriter(f)
+        start = time.perf_counter()
+        counts = run(expand(args.files), writer.write, args.workers, args.top, args.timeout)
+    print(f"{sum(counts.values())} files in {time.perf_counter() - start:.2f} s: {counts[OK]} scored, "
+          f"{counts[ERROR]} failed, {counts[TIMEOUT]} timed out", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
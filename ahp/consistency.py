@@ -0,0 +1,274 @@
+""" Inconsistency of the whole AHP tree.
+
+The report covers the aggregated matrix and every expert's matrix of each criterion. The matrices are grouped by
+size and completeness, so that each group is stacked into one (m, n, n) array and solved with batched NumPy calls -
+one eigenvalue call per group instead of one per matrix. The groups can be spread across a process pool.
+Complete matrices get the SCI and GW indices, incomplete ones the SH index, the consistency ratios use the random
+indices of the method, size and completeness, see random_index.py. The triads are scored with Koczkodaj's
+index: 1 - min(a_ik / (a_ij a_jk), a_ij a_jk / a_ik), 0 for a consistent triad.
+
+The repair suggestions rank the judgments by how much changing them lowers the Koczkodaj indices of their triads.
+Each judgment is moved to the value that best agrees with the indirect comparisons of its triads (the least squares
+fix of the triads' log deviations log a_ik - log a_ij - log a_jk), all of them at once with array operations.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from . import triangle
+from . import stats
+from .sparse import ComparisonGraph, DENSE_MAX_SIZE
+from .random_index import random_index
+
+SCI = "SCI"
+GW = "GW"
+SH = "SH"
+BATCH_SIZE = 256  # matrices of a single task of the process pool
+WORST_TRIADS = 3
+REPAIR_SUGGESTIONS = 5
+KOCZKODAJ_THRESHOLD = 1 / 3  # a matrix with a worse triad needs a repair
+TOLERANCE = 1e-12  # smaller indices and improvements are rounding errors
+
+
+def consistency_ratio(ci, n, method=SCI, completeness=1.0, wait=True):
+    """ CI / RI, None if there is no random index for the size (or it is estimated in the background, wait=False) """
+    ri = random_index(method, n, completeness, wait)
+    return ci / ri if ri else None
+
+
+def completeness_of(condensed):
+    """ ratio of the known comparisons """
+    return np.count_nonzero(condensed) / len(condensed) if len(condensed) else 1.0
+
+
+def expand_batch(triangles, n):
+    """ stacks the dense matrices of condensed ones, missing (0) values stay 0 """
+    triangles = np.asarray(triangles, dtype=np.float64)
+    matrices = np.ones((len(triangles), n, n), dtype=np.float64)
+    rows, cols = triangle.indices(n)
+    matrices[:, rows, cols] = triangles
+    with np.errstate(divide='ignore'):
+        matrices[:, cols, rows] = np.where(triangles != 0, 1 / triangles, 0)
+    return matrices
+
+
+def saaty_indices(matrices):
+    """ Saaty's consistency index (lambda_max - n) / (n - 1) of a stack of complete matrices """
+    n = matrices.shape[-1]
+    stats.count(stats.EIGEN, len(matrices))
+    lambda_max = np.max(np.real(np.linalg.eigvals(matrices)), axis=-1)
+    return (lambda_max - n) / (n - 1)
+
+
+def golden_wang_indices(matrices):
+    """ Golden-Wang index of a stack of complete matrices """
+    n = matrices.shape[-1]
+    normalized = matrices / np.sum(matrices, axis=-2, keepdims=True)  # columns sum up to 1
+    wgm = np.exp(np.mean(np.log(matrices), axis=-1))
+    wgm /= np.sum(wgm, axis=-1, keepdims=True)
+    return np.sum(np.abs(normalized - wgm[..., None]), axis=(-2, -1)) / n
+
+
+def harker_indices(triangles, n):
+    """ Saaty-Harker index (lambda_max - n) / (n - 1) of Harker's matrices of a stack of condensed incomplete ones """
+    if n > DENSE_MAX_SIZE:
+        lambda_max = np.array([ComparisonGraph.from_triangle(t, n).harker_eigen()[0] for t in triangles])
+    else:
+        matrices = expand_batch(triangles, n)
+        degrees = np.sum(matrices != 0, axis=-1) - 1  # known comparisons of each row
+        matrices[:, np.arange(n), np.arange(n)] = n - degrees  # 1 + missing comparisons
+        stats.count(stats.EIGEN, len(matrices))
+        lambda_max = np.max(np.real(np.linalg.eigvals(matrices)), axis=-1)
+    return (lambda_max - n) / (n - 1)
+
+
+def indices_of(method, triangles, n):
+    """ the method's index of a stack of condensed matrices """
+    if method == SH:
+        return harker_indices(triangles, n)
+    matrices = expand_batch(triangles, n)
+    return saaty_indices(matrices) if method == SCI else golden_wang_indices(matrices)
+
+
+def triad_indices(condensed, n):
+    """ Koczkodaj's index of each triad i < j < k in the lexicographic order, nan if a value is missing """
+    ij, jk, ik = triangle.triads(n)
+    a_ij, a_jk, a_ik = condensed[..., ij], condensed[..., jk], condensed[..., ik]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = a_ik / (a_ij * a_jk)
+        res = 1 - np.minimum(ratio, 1 / ratio)
+    return np.where((a_ij != 0) & (a_jk != 0) & (a_ik != 0), res, np.nan)
+
+
+def triad_deviations(condensed, n):
+    """ log a_ik - log a_ij - log a_jk of the triads with all values known, returns (ij, jk, ik, deviations) """
+    ij, jk, ik = triangle.triads(n)
+    known = (condensed[ij] != 0) & (condensed[jk] != 0) & (condensed[ik] != 0)
+    ij, jk, ik = ij[known], jk[known], ik[known]
+    logs = np.log(np.where(condensed != 0, condensed, 1))
+    return ij, jk, ik, logs[ik] - logs[ij] - logs[jk]
+
+
+def repair_suggestions(condensed, n, count=REPAIR_SUGGESTIONS):
+    """
+    Returns [(row, col, value, suggested value, improvement)] of the count judgments whose change lowers the sum of
+    their triads' Koczkodaj indices the most, the best first. Only the judgments with an improvement are returned
+    """
+    if n < 3 or count <= 0:
+        return []
+    ij, jk, ik, deviations = triad_deviations(condensed, n)
+    if not len(deviations):
+        return []
+    # d grows with a_ik and falls with a_ij and a_jk
+    positions = np.concatenate([ik, ij, jk])
+    signs = np.repeat([1.0, -1.0, -1.0], len(deviations))
+    d = np.tile(deviations, 3)
+    size = len(condensed)
+    triads_count = np.bincount(positions, minlength=size)
+    # the log change of each judgment that minimizes the squared deviations of its triads
+    delta = -np.bincount(positions, signs * d, minlength=size) / np.maximum(triads_count, 1)
+    before = 1 - np.exp(-np.abs(d))
+    after = 1 - np.exp(-np.abs(d + signs * delta[positions]))
+    improvement = np.bincount(positions, before - after, minlength=size)
+    count = min(count, size)
+    best = np.argpartition(-improvement, count - 1)[:count]
+    best = best[np.argsort(-improvement[best], kind='stable')]
+    best = best[improvement[best] > TOLERANCE]
+    rows, cols = triangle.indices(n)
+    return [(int(rows[p]), int(cols[p]), float(condensed[p]), float(condensed[p] * np.exp(delta[p])),
+             float(improvement[p])) for p in best]
+
+
+def worst_triads(condensed, n, count=WORST_TRIADS):
+    """ returns [(i, j, k, index)] of the count most inconsistent triads, the worst first """
+    if n < 3 or count <= 0:
+        return []
+    indices = triad_indices(condensed, n)
+    scores = np.where(np.isnan(indices), -1, indices)
+    count = min(count, len(scores))
+    worst = np.argpartition(-scores, count - 1)[:count]
+    worst = worst[np.argsort(-scores[worst], kind='stable')]
+    worst = worst[scores[worst] > TOLERANCE]
+    ij, jk, _ = triangle.triads(n)
+    rows, cols = triangle.indices(n)
+    return [(int(rows[ij[t]]), int(cols[ij[t]]), int(cols[jk[t]]), float(indices[t])) for t in worst]
+
+
+def evaluate(n, complete, triangles, triad_count=WORST_TRIADS):
+    """ inconsistency of a group of condensed n x n matrices, returns [({method: CI}, worst triads)] """
+    triangles = np.asarray(triangles, dtype=np.float64)
+    if complete:
+        matrices = expand_batch(triangles, n)
+        values = {SCI: saaty_indices(matrices), GW: golden_wang_indices(matrices)}
+    else:
+        values = {SH: harker_indices(triangles, n)}
+    return [({method: float(ci[m]) for method, ci in values.items()}, worst_triads(triangles[m], n, triad_count))
+            for m in range(len(triangles))]
+
+
+class ConsistencyEntry:
+    """ inconsistency of a single matrix, matrix is the expert's matrix index or None for the aggregated one """
+
+    def __init__(self, criterion, matrix, names, complete, indices, triads, completeness=1.0):
+        self.criterion = criterion
+        self.matrix = matrix
+        self.names = names
+        self.complete = complete
+        self.completeness = completeness  # ratio of the known comparisons
+        self.indices = indices  # method -> CI
+        self.triads = triads  # [(i, j, k, index)], the worst first
+
+    def __repr__(self):
+        return f"{self.criterion} {self.label()}: {self.indices}"
+
+    @property
+    def n(self):
+        return len(self.names)
+
+    def label(self):
+        return "aggregated" if self.matrix is None else f"matrix {self.matrix}"
+
+    def ratio(self, method):
+        """ CR of the method's index, None if the method does not apply or there is no random index """
+        ci = self.indices.get(method)
+        return consistency_ratio(ci, self.n, method, self.completeness) if ci is not None else None
+
+    def worst_ratio(self):
+        ratios = [self.ratio(method) for method in self.indices]
+        return max((r for r in ratios if r is not None), default=None)
+
+    def triad_names(self):
+        """ the worst triads with the compared items' names """
+        return [(self.names[i], self.names[j], self.names[k], index) for i, j, k, index in self.triads]
+
+
+class ConsistencyReport:
+    """ inconsistency of all the matrices of a criterion's subtree """
+
+    def __init__(self, criterion, triad_count=WORST_TRIADS, workers=None):
+        """ workers > 1 spreads the groups of matrices of the same size across a process pool """
+        self.entries = []
+        jobs = {}  # (n, complete) -> [(criterion, matrix index, condensed matrix)]
+        for node in iterate_criteria(criterion):
+            n = node.size
+            if n < 3:
+                continue  # no data = no inconsistency
+            if not node.is_aggregated:
+                node.aggregate()
+            matrices = [(None, node.triangle, node.is_complete())]
+            matrices += [(i, m, bool(c)) for i, (m, c) in enumerate(zip(node.matrices, node.matrices_completion))]
+            for idx, condensed, complete in matrices:
+                jobs.setdefault((n, complete), []).append((node, idx, condensed))
+        tasks = []
+        for (n, complete), group in jobs.items():
+            for start in range(0, len(group), BATCH_SIZE):
+                tasks.append((n, complete, group[start:start + BATCH_SIZE]))
+        args = [(n, complete, np.stack([c for _, _, c in chunk]), triad_count) for n, complete, chunk in tasks]
+        if workers and workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(evaluate, *zip(*args)))
+        else:
+            results = [evaluate(*arg) for arg in args]
+        for (n, complete, chunk), chunk_results in zip(tasks, results):
+            for (node, idx, condensed), (indices, triads) in zip(chunk, chunk_results):
+                self.entries.append(ConsistencyEntry(node.name, idx, node.compared_names(), complete, indices, triads,
+                                                     completeness_of(condensed)))
+        order = {node.name: i for i, node in enumerate(iterate_criteria(criterion))}
+        self.entries.sort(key=lambda e: (order[e.criterion], -1 if e.matrix is None else e.matrix))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def worst(self, count=None):
+        """ entries by the worst consistency ratio, the most inconsistent first """
+        entries = sorted(self.entries, key=lambda e: -(e.worst_ratio() or 0))
+        return entries[:count] if count is not None else entries
+
+    def rows(self, methods=(SCI, GW, SH)):
+        """ table rows: criterion, matrix, n, then CI and CR of each method and the worst triad """
+        res = []
+        for entry in self.entries:
+            row = [entry.criterion, entry.label(), entry.n]
+            for method in methods:
+                ci = entry.indices.get(method)
+                ratio = entry.ratio(method)
+                row += [round(ci, 4) if ci is not None else '', round(ratio, 4) if ratio is not None else '']
+            triads = entry.triad_names()
+            row.append(f"{'/'.join(triads[0][:3])} {round(triads[0][3], 3)}" if triads else '')
+            res.append(row)
+        return res
+
+    @staticmethod
+    def headers(methods=(SCI, GW, SH)):
+        return ["Criterion", "Matrix", "n"] + [f"{m} {v}" for m in methods for v in ("CI", "CR")] + ["Worst triad"]
+
+
+def iterate_criteria(criterion):
+    """ the criterion and all the criteria below it, depth first """
+    yield criterion
+    if not criterion.is_final_criterion:
+        for child in criterion.children:
+            yield from iterate_criteria(child)
@@ -1,42 +1,112 @@
-from numpy.core.fromnumeric import size
 from . import Node
-from . import Alternative
+from . import AlternativeRegistry
+from . import triangle
+from . import stats
+from . import memo
+from .sparse import ComparisonGraph
+from .elicitation import AdaptiveElicitation
+from .rating import RatingScale, BENEFIT
+from .consistency import SCI, GW, SH, WORST_TRIADS, ConsistencyReport, consistency_ratio, completeness_of, \
+    saaty_indices, golden_wang_indices, worst_triads, repair_suggestions, REPAIR_SUGGESTIONS
+from .snapshot import CriterionState
+from .events import EventBus, MATRIX_CHANGED, WEIGHTS_CHANGED, STRUCTURE_CHANGED
 import xml.etree.ElementTree as ET
 import numpy as np
-import math
 import logging
 
 EVM = "EVM"
 GMM = "GMM"
-SCI = "SCI"
-GW = "GW"
-SH = "SH"
 calc_weight_methods = [EVM, GMM]
 ic_complete_methods = [SCI, GW]
 ic_incomplete_methods = [SH]
 log = logging.getLogger('mylogger')
 
 
+def selection_of(indices, n):
+    """ converts an index list or array or a boolean mask of n alternatives to an index array """
+    selection = np.asarray(indices)
+    if selection.dtype == bool:
+        assert selection.shape == (n,), "Invalid mask shape"
+        return np.flatnonzero(selection)
+    assert selection.ndim == 1, "Expected a list of indices"
+    return selection.astype(np.intp, copy=False)
+
+
+def best_of(scores, k):
+    """
+    indices of the k best scores, best first. Only the k best scores are sorted, the alternatives which are not
+    rated yet (nan) are left out
+    """
+    rated = None
+    if np.isnan(scores).any():
+        rated = np.flatnonzero(~np.isnan(scores))
+        scores = scores[rated]
+    k = max(0, min(k, len(scores)))
+    if k == 0:
+        best = np.zeros(0, dtype=np.intp)
+    elif k < len(scores):
+        # the ties of the kth score are taken in the registry order, as a full stable sort would
+        threshold = -np.partition(-scores, k - 1)[k - 1]
+        above = np.flatnonzero(scores > threshold)
+        best = np.concatenate((above, np.flatnonzero(scores == threshold)[:k - len(above)]))
+    else:
+        best = np.arange(len(scores))
+    best = best[np.argsort(-scores[best], kind='stable')]
+    return rated[best] if rated is not None else best
+
+
+def weighted_sum(children_scores, n):
+    """
+    sum of the (scores, weight) of the children. The children which are not compared yet (nan weight) are left
+    out - the weights of the others sum up to 1. nan scores if no child is compared
+    """
+    res = np.zeros(n)
+    compared = False
+    for scores, weight in children_scores:
+        if not np.isnan(weight):
+            res += scores * weight
+            compared = True
+    return res if compared else np.full(n, np.nan)
+
+
 class Criterion(Node):
     """ Represents a criterion node. Manages weights for its children using the decision matrix """
+    __slots__ = ('is_final_criterion', 'calc_weight_method', 'has_custom_matrix', 'tree_root', 'scale', 'events',
+                 'alternatives', 'weights', '_weights_buffer', 'triangle', '_graph', 'matrices_completion',
+                 'matrices', 'is_aggregated')
 
-    def __init__(self, node, root, parent):
-        """node is the xml criterion node for this node, root is the root of the xml tree"""
+    def __init__(self, node, root, parent, alternatives=None):
+        """
+        node is the xml criterion node for this node, root is the root of the xml tree. alternatives is the
+        registry of the root criterion, read from the xml if not given
+        """
         super().__init__(node.get('name'), parent)
         self.is_final_criterion = False  # True if it's children all are Alternatives
         self.calc_weight_method = EVM
         self.has_custom_matrix = False
         self.tree_root = root
+        self.scale = None  # rating scale of a final criterion in the absolute measurement mode, see rating.py
+        self.events = parent.events if parent else EventBus()  # the whole tree shares the root's event bus
+        if parent:
+            self.alternatives = parent.alternatives
+        else:
+            self.alternatives = alternatives if alternatives is not None else \
+                AlternativeRegistry.from_node(root.find('alternatives'))
+        self.weights = np.ones(0)  # weights of the children, the alternatives' weights of a final criterion
+        self._weights_buffer = None  # (buffer, weights view) with room for the weights of added alternatives
         for cat_node in node:
             self.children.append(Criterion(cat_node, root, self))
         if not self.children:
             self.is_final_criterion = True
-            for alt_node in root.find('alternatives'):
-                self.children.append(Alternative(alt_node.get('name'), self))
+            self.children = self.alternatives.items  # the alternatives are shared, see registry.py
+            scale_node = root.find(f"./data/scale[@for='{self.name}']")
+            if scale_node is not None:
+                self.scale = RatingScale.from_node(scale_node)
 
-        self.matrix = np.ones((len(self.children),) * 2)  # the aggregated matrix
+        self.triangle = triangle.ones(self.size)  # the condensed aggregated matrix
+        self._graph = None  # known comparisons of the aggregated matrix
         self.matrices_completion = []  # ith element is True if ith matrix is complete, otherwise its 0
-        self.matrices = []
+        self.matrices = []  # condensed upper triangles of the experts' matrices, see triangle.py
         self.is_aggregated = True
 
         # try to load all matrices for this criterion if there are none, add one filled with ones
@@ -46,14 +116,23 @@ class Criterion(Node):
 
         # set the children weights
         self._update_weights()
-        log.info(f"Created criterion {self.name}")
+        log.info("Created criterion %s", self.name)  # lazy formatting, called for every criterion
 
     def is_complete(self):
         """returns true if at all the sub matrices are complete and false otherwise """
         return 0 not in self.matrices_completion
 
     def __repr__(self):
-        return f"{self.name}: {'✓' if self.has_custom_matrix else '?'} | {'complete' if self.is_complete() else 'incomplete'} | {'weight = ' + '%.3f' % self.weight}"
+        return f"{self.name}: {'✓' if self.has_custom_matrix else '?'} | {'complete' if self.is_complete() else 'incomplete'} | {'rating | ' if self.scale else ''}{'weight = ' + ('%.3f' % self.weight if self.weight == self.weight else 'not compared')}"
+
+    @property
+    def size(self):
+        """ size of the comparison matrices - the children count, or the intensities count in the rating mode """
+        return len(self.scale.intensities) if self.scale else len(self.children)
+
+    def compared_names(self):
+        """ names of the compared items - the children, or the rating intensities in the rating mode """
+        return list(self.scale.intensities) if self.scale else [child.name for child in self.children]
 
     def recursive_repr(self, depth=0):
         """ used for printing the AHP tree status """
@@ -64,51 +143,152 @@ class Criterion(Node):
             res += sep + sep.join(criteria)
         return res
 
+    @property
+    def matrix(self):
+        """ the dense aggregated matrix, expanded from the condensed one on every use - it is not kept """
+        return triangle.expand(self.triangle, self.size)
+
+    def aggregated_value(self, row, col):
+        """ a single value of the aggregated matrix, without the dense matrix """
+        return triangle.value_at(self.triangle, row, col, self.size)
+
+    @property
+    def graph(self):
+        """ the known comparisons of the aggregated matrix as an edge list """
+        if self._graph is None:
+            self._graph = ComparisonGraph.from_triangle(self.triangle, self.size)
+        return self._graph
+
+    def get_matrix(self, idx):
+        """ returns the dense idx-th matrix """
+        return triangle.expand(self.matrices[idx], self.size)
+
+    def _condensed(self, matrix):
+        """ accepts both dense and condensed matrices, returns the condensed one or None if it's of wrong shape """
+        n = self.size
+        matrix = np.asarray(matrix, dtype=np.float64)
+        if matrix.ndim == 2:
+            if matrix.shape != (n, n):
+                return None
+            return triangle.condense(matrix)
+        return matrix if matrix.shape == (triangle.size(n),) else None
+
+    @stats.timed("update_weights")
     def _update_weights(self):
-        weights = self.calculate_weights(self.matrix, self.is_complete())
-        for i, w in enumerate(weights):
-            self.children[i].set_weight(w)
+        weights = self.calculate_weights(self.triangle, self.is_complete())
+        if self.scale:
+            # the matrices compare the intensities, alternatives get the priorities of their ratings
+            self.scale.set_priorities(weights)
+            weights = self.scale.scores(self.alternatives.names())
+        self.weights = np.asarray(weights, dtype=np.float64)
+        if not self.is_final_criterion:
+            for criterion, w in zip(self.children, self.weights.tolist()):
+                criterion.set_weight(w)
+        self.events.emit(WEIGHTS_CHANGED, self)
 
+    @stats.timed("get_all_scores")
     def get_all_scores(self):
-        node = self
-        while not node.is_final_criterion:
-            node = node.children[0]
-        alt_count = len(node.children)  # get the alternative count, for the range
         # run the actual calculations
-        return self.get_scores_for(list(range(alt_count)))
+        return self._scores().copy(), self.alternatives.names_array()
 
+    @stats.timed("get_scores_for")
     def get_scores_for(self, indices):
+        """
+        performs the AHP scores calculation with respect to self for the alternatives selected by an index list or
+        array, or by a boolean mask. Returns the scores and the names arrays in the requested order
+        """
+        selection = self._selection(indices)
+        return self._scores()[selection], self.alternatives.names_array()[selection]
+
+    @stats.timed("get_scores_for_many")
+    def get_scores_for_many(self, selections):
+        """ batched get_scores_for, the scores are calculated once for all the selections """
+        scores = self._scores()
+        names = self.alternatives.names_array()
+        return [(scores[selection], names[selection]) for selection in map(self._selection, selections)]
+
+    def _selection(self, indices):
+        return selection_of(indices, len(self.alternatives))
+
+    @stats.timed("scores")
+    def _scores(self):
+        """ scores of all the alternatives with respect to self, in the registry order """
         if not self.is_aggregated:
             self.aggregate()
-        """ performs the AHP scores calculation with respect to self """
-        names = None
         if self.is_final_criterion:
-            res = np.array([alt.weight for alt in self.children])[indices]
-            names = [child.name for i, child in enumerate(self.children) if i in indices]
-            return res, names
-        else:
-            res = np.zeros(len(indices))
-            for criterion in self.children:
-                scores, names = criterion.get_scores_for(indices)
-                res += scores * criterion.weight
-        return res, names
+            return self.weights  # nan for the alternatives which are not compared or rated yet
+        return weighted_sum(((criterion._scores(), criterion.weight) for criterion in self.children),
+                            len(self.alternatives))
+
+    @stats.timed("top_k")
+    def top_k(self, k):
+        """
+        returns the scores and the names of the k best alternatives with respect to self, best first.
+        Only the k best scores are sorted
+        """
+        scores = self._scores()
+        best = best_of(scores, k)
+        return scores[best], self.alternatives.names_array()[best]
 
     def set_matrix(self, idx, new_matrix, is_complete):
+        """ replaces the idx-th matrix with the dense or condensed new_matrix """
         assert idx in range(len(self.matrices_completion)), "Invalid index"
+        new_matrix = self._condensed(new_matrix)
+        assert new_matrix is not None, "Invalid matrix shape"
         self.matrices[idx] = new_matrix
         self.matrices_completion[idx] = is_complete
         # always aggregate after setting is_aggregated to False
         # a bit slower, but the aggregated matrix is always updated
         # mainly ull for the GUI
-        log.info(f"Matrix {idx + 1} set")
+        log.info("Matrix %d set", idx + 1)
         self.is_aggregated = False
         self.aggregate()
 
+    def set_matrix_value(self, idx, row, col, value):
+        """ sets a single comparison of the idx-th matrix, value is the positive (or 0 if missing) matrix entry """
+        self.set_matrix_values(idx, [(row, col, value)])
+
+    def set_matrix_values(self, idx, cells):
+        """
+        Applies (row, col, value) comparisons to the idx-th matrix, keeping it reciprocal. Only the touched cells
+        of the aggregated matrix are recalculated, followed by a single weights update. Raises ValueError for a
+        diagonal or out of range cell, before changing anything
+        """
+        assert idx in range(len(self.matrices_completion)), "Invalid index"
+        n = self.size
+        cells = list(cells)
+        for row, col, _ in cells:
+            if row == col or not (0 <= row < n and 0 <= col < n):
+                raise ValueError(f"Invalid cell ({row}, {col}) of a {n} x {n} matrix, the diagonal is always 1")
+        matrix = self.matrices[idx]
+        if not matrix.flags.writeable:  # shared with a snapshot, see snapshot.py
+            matrix = self.matrices[idx] = matrix.copy()
+        if self.is_aggregated and not self.triangle.flags.writeable:
+            self.triangle = self.triangle.copy()
+        changed = []  # condensed positions of the aggregated matrix
+        for row, col, value in cells:
+            if row > col:  # only the upper triangle is stored
+                row, col, value = col, row, (1 / value if value else 0)
+            k = triangle.index(row, col, n)
+            matrix[k] = value
+            if self.is_aggregated:
+                # aggregated value is the geometric average of the same value in all sub matrices
+                self.triangle[k] = np.prod([m[k] for m in self.matrices]) ** (1 / len(self.matrices))
+                changed.append(k)
+        self.matrices_completion[idx] = 0 not in matrix
+        if self.is_aggregated and self._graph is not None:
+            self._graph = self._graph.with_values(changed, self.triangle[changed])  # not scanned again
+        if self.is_aggregated:
+            self.events.emit(MATRIX_CHANGED, self, idx=idx, cells=[(row, col) for row, col, _ in cells])
+            self._update_weights()
+        else:
+            self.aggregate()
+
     def reset_matrix(self, idx):
-        self.matrices[idx] = np.ones(self.matrices[idx].shape)
+        self.matrices[idx] = triangle.ones(self.size)
         self.is_aggregated = False
         self.aggregate()
-        log.info(f"# Matrix {idx} reset")
+        log.info("# Matrix %d reset", idx)
 
     def remove_matrix(self, idx):
         try:
@@ -120,57 +300,72 @@ class Criterion(Node):
             print(e)
             log.error("Invalid remove_matrix index")
 
+    def _ask_comparison(self, i, j, allow_missing=False):
+        """ reads how the ith child compares to the jth one from the command line, returns the matrix value """
+        names = self.compared_names()
+        msg = f"How do you compare {names[i]} to {names[j]} with respect to {self.name}?"
+        while True:
+            try:
+                raw_value = input(msg)
+                value = float(raw_value)
+                assert 0 <= abs(value) <= 9, "Number out of range [-9, 9]"
+                if value == 0 and allow_missing:
+                    return 0
+                if 0 < abs(value) <= 9:
+                    return (1 / -value) if value < 0 else value
+            except (AssertionError, ValueError) as e:
+                print("Invalid input: " + str(e))
+
     def _input_matrix(self):
         """ reads the new decision matrix values from the user via the command line """
-        new_matrix = np.ones((len(self.children),) * 2)
-        child_count = len(self.children)
-        is_matrix_complete = True
+        child_count = self.size
+        new_matrix = triangle.ones(child_count)
         for i in range(0, child_count):
             for j in range(i + 1, child_count):
-                msg = f"How do you compare {self.children[i].name} to {self.children[j].name} with respect to {self.name}?"
-                while True:
-                    try:
-                        raw_value = input(msg)
-                        value = float(raw_value)
-                        assert 0 <= abs(value) <= 9, "Number out of range [-9, 9]"
-                        if 0 < abs(value) <= 9:
-                            if value == 0:
-                                is_matrix_complete = False
-                                new_matrix[i][j] = value
-                                new_matrix[j][i] = value
-                            else:
-                                if value < 0:
-                                    value = (1 / -value)
-                                new_matrix[i][j] = value
-                                new_matrix[j][i] = 1 / value
-                            break
-
-                    except (AssertionError, ValueError) as e:
-                        print("Invalid input: " + str(e))
-        return new_matrix, is_matrix_complete
+                new_matrix[triangle.index(i, j, child_count)] = self._ask_comparison(i, j)
+        return new_matrix, 0 not in new_matrix
+
+    def _input_matrix_adaptive(self, top_k):
+        """
+        reads only the comparisons needed for a stable order of the top_k children, see elicitation.py.
+        Returns the (possibly incomplete) condensed matrix
+        """
+        elicitation = AdaptiveElicitation(self, top_k)
+        print("Enter 0 if you can not compare the pair")
+        new_matrix = elicitation.run(lambda i, j: self._ask_comparison(i, j, allow_missing=True))
+        print(f"Asked {elicitation.questions} of {triangle.size(self.size)} comparisons")
+        return new_matrix, 0 not in new_matrix
 
     def add_matrix(self, new_matrix, complete):
-        """Add the given matrix to the matrices list. Assumes the matrix does not contain negative values"""
-        if new_matrix.shape != self.matrix.shape:
-            pretty_matrix = str(new_matrix).replace('[', '').replace(']', '')
-            log.error(f"Matrix:\n{pretty_matrix}\nis of invalid shape. Skipping")
+        """
+        Add the given dense or condensed matrix to the matrices list.
+        Assumes the matrix does not contain negative values
+        """
+        condensed = self._condensed(new_matrix)
+        if condensed is None:
+            if log.isEnabledFor(logging.ERROR):  # printing the matrix is expensive
+                pretty_matrix = str(new_matrix).replace('[', '').replace(']', '')
+                log.error(f"Matrix:\n{pretty_matrix}\nis of invalid shape. Skipping")
             return
-        self.matrices.append(new_matrix)
+        self.matrices.append(condensed)
         self.matrices_completion.append(complete)
         self.is_aggregated = False
         self.aggregate()
-        log.info(f"# Added matrix for {self.name}")
+        log.info("# Added matrix for %s", self.name)
 
     # Aggregated matrix is the geometric average of all sub matrices
+    @stats.timed("aggregate")
     def aggregate(self):
         log.debug("# Aggregating")
-        self.matrix = np.ones(self.matrix.shape)
+        self.triangle = triangle.ones(self.size)
         if self.matrices:
             for sub_matrix in self.matrices:
-                self.matrix *= sub_matrix
+                self.triangle *= sub_matrix
             r = len(self.matrices)
-            self.matrix **= (1 / r)
+            self.triangle **= (1 / r)
+        self._graph = None
         self.is_aggregated = True
+        self.events.emit(MATRIX_CHANGED, self)
         self._update_weights()
 
     def load_all_matrices(self, root):
@@ -185,11 +380,18 @@ class Criterion(Node):
         if matrix_node is None:
             return None
         y, x = list(map(int, [matrix_node.get('height'), matrix_node.get('width')]))
-        if x != y or x != len(self.children):
+        if x != y or x != self.size:
             log.error(f"Invalid matrix size for {self.name}")
             return None
-        matrix = np.zeros((y, x), dtype=np.float64)
-        np.fill_diagonal(matrix, 1)
+        n = x
+        compact = matrix_node.find('triangle')
+        if compact is not None:
+            try:
+                matrix = triangle.from_text(compact.text, n)
+            except ValueError as e:
+                raise ValueError(f"Invalid matrix for {self.name}: {e}")  # the whole file is invalid
+            return matrix, 0 not in matrix
+        matrix = np.zeros(triangle.size(n), dtype=np.float64)
         for value in matrix_node:
             x, y = list(map(int, [value.get('x'), value.get('y')]))
             val = value.text
@@ -201,19 +403,16 @@ class Criterion(Node):
                     f"Invalid value at: <value x='{x}' y='{y}'>{value.text}</value> in matrix for {self.name}")
                 return None, None
             # check if the x and y attributes are valid
-            if x < 0 or x > len(self.children) or y < 0 or y > len(self.children):
+            if x < 0 or x >= n or y < 0 or y >= n or x == y:
                 log.error(
                     f"Invalid attributes for value: <value x='{x}' y='{y}'>{value.text}</value> in matrix for {self.name}")
                 return None, None
             # transform value into positive inverse if it's negative
             val = (1 / -val) if val < 0 else val
-            if val == 0:
-                matrix[y, x] = 0
-                matrix[x, y] = 0
-                is_matrix_complete = False
-            else:
-                matrix[x, y] = 1 / val
-                matrix[y, x] = val
+            if y > x:  # lower triangle value
+                y, x, val = x, y, (1 / val if val else 0)
+            matrix[triangle.index(y, x, n)] = val
+        is_matrix_complete = 0 not in matrix  # values not present in the node are missing
         return matrix, is_matrix_complete
 
     def find_criterion(self, name):
@@ -226,213 +425,145 @@ class Criterion(Node):
             results = ([node.find_criterion(name) for node in self.children])
             return next((item for item in results if item is not None), None)
 
-    def create_matrix_node_at(self, node, matrix, idx):
-        """ creates a matrix node in the specified node of the etree with the decision matrix data """
+    def create_matrix_node_at(self, node, matrix, idx, compact=False):
+        """
+        creates a matrix node in the specified node of the etree with the decision matrix data. compact=True
+        writes the upper triangle as the text of a single triangle node instead of a value node per comparison
+        """
         new_matrix = ET.SubElement(node, 'matrix')
         new_matrix.set('for', self.name)
         new_matrix.set('id', str(idx))
-        x, y = self.matrix.shape
-        new_matrix.set('width', str(x))
-        new_matrix.set('height', str(y))
-        for i in range(0, y - 1):
-            for j in range(i + 1, x):
-                value = ET.SubElement(new_matrix, 'value')
-                value.set('x', str(j))
-                value.set('y', str(i))
-                value.text = str(matrix[i, j])
-
-    def _save_decision_matrices(self, data_node):
+        n = self.size
+        new_matrix.set('width', str(n))
+        new_matrix.set('height', str(n))
+        if compact:
+            ET.SubElement(new_matrix, 'triangle').text = triangle.to_text(matrix)
+            return
+        rows, cols = triangle.indices(n)
+        # the condensed matrix is already in the row by row order of the values
+        for i, j, val in zip(rows.tolist(), cols.tolist(), matrix.tolist()):
+            value = ET.SubElement(new_matrix, 'value')
+            value.set('x', str(j))
+            value.set('y', str(i))
+            value.text = str(val)
+
+    def _save_decision_matrices(self, data_node, compact=False):
         """
         Updates the etree matrix node for this criterion. Removes the current one and creates one with the
         current matrix data instead if self.has_custom_node == True
         """
         old_matrices = data_node.findall(f"./matrix[@for='{self.name}']")
-        for matrix in old_matrices:
+        for matrix in old_matrices + data_node.findall(f"./scale[@for='{self.name}']"):
             data_node.remove(matrix)
+        if self.scale:
+            self.scale.create_node_at(data_node, self.name)
         for i, matrix in enumerate(self.matrices):
-            self.create_matrix_node_at(data_node, matrix, i)
+            self.create_matrix_node_at(data_node, matrix, i, compact)
         if not self.is_final_criterion:
             for child in self.children:
-                child._save_decision_matrices(data_node)
+                child._save_decision_matrices(data_node, compact)
 
-    def ic(self, method):
-        """Calculates the inconsistency and it's ratio using the specified method"""
-        if len(self.children) < 3:
+    @stats.timed("ic")
+    def ic(self, method, wait=True):
+        """
+        Calculates the inconsistency and it's ratio using the specified method, see consistency.py. wait=False
+        returns the ratio None instead of waiting for the estimate of a new random index
+        """
+        if self.size < 3:
             return 0, 0  # no data = no inconsistency
         if not self.is_aggregated:
             self.aggregate()
-        # inconsistency + consistency ratio
-        RI = {3: 0.546, 4: 0.83, 5: 1.08, 6: 1.26, 7: 1.33, 8: 1.41, 9: 1.45, 10: 1.47, 11: 1.51, 12: 1.54, 13: 1.55,
-              14: 1.57, 15: 1.58, 16: 1.69, 17: 1.61, 18: 1.61, 19: 1.62, 20: 1.63}
-
-        """są dwie metody dla macierzy kompletnych i jedna dla niekompletnych"""
+        n = self.size
+        # there are two methods for complete matrices and one for incomplete ones
         CI = None
         if self.is_complete():
             log.debug("# Calculating inconsistency for a complete matrix")
-            # method = input("METHOD = [SCI or GW] ")
             if method == SCI:
                 # Saaty's consistency index
-                eigenvalues, eigenvector = map(np.real, np.linalg.eig(self.matrix))
-                lambda_max = np.amax(eigenvalues)
-                n = len(self.matrix)
-                CI = (lambda_max - n) / (n - 1)
-                # log.info("Inconsistency = " + str(CI))
+                CI = memo.cache.cached(memo.matrix_key('ic', method, True, self.triangle),
+                                       lambda: float(saaty_indices(self.matrix[None])[0]))
             elif method == GW:
                 # Golden Wang index
-                n = len(self.matrix)
-                _C = np.zeros((n, n), dtype=np.float64)
-                sm = 0
-                for i in range(n):
-                    for j in range(n):
-                        sm = 0
-                        for k in range(n):
-                            sm += self.matrix[k][j]
-                        _C[i][j] = self.matrix[i][j] / sm
-                # 6.15 126
-                wgm = np.zeros(n, dtype=np.float64)
-                for i in range(n):
-                    licz = self.wgmu(i, n)
-                    mian = 0
-                    for j in range(n):
-                        mian += self.wgmu(j, n)
-                    wgm[i] = licz / mian
-                CI = 0
-                smm = 0
-                for i in range(n):
-                    for j in range(n):
-                        smm += abs(_C[i][j] - wgm[i])
-                CI = 1 / n * smm
-                # log.info("Inconsistency = " + str(CI)
+                CI = memo.cache.cached(memo.matrix_key('ic', method, True, self.triangle),
+                                       lambda: float(golden_wang_indices(self.matrix[None])[0]))
             else:
-                log.debug(f"Tried using {method} for a complete matrix")
+                log.debug("Tried using %s for a complete matrix", method)
         else:
             log.debug("# Calculating inconsistency for an incomplete matrix")
-            log.debug("# Using the Saaty-Harker method")
             if method == SH:
                 # Saaty-Harker
-                # 151
-                n = len(self.matrix)
-                x = n
-                y = n
-                B = np.ones((x, y), dtype=np.float64)
-                s = np.ones((x, 1), dtype=np.float64)
-                for i in range(0, x):
-                    for j in range(0, y):
-                        if self.matrix[i][j] == 0:
-                            s[i] += 1
-                for i in range(0, x):
-                    for j in range(0, y):
-                        if self.matrix[i][j] == 0 and i != j:
-                            B[i][j] = 0
-                        if self.matrix[i][j] != 0 and i != j:
-                            B[i][j] = self.matrix[i][j]
-                        if i == j:
-                            B[i][j] = s[i]
-                eigenvalues, eigenvector = map(np.real, np.linalg.eig(B))
-                max_arg = np.amax(eigenvalues)
-                CI = max_arg - n / (n - 1)
-                # log.info("Inconsistency = " + str(CI))
+                CI = memo.cache.cached(memo.matrix_key('ic', method, False, self.triangle),
+                                       lambda: float((self.graph.harker_eigen()[0] - n) / (n - 1)))
             else:
-                log.debug(f"Tried using {method} for an incomplete matrix")
+                log.debug("Tried using %s for an incomplete matrix", method)
 
-        if CI is not None and 3 <= n <= 20:
-            # log.info("Consistency Ratio = " + str(CI / RI.get(n)))
-            return CI, CI / RI.get(n)
+        if CI is not None:
+            return CI, consistency_ratio(CI, n, method, completeness_of(self.triangle), wait)
         else:
-            # log.error("Invalid parameters. CI is None or n < 3 and n > 20")
             return None, None
 
-    def wgmu(self, i, n):
-        res = 1
-        for j in range(n):
-            res *= self.matrix[i][j]
-        res = res ** (1 / n)
-        return res
+    def worst_triads(self, count=WORST_TRIADS, idx=None):
+        """ [(i, j, k, Koczkodaj's index)] of the most inconsistent triads of the aggregated or idx-th matrix """
+        return worst_triads(self._consistency_matrix(idx), self.size, count)
+
+    @stats.timed("repair_suggestions")
+    def repair_suggestions(self, count=REPAIR_SUGGESTIONS, idx=None):
+        """
+        [(row, col, value, suggested value, improvement)] of the judgments of the aggregated or idx-th matrix whose
+        change reduces the inconsistency the most, see consistency.py
+        """
+        return repair_suggestions(self._consistency_matrix(idx), self.size, count)
 
+    def _consistency_matrix(self, idx):
+        if idx is not None:
+            return self.matrices[idx]
+        if not self.is_aggregated:
+            self.aggregate()
+        return self.triangle
+
+    @stats.timed("consistency_report")
+    def consistency_report(self, triad_count=WORST_TRIADS, workers=None):
+        """ inconsistency of every matrix in the subtree, see consistency.py """
+        return ConsistencyReport(self, triad_count, workers)
+
+    @stats.timed("calculate_weights")
     def calculate_weights(self, matrix, is_complete):
-        if not self.children:
+        """
+        calculates the weights for a dense or condensed matrix. Missing comparisons of incomplete ones are 0.
+        The results are cached by the matrix values, see memo.py
+        """
+        if not self.size:
             return []  # nothing to calculate
         method = self.calc_weight_method
         assert method in calc_weight_methods, "Invalid method for calculating weight"
+        key = memo.matrix_key('weights', method, is_complete, matrix)
+        return memo.cache.cached(key, lambda: self._solve_weights(matrix, is_complete, method))
+
+    def _solve_weights(self, matrix, is_complete, method):
+        n = self.size
         if is_complete:
+            if np.ndim(matrix) == 1:
+                matrix = triangle.expand(matrix, n)
             if method == EVM:
                 """ finds the orthogonal vector of the decision matrix with maximum length """
+                stats.count(stats.EIGEN)
                 eigenvalues, eigenvector = map(np.real, np.linalg.eig(matrix))
                 max_index = np.argmax(eigenvalues)
                 weights = eigenvector[:, max_index]
                 return weights / np.sum(weights)
             elif method == GMM:
-                x, y = matrix.shape
-                wgmu = np.ones((x,), dtype=np.float64)
-                for i in range(0, x):
-                    for k in range(0, x):
-                        wgmu[i] *= matrix[i][k]
-                    wgmu[i] = math.pow(wgmu[i], 1 / x)
-                wgm = np.zeros((x,), dtype=np.float64)
-                for i in range(0, x):
-                    suma = 0
-                    for j in range(0, x):
-                        suma += wgmu[j]
-                    wgm[i] = wgmu[i] / suma
-                return wgm
+                # normalized geometric means of the rows
+                wgm = np.exp(np.mean(np.log(matrix), axis=1))
+                return wgm / np.sum(wgm)
         else:
-            # while method != EVM and method != GMM:
-            # method = input("INCOMPLETE MATRIX: choose weight calculation method (EVM/GMM) ")
-            x, y = matrix.shape
-            B = np.ones((x, y), dtype=np.float64)
-            s = np.ones((x, 1), dtype=np.float64)
-            for i in range(0, x):
-                for j in range(0, y):
-                    if matrix[i][j] == 0:
-                        s[i] += 1
-
+            # only the known comparisons are used, see sparse.py
+            graph = self.graph if matrix is self.triangle else ComparisonGraph.from_matrix(matrix, n)
             if method == EVM:
-                for i in range(0, x):
-                    for j in range(0, y):
-                        if matrix[i][j] == 0 and i != j:
-                            B[i][j] = 0
-                        elif matrix[i][j] != 0 and i != j:
-                            B[i][j] = matrix[i][j]
-                        elif i == j:
-                            B[i][j] = s[i]  # no need to add 1, because we initialized vector with ones ;)
                 # B*wmax = lambdamax*wmax
-                eigenvalues, eigenvector = map(np.real, np.linalg.eig(B))
-                max_index = np.argmax(eigenvalues)
-                weights = eigenvector[:, max_index]
-                return weights / np.sum(weights)
+                _, weights = graph.harker_eigen()
+                return weights
             elif method == GMM:
-                for i in range(0, x):
-                    for j in range(0, y):
-                        if matrix[i][j] == 0 and i != j:
-                            B[i][j] = 1
-                        elif matrix[i][j] != 0 and i != j:
-                            B[i][j] = 0
-                        elif i == j:
-                            B[i][j] = x - s[i] + 1
-                r = np.ones((x, 1), dtype=np.float64)
-                for i in range(0, x):
-                    for j in range(0, y):
-                        if matrix[i][j] != 0:
-                            r[i] *= matrix[i][j]
-                for i in range(0, x):
-                    r[i] = np.log(r[i])
-                B_inv = np.linalg.inv(B)
-                w_log = B_inv.dot(r)
-                w = np.zeros((x, 1), dtype=np.float64)
-                w_scaled = np.zeros((x, 1), dtype=np.float64)
-
-                for i in range(0, size(w)):
-                    w[i] = math.exp(w_log[i])
-
-                for i in range(0, size(w)):
-                    suma = 0
-                    for j in range(0, size(w)):
-                        suma += w[j]
-                    w_scaled[i] = w[i] / suma
-                res = np.zeros(size(w))
-                for i in range(0, size(w)):
-                    res[i] = w_scaled[i]
-                return res
+                return graph.llsm_weights()
 
     def set_all_calc_weight_method(self, new_method):
         self.calc_weight_method = new_method
@@ -441,22 +572,48 @@ class Criterion(Node):
             for crit in self.children:
                 crit.set_all_calc_weight_method(new_method)
 
-    def add_alternative(self, new_node):
-        if self.is_final_criterion:
-            self.children.append(Alternative(new_node, self))
-            self.clear()  # remove all matrices, now of wrong shapes
+    def add_alternative(self, name):
+        """ updates the final criteria after the alternative was appended to the registry """
+        if self.is_final_criterion and self.scale:
+            # rated alternatives do not change the matrices nor the other alternatives' weights
+            self._append_weight(self.scale.score(name))
+            self.events.emit(WEIGHTS_CHANGED, self)
+        elif self.is_final_criterion:
+            # the new alternative has not been compared yet
+            self._insert_comparisons(self.size - 1)
         else:
             for child in self.children:
-                child.add_alternative(new_node)
+                child.add_alternative(name)
 
-    def remove_alternative(self, name):
-        if self.is_final_criterion:
-            self.children = list(filter(lambda c: c.name != name, self.children))
-            self.clear()  # remove all matrices, now of wrong shapes
+    def _append_weight(self, weight):
+        """
+        appends a weight in amortized O(1) - the weights are a view of a buffer with room for more, which is only
+        grown while the weights are still its latest view (a restored or recalculated array gets a new buffer)
+        """
+        n = len(self.weights)
+        buffer, view = self._weights_buffer or (None, None)
+        if view is not self.weights or len(buffer) == n:
+            buffer = np.empty(max(2 * n, 16), dtype=np.float64)
+            buffer[:n] = self.weights
+        buffer[n] = weight  # beyond the views shared with the snapshots
+        self.weights = buffer[:n + 1]
+        self._weights_buffer = buffer, self.weights
+
+    def remove_alternative(self, name, k):
+        """ updates the final criteria after the kth alternative was removed from the registry """
+        if self.is_final_criterion and self.scale:
+            self.weights = np.delete(self.weights, k)
+            had_raw_value = not isinstance(self.scale.ratings.get(name, ''), str)
+            self.scale.remove(name)
+            if had_raw_value:
+                self._update_rated_weights()  # the normalization bound might have changed
+            else:
+                self.events.emit(WEIGHTS_CHANGED, self)
+        elif self.is_final_criterion:
+            self._drop_comparisons(k)
         else:
-            print("Passing to children " + str(self.children))
             for child in self.children:
-                child.remove_alternative(name)
+                child.remove_alternative(name, k)
 
     def add_subcriterion(self, name):
         thisNode = self.tree_root.find(f".//criterion[@name='{self.name}']")
@@ -464,27 +621,173 @@ class Criterion(Node):
         newNode.set("name", name)
         newCrit = Criterion(newNode, self.tree_root, self)
         if self.is_final_criterion:
-            print("Wash final")
+            # the new criterion compares the same alternatives, so it takes over the judgments
+            newCrit._take_judgments(self)
             self.is_final_criterion = False
-            self.children.clear()
-        self.children.append(newCrit)
-        self.clear()
+            self.scale = None
+            self.children = [newCrit]  # the alternatives list is shared, do not clear it
+            self.clear()  # nothing to compare with a single child
+        else:
+            self.children.append(newCrit)
+            self._insert_comparisons(self.size - 1)
+        self.events.emit(STRUCTURE_CHANGED, self)
 
     def remove(self):
         if not self.parent:
             print("Can not remove the root criterion")
             return
-        self.parent.children.remove(self)
-        if not self.parent.children:
-            self.parent.children = self.children  # pass the list of alternatives
-            self.parent.is_final_criterion = True
-        self.parent.clear()
+        parent = self.parent
+        k = parent.children.index(self)
+        del parent.children[k]
+        if not parent.children:
+            # the parent takes over the children (the alternatives) with their judgments
+            parent.children = self.children
+            if not self.is_final_criterion:
+                for child in parent.children:
+                    child.parent = parent
+            parent.is_final_criterion = self.is_final_criterion
+            parent._take_judgments(self)
+        else:
+            parent._drop_comparisons(k)
+        self.events.emit(STRUCTURE_CHANGED, parent)
+
+    def set_judgments(self, matrices, matrices_completion, scale=None):
+        """ replaces all the condensed matrices and the rating scale, e.g. when replaying a journal """
+        self.scale = scale
+        self.matrices = list(matrices)
+        self.matrices_completion = list(matrices_completion)
+        self.has_custom_matrix = bool(self.matrices)
+        self.is_aggregated = False
+        self.aggregate()
+
+    def _take_judgments(self, criterion):
+        """ moves the matrices (and the rating scale) of a criterion comparing the same items to self """
+        self.scale = criterion.scale
+        self.matrices, criterion.matrices = criterion.matrices, []
+        self.matrices_completion, criterion.matrices_completion = criterion.matrices_completion, []
+        self.has_custom_matrix = bool(self.matrices)
+        self.aggregate()
+
+    def _insert_comparisons(self, k):
+        """ inserts a missing kth row and column into all the matrices after a new compared item was added """
+        n = self.size - 1
+        self.matrices = [triangle.insert(matrix, n, k) for matrix in self.matrices]
+        self.matrices_completion = [0 not in matrix for matrix in self.matrices]
+        self.triangle = triangle.insert(self.triangle, n, k) if self.matrices else triangle.ones(n + 1)
+        self._reshaped()
+
+    def _drop_comparisons(self, k):
+        """ removes the kth row and column of all the matrices after the kth compared item was removed """
+        n = self.size + 1
+        self.matrices = [triangle.remove(matrix, n, k) for matrix in self.matrices]
+        self.matrices_completion = [0 not in matrix for matrix in self.matrices]
+        self.triangle = triangle.remove(self.triangle, n, k)
+        self._reshaped()
+
+    def _reshaped(self):
+        if not self.is_aggregated:
+            self.aggregate()
+            return
+        # the aggregated values of the other items do not change, no need to aggregate again
+        self._graph = None
+        self.events.emit(MATRIX_CHANGED, self)
+        self._update_weights()
+
+    def set_rating_scale(self, intensities, normalization=BENEFIT):
+        """
+        Switches a final criterion to the rating mode with given intensities, or back to the pairwise comparison of
+        the alternatives if intensities is None. Removes all the matrices
+        """
+        assert self.is_final_criterion, "Only final criteria can be rated"
+        old_scale = self.scale
+        self.scale = RatingScale(intensities, normalization) if intensities is not None else None
+        if self.scale and old_scale:
+            # keep the ratings which are still valid
+            for alternative, rating in old_scale.ratings.items():
+                try:
+                    self.scale.rate(alternative, rating)
+                except (AssertionError, ValueError):
+                    pass
+        self.clear()
+        self.events.emit(STRUCTURE_CHANGED, self)
+
+    def rate(self, alternative, rating):
+        """ rates the alternative with an intensity name or a raw value, only the rated alternative is updated """
+        assert self.scale, "Criterion is not in the rating mode"
+        index = self.alternatives.index(alternative)
+        assert index is not None, f"No alternative named {alternative}"
+        self.scale.rate(alternative, rating)
+        if self.scale.has_raw_values():
+            self._update_rated_weights()  # the normalization bound might have changed
+        else:
+            if not self.weights.flags.writeable:  # shared with a snapshot
+                self.weights = self.weights.copy()
+            self.weights[index] = self.scale.score(alternative)
+            self.events.emit(WEIGHTS_CHANGED, self)
+
+    def set_rating_normalization(self, normalization):
+        """ how the raw rating values are normalized, see rating.py """
+        assert self.scale, "Criterion is not in the rating mode"
+        self.scale.set_normalization(normalization)
+        self._update_rated_weights()
+
+    def _update_rated_weights(self):
+        self.weights = self.scale.scores(self.alternatives.names())
+        self.events.emit(WEIGHTS_CHANGED, self)
+
+    def state(self):
+        """ immutable state of the subtree, shares the arrays with the criteria, see snapshot.py """
+        if not self.is_aggregated:
+            self.aggregate()
+        children = () if self.is_final_criterion else tuple(child.state() for child in self.children)
+        return CriterionState(self, children)
+
+    @classmethod
+    def from_state(cls, state, root, parent, alternatives=None):
+        """ creates the criterion subtree of a state without reading the xml, root is the root of the xml tree """
+        criterion = cls.__new__(cls)
+        criterion.parent = parent
+        criterion.tree_root = root
+        criterion.events = parent.events if parent else EventBus()
+        criterion.alternatives = parent.alternatives if parent else alternatives
+        criterion._restore(state)
+        return criterion
+
+    def _restore(self, state):
+        """ sets the subtree to the state, the arrays stay shared until changed """
+        self.name = state.name
+        self.weight = state.weight
+        self.is_final_criterion = state.is_final_criterion
+        self.calc_weight_method = state.calc_weight_method
+        self.has_custom_matrix = state.has_custom_matrix
+        self.scale = state.scale.copy() if state.scale else None
+        self.matrices = list(state.matrices)
+        self.matrices_completion = list(state.matrices_completion)
+        self.triangle = state.triangle
+        self.weights = state.weights
+        self._weights_buffer = None
+        self._graph = None
+        self.is_aggregated = True
+        if self.is_final_criterion:
+            self.children = self.alternatives.items
+        else:
+            self.children = [Criterion.from_state(child, self.tree_root, self) for child in state.children]
+
+    def is_descendant_of(self, criterion):
+        """ returns True if criterion is self or one of its ancestors """
+        node = self
+        while node is not None:
+            if node is criterion:
+                return True
+            node = node.parent
+        return False
 
     def reshape_main_matrix(self):
-        self.matrix = np.ones((len(self.children),) * 2)  # reshape aggregated matrix
+        self.triangle = triangle.ones(self.size)  # reshape aggregated matrix
+        self._graph = None
 
     def clear(self):
-        log.info(f"Clearing criterion {self.name}")
+        log.info("Clearing criterion %s", self.name)
         self.matrices.clear()  # remove all matrices, now of wrong shapes
         self.matrices_completion.clear()
         self.reshape_main_matrix()
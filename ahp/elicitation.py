@@ -0,0 +1,96 @@
+""" Adaptive pairwise comparison elicitation.
+
+Instead of asking for all n(n-1)/2 pairs, the expert is first asked for a spanning set of comparisons (enough to
+calculate the incomplete matrix weights), then for the pairs whose order is the most uncertain among the current
+top ranked children. The elicitation stops once the top k order has not changed for a few answers.
+Comparisons that were not asked for stay missing (0).
+"""
+import numpy as np
+
+from . import triangle
+
+STABLE_ROUNDS = 3  # answers without a change of the top k order needed to stop
+
+
+class AdaptiveElicitation:
+    """ collects the comparisons of a criterion's children, ask(i, j) returns the matrix value or 0 if unknown """
+
+    def __init__(self, criterion, top_k=3, stable_rounds=STABLE_ROUNDS):
+        self.criterion = criterion
+        self.n = criterion.size
+        self.top_k = max(1, min(top_k, self.n))
+        self.stable_rounds = stable_rounds
+        self.matrix = np.zeros(triangle.size(self.n), dtype=np.float64)
+        self.asked = np.zeros(triangle.size(self.n), dtype=bool)
+        self.questions = 0
+        self._components = list(range(self.n))  # union find of the answered comparisons
+
+    def _find(self, i):
+        while self._components[i] != i:
+            self._components[i] = self._components[self._components[i]]
+            i = self._components[i]
+        return i
+
+    def _ask(self, ask, i, j):
+        k = triangle.index(i, j, self.n)
+        self.asked[k] = True
+        self.questions += 1
+        value = ask(i, j)
+        self.matrix[k] = value
+        if value:
+            self._components[self._find(i)] = self._find(j)
+
+    def _spanning_pairs(self):
+        """ consecutive pairs first, then any pairs joining the components left by unanswered comparisons """
+        for i in range(self.n - 1):
+            yield i, i + 1
+        rows, cols = triangle.indices(self.n)
+        for k in np.flatnonzero(~self.asked):
+            if self._find(rows[k]) != self._find(cols[k]):
+                yield rows[k], cols[k]
+
+    def weights(self):
+        """ the current weights, 0 for the children without an answered comparison """
+        return np.nan_to_num(self.criterion.calculate_weights(self.matrix, 0 not in self.matrix), nan=0.0)
+
+    def top_order(self, weights):
+        return tuple(np.argsort(-weights, kind='stable')[:self.top_k])
+
+    def next_pair(self, weights):
+        """
+        Picks the unasked pair with the most uncertain order among the top k + 1 children: close weights and
+        few comparisons of both children. Returns None if there is no such pair
+        """
+        rows, cols = triangle.indices(self.n)
+        top = np.zeros(self.n, dtype=bool)
+        top[np.argsort(-weights)[:self.top_k + 1]] = True
+        candidates = np.flatnonzero(~self.asked & (top[rows] | top[cols]))
+        if not len(candidates):
+            return None
+        known = self.matrix != 0
+        degrees = np.bincount(rows[known], minlength=self.n) + np.bincount(cols[known], minlength=self.n)
+        r, c = rows[candidates], cols[candidates]
+        log_weights = np.log(np.clip(weights, 1e-12, None))
+        closeness = 1 / (1 + np.abs(log_weights[r] - log_weights[c]))
+        support = 1 / np.sqrt(degrees[r] + 1) + 1 / np.sqrt(degrees[c] + 1)
+        best = candidates[np.argmax(closeness * support)]
+        return rows[best], cols[best]
+
+    def run(self, ask):
+        """ asks for the comparisons until the top k order is stable, returns the condensed matrix """
+        if self.n < 2:
+            return self.matrix
+        for i, j in self._spanning_pairs():
+            self._ask(ask, i, j)
+        order = None
+        stable = 0
+        while stable < self.stable_rounds:
+            weights = self.weights()
+            new_order = self.top_order(weights)
+            stable = stable + 1 if new_order == order else 0
+            order = new_order
+            pair = self.next_pair(weights)
+            if pair is None:
+                break
+            self._ask(ask, *pair)
+        return self.matrix
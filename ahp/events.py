@@ -0,0 +1,44 @@
+MATRIX_CHANGED = "matrix_changed"
+WEIGHTS_CHANGED = "weights_changed"
+STRUCTURE_CHANGED = "structure_changed"
+ALTERNATIVES_CHANGED = "alternatives_changed"
+event_types = [MATRIX_CHANGED, WEIGHTS_CHANGED, STRUCTURE_CHANGED, ALTERNATIVES_CHANGED]
+
+
+class ChangeEvent:
+    """ describes a single change of the model. criterion is the changed criterion, details depend on the type """
+
+    def __init__(self, event_type, criterion=None, **details):
+        self.type = event_type
+        self.criterion = criterion
+        self.details = details
+
+    def __repr__(self):
+        return f"{self.type} at {self.criterion.name if self.criterion else 'model'} {self.details}"
+
+
+class EventBus:
+    """ dispatches the model change events to the subscribed callbacks """
+
+    def __init__(self):
+        self.subscribers = {event_type: [] for event_type in event_types}
+
+    def subscribe(self, callback, *types):
+        """ calls callback(event) for each event of given types. Subscribes to all types if none are given """
+        for event_type in types or event_types:
+            assert event_type in self.subscribers, "Invalid event type"
+            if callback not in self.subscribers[event_type]:
+                self.subscribers[event_type].append(callback)
+
+    def unsubscribe(self, callback):
+        for callbacks in self.subscribers.values():
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def emit(self, event_type, criterion=None, **details):
+        callbacks = self.subscribers[event_type]
+        if not callbacks:
+            return
+        event = ChangeEvent(event_type, criterion, **details)
+        for callback in list(callbacks):
+            callback(event)
@@ -0,0 +1,117 @@
+""" Columnar export of the scores decomposed into the contributions of the criteria.
+
+The score of an alternative is the sum, over the final criteria, of the criterion's global weight (the product of
+the weights along its path from the exported criterion) times the alternative's local weight at the criterion.
+The contributions are calculated for a chunk of alternatives at a time, as one product of the chunk's local
+weights stacked by the final criteria and their global weights, so the memory does not grow with the number of
+alternatives. A criterion which is not compared yet has the global weight nan, so do the alternatives which are not
+rated yet at a final criterion; the scores are the model's ones, leaving the criteria not compared out. Written as:
+- .npz: 'alternatives', 'criteria' (the final criteria's paths), 'contributions' (alternatives x criteria),
+  'scores', 'nodes' (the paths of all the criteria) and 'node_weights' (their global weights). The contributions
+  and the scores are streamed into the archive chunk by chunk, np.load reads it as usual
+- .csv: a row per alternative, a column per final criterion and the score last, plus a second file
+  <name>_weights.csv with the global weights of all the criteria
+"""
+import csv
+import os
+import zipfile
+
+import numpy as np
+
+from . import stats
+
+CHUNK = 65536  # alternatives per chunk
+SEP = '/'  # separates the criteria names of a path
+
+
+class Contributions:
+    """ the decomposed scores with respect to a criterion, the goal for the whole model """
+
+    def __init__(self, criterion):
+        self.nodes = []  # paths of all the criteria, the exported one first
+        self.node_weights = []  # global weights of the nodes
+        self.finals = []  # final criteria, in the order of the columns
+        self._is_final = []  # of the nodes
+        self._walk(criterion, criterion.name, 1.0)
+        self.criteria = [path for path, final in zip(self.nodes, self._is_final) if final]
+        self.weights = np.array([w for w, final in zip(self.node_weights, self._is_final) if final], dtype=np.float64)
+        self.node_weights = np.array(self.node_weights, dtype=np.float64)
+        self.names = criterion.alternatives.names_array()
+        self.scores = criterion._scores()
+
+    def _walk(self, criterion, path, weight):
+        if not criterion.is_aggregated:
+            criterion.aggregate()  # also sets the children's weights
+        self.nodes.append(path)
+        self.node_weights.append(weight)
+        self._is_final.append(criterion.is_final_criterion)
+        if criterion.is_final_criterion:
+            self.finals.append(criterion)
+        else:
+            for child in criterion.children:
+                self._walk(child, path + SEP + child.name, weight * child.weight)
+
+    def __len__(self):
+        return len(self.names)
+
+    def chunks(self, chunk_size=CHUNK):
+        """ yields (names, contributions, scores) of consecutive chunks of the alternatives """
+        for start in range(0, len(self), chunk_size):
+            stop = min(start + chunk_size, len(self))
+            local = np.empty((stop - start, len(self.finals)), dtype=np.float64)
+            for j, final in enumerate(self.finals):
+                local[:, j] = final.weights[start:stop]
+            local *= self.weights
+            yield self.names[start:stop], local, self.scores[start:stop]
+
+
+def write_npy(archive, name, shape, dtype, chunks):
+    """ writes the chunks (arrays of dtype, concatenated along the first axis) as name.npy into a zip archive """
+    dtype = np.dtype(dtype)
+    with archive.open(name + '.npy', 'w', force_zip64=True) as f:
+        np.lib.format.write_array_header_1_0(
+            f, {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': shape})
+        for chunk in chunks:
+            f.write(np.ascontiguousarray(chunk, dtype=dtype).tobytes())
+
+
+@stats.timed("export_npz")
+def to_npz(contributions, filename, chunk_size=CHUNK):
+    n, m = len(contributions), len(contributions.criteria)
+    with zipfile.ZipFile(filename, 'w', zipfile.ZIP_STORED) as archive:
+        write_npy(archive, 'contributions', (n, m), np.float64,
+                  (chunk for _, chunk, _ in contributions.chunks(chunk_size)))
+        write_npy(archive, 'scores', (n,), np.float64, [contributions.scores])
+        for name, array in (('alternatives', np.array(contributions.names, dtype=str)),
+                            ('criteria', np.array(contributions.criteria, dtype=str)),
+                            ('nodes', np.array(contributions.nodes, dtype=str)),
+                            ('node_weights', contributions.node_weights)):
+            write_npy(archive, name, array.shape, array.dtype, [array])
+
+
+@stats.timed("export_csv")
+def to_csv(contributions, filename, chunk_size=CHUNK):
+    with open(filename, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['alternative'] + contributions.criteria + ['score'])
+        for names, chunk, scores in contributions.chunks(chunk_size):
+            writer.writerows([name] + row + [score]
+                             for name, row, score in zip(names.tolist(), chunk.tolist(), scores.tolist()))
+    with open(weights_filename(filename), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['criterion', 'global_weight'])
+        writer.writerows(zip(contributions.nodes, contributions.node_weights.tolist()))
+
+
+def weights_filename(filename):
+    return os.path.splitext(filename)[0] + '_weights.csv'
+
+
+def export(criterion, filename, chunk_size=CHUNK):
+    """ writes the contributions with respect to the criterion, as .npz or CSV by the file's extension """
+    contributions = Contributions(criterion)
+    if filename.endswith('.npz'):
+        to_npz(contributions, filename, chunk_size)
+    else:
+        to_csv(contributions, filename, chunk_size)
+    return contributions
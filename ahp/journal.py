@@ -0,0 +1,234 @@
+""" Append-only journal of the changes of a model, next to its xml file.
+
+Instead of writing the whole xml document, a save appends the changes made since the previous one as JSON lines:
+the hierarchy and the alternatives if they have changed, and the judgments of the changed criteria - only the
+changed cells of a matrix whose shape has not changed. The changes are found by comparing model snapshots, which
+share the unchanged arrays (see snapshot.py), so a save costs O(changes) whatever the size of the model.
+
+Every record holds the new values, not the differences, so replaying a record twice does not change the result.
+The journal is replayed when the model is loaded, recovering the changes which were not saved to the xml file
+(a torn last line of a crashed write is skipped). Once the journal grows past COMPACT_BYTES, it is folded back into
+the xml file by a background thread, which saves a copy of the model made from a snapshot into the file's xml
+tree - the nodes and attributes the model does not use are kept, as by a plain save.
+"""
+import json
+import logging
+import os
+import threading
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from . import stats
+from .rating import RatingScale
+from .snapshot import same_array, same_scale
+
+SUFFIX = ".journal"
+COMPACT_BYTES = 2 ** 20  # journal size starting a compaction
+STRUCTURE = "structure"
+JUDGMENTS = "judgments"
+log = logging.getLogger('mylogger')
+
+
+def criteria_of(state):
+    """ nested {'name': name, 'children': [...]} hierarchy of the criteria in the subtree of a state """
+    return {'name': state.name, 'children': [criteria_of(child) for child in state.children]}
+
+
+def states_of(state, states=None):
+    """ name -> state of the criteria in the subtree """
+    states = {} if states is None else states
+    states[state.name] = state
+    for child in state.children:
+        states_of(child, states)
+    return states
+
+
+def matrix_changes(new, old):
+    """ record of a changed condensed matrix - the changed [position, value] cells or all the values """
+    if old is not None and len(old) == len(new):
+        changed = np.flatnonzero(new != old)
+        if len(changed) * 2 < len(new):
+            return {'cells': [[k, v] for k, v in zip(changed.tolist(), new[changed].tolist())]}
+    return {'values': new.tolist()}
+
+
+def judgments_record(state, old):
+    """ record of the criterion's changed judgments, None if they have not changed """
+    same_count = old is not None and len(old.matrices) == len(state.matrices)
+    if (same_count and all(same_array(a, b) for a, b in zip(state.matrices, old.matrices)) and
+            same_scale(state.scale, old.scale)):
+        return None
+    matrices = []
+    for i, matrix in enumerate(state.matrices):
+        old_matrix = old.matrices[i] if same_count else None
+        unchanged = old_matrix is not None and same_array(matrix, old_matrix)
+        matrices.append(None if unchanged else matrix_changes(matrix, old_matrix))
+    return {'type': JUDGMENTS, 'criterion': state.name, 'matrices': matrices,
+            'completion': [bool(complete) for complete in state.matrices_completion],
+            'scale': state.scale.as_dict() if state.scale else None}
+
+
+class Journal:
+    """ the journal of a model loaded from an xml file, replays the existing journal """
+
+    def __init__(self, ahp, path=None, compact_bytes=COMPACT_BYTES):
+        self.ahp = ahp
+        self.base = ahp.filename
+        self.path = path or self.base + SUFFIX
+        self.compact_bytes = compact_bytes
+        self._lock = threading.Lock()  # guards the journal file
+        self._compaction = None  # background compaction thread
+        self.replayed = self.replay() if os.path.exists(self.path) else 0
+        self._last = ahp.snapshot('journal')  # the journaled state
+
+    def size(self):
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    @stats.timed("journal_append")
+    def append(self):
+        """ appends the changes since the last append, returns the number of records. May start a compaction """
+        snapshot = self.ahp.snapshot('journal')
+        records = self.records(snapshot, self._last)
+        if records:
+            with self._lock:
+                with open(self.path, 'a') as f:
+                    f.writelines(json.dumps(record) + '\n' for record in records)
+                    f.flush()
+                    os.fsync(f.fileno())
+        self._last = snapshot
+        if self.size() > self.compact_bytes:
+            self.compact()
+        return len(records)
+
+    @staticmethod
+    def records(snapshot, old):
+        """ records changing the old snapshot's model to the snapshot's one """
+        records = []
+        if snapshot.alternatives != old.alternatives or criteria_of(snapshot.root) != criteria_of(old.root):
+            records.append({'type': STRUCTURE, 'criteria': criteria_of(snapshot.root),
+                            'alternatives': list(snapshot.alternatives)})
+        old_states = states_of(old.root)
+        for name, state in states_of(snapshot.root).items():
+            record = judgments_record(state, old_states.get(name))
+            if record:
+                records.append(record)
+        return records
+
+    @stats.timed("journal_replay")
+    def replay(self):
+        """ applies the journal's records to the model, returns their number """
+        count = 0
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    log.warning("Journal %s ends with an incomplete record, skipped", self.path)
+                    break
+                if record['type'] == STRUCTURE:
+                    self._apply_structure(record)
+                else:
+                    self._apply_judgments(record)
+                count += 1
+        if count:
+            log.info("Recovered %d journaled changes of %s", count, self.base)
+        return count
+
+    def _apply_structure(self, record):
+        target = record['alternatives']
+        for name in [name for name in self.ahp.alternatives if name not in target]:
+            self.ahp.remove_alternative(name)
+        for name in target:
+            if name not in self.ahp.alternatives:
+                self.ahp.add_alternative(name)
+        self._apply_criteria(self.ahp.root_criterion, record['criteria'])
+
+    def _apply_criteria(self, criterion, target):
+        names = [child['name'] for child in target['children']]
+        if not criterion.is_final_criterion:
+            for child in [child for child in criterion.children if child.name not in names]:
+                child.remove()
+        for child in target['children']:
+            subcriterion = self.ahp.find_criterion(child['name'])
+            if subcriterion is None or subcriterion.parent is not criterion:
+                if subcriterion is not None:
+                    subcriterion.remove()  # moved to another parent
+                criterion.add_subcriterion(child['name'])
+                subcriterion = criterion.children[-1]
+            self._apply_criteria(subcriterion, child)
+
+    def _apply_judgments(self, record):
+        criterion = self.ahp.find_criterion(record['criterion'])
+        assert criterion is not None, f"Journal record of an unknown criterion {record['criterion']}"
+        scale = RatingScale.from_dict(record['scale']) if record['scale'] else None
+        matrices = []
+        for i, changes in enumerate(record['matrices']):
+            if changes is None:
+                matrices.append(criterion.matrices[i])
+            elif 'values' in changes:
+                matrices.append(np.array(changes['values'], dtype=np.float64))
+            else:
+                matrix = np.array(criterion.matrices[i], dtype=np.float64)  # a copy, might be shared
+                cells = np.array(changes['cells'], dtype=np.float64).reshape(-1, 2)
+                matrix[cells[:, 0].astype(np.intp)] = cells[:, 1]
+                matrices.append(matrix)
+        criterion.set_judgments(matrices, record['completion'], scale)
+
+    def compact(self, wait=False):
+        """
+        Folds the journal into the xml file in a background thread, the records appended in the meantime are kept.
+        Returns the thread, None if a compaction is already running
+        """
+        if self._compaction and self._compaction.is_alive():
+            return None
+        snapshot = self._last
+        with self._lock:
+            folded = self.size()
+        self._compaction = threading.Thread(target=self._compact, args=(snapshot, folded), daemon=True)
+        self._compaction.start()
+        if wait:
+            self._compaction.join()
+        return self._compaction
+
+    @stats.timed("journal_compact")
+    def _compact(self, snapshot, folded):
+        # a copy of the model, the live one may be changed in the meantime
+        tmp_path = f"{self.base}.{os.getpid()}.tmp"
+        try:
+            try:
+                tree = ET.parse(self.base)  # keeps the nodes and attributes of the file which the model does not use
+            except ET.ParseError as e:
+                log.warning("Compacting %s without its other xml nodes, it can not be read: %s", self.base, e)
+                tree = None
+            copy = type(self.ahp).from_snapshot(snapshot, self.base, tree)
+            copy.save_to_file(tmp_path, self.ahp.compact)
+            os.replace(tmp_path, self.base)
+            with self._lock:
+                with open(self.path, 'rb') as f:
+                    f.seek(folded)
+                    rest = f.read()
+                with open(tmp_path, 'wb') as f:
+                    f.write(rest)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            log.debug("Journal %s compacted", self.path)
+        except OSError as e:
+            log.error("Could not compact the journal %s: %s", self.path, e)
+
+    def reset(self):
+        """ empties the journal after the whole model was saved to the xml file """
+        self.wait()
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+        self._last = self.ahp.snapshot('journal')
+
+    def wait(self):
+        """ waits for a running compaction """
+        if self._compaction:
+            self._compaction.join()
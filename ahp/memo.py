@@ -0,0 +1,108 @@
+""" Content addressed cache of the weights and inconsistency results.
+
+The results depend only on the matrix values, its completeness and the method, so they are keyed by the shape and
+a hash of the matrix bytes - identical matrices of different criteria, or of models loaded again, share the entries.
+The shape tells a dense n x n matrix from a condensed one with as many values, e.g. 6 x 6 and n = 9.
+A single LRU cache is shared by the whole process. Its memory is capped, the least recently used results are
+evicted first. The cached arrays are read only, the callers get copies.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+MAX_BYTES = int(float(os.environ.get("AHP_MEMO_MB", 32)) * 2 ** 20)
+ENTRY_OVERHEAD = 200  # approximate bytes of a key and an entry besides the result's data
+
+
+def matrix_key(kind, method, complete, matrix):
+    """ kind distinguishes the cached functions, e.g. 'weights' or 'ic'. The matrix is dense or condensed """
+    matrix = np.ascontiguousarray(matrix, dtype=np.float64)
+    return kind, method, bool(complete), matrix.shape, hashlib.blake2b(matrix.data, digest_size=16).digest()
+
+
+class ResultCache:
+    """ LRU mapping of the keys to float arrays or numbers, with hit and miss counts """
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.enabled = max_bytes > 0
+        self._entries = OrderedDict()  # key -> (value, bytes)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """ the cached value (a copy of an array) or None """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        value = entry[0]
+        return value.copy() if isinstance(value, np.ndarray) else value
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        if isinstance(value, np.ndarray):
+            value = value.copy()
+            value.flags.writeable = False
+            size = value.nbytes + ENTRY_OVERHEAD
+        else:
+            size = ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (value, size)
+            self.bytes += size
+            self._evict()
+
+    def _evict(self):
+        """ drops the least recently used entries above the memory cap, called with the lock held """
+        while self.bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.bytes -= evicted_size
+            self.evictions += 1
+
+    def cached(self, key, calculate):
+        """ returns the cached value of the key, calculates and stores it on a miss """
+        value = self.get(key)
+        if value is None:
+            value = calculate()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def resize(self, max_bytes):
+        """ sets the memory cap, 0 disables the cache """
+        with self._lock:
+            self.max_bytes = max_bytes
+            self.enabled = max_bytes > 0
+            self._evict()
+
+    def info(self):
+        total = self.hits + self.misses
+        return {'entries': len(self._entries), 'bytes': self.bytes, 'max_bytes': self.max_bytes, 'hits': self.hits,
+                'misses': self.misses, 'evictions': self.evictions, 'hit_ratio': self.hits / total if total else 0}
+
+
+cache = ResultCache()  # shared by all the criteria and models of the process
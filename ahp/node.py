@@ -1,9 +1,10 @@
 class Node:
     """ parent class for AHP tree nodes """
+    __slots__ = ('name', 'children', 'weight', 'parent')
 
     def __init__(self, name, parent):
         self.name = name
-        self.children = []              
+        self.children = []
         self.weight = 1
         self.parent = parent
     
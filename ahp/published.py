@@ -0,0 +1,119 @@
+""" Thread safe access to a model shared by reading and editing threads.
+
+The readers never touch the live Criterion objects - reading scores may aggregate a matrix, and an edit changes
+several arrays one after another. Instead, a writer edits the model inside PublishedModel.edit(), which publishes a
+new immutable ModelVersion when it is done (or rolls the model back if the edit fails). Publishing is a single
+attribute assignment, so a reader gets either the old or the new version and scores against it without any lock,
+for as long as it keeps the reference. The versions are built from snapshots (see snapshot.py), so they share the
+arrays of the unchanged criteria.
+"""
+import contextlib
+import threading
+
+import numpy as np
+
+from . import stats
+from .criterion import selection_of, best_of, weighted_sum
+
+
+class ModelVersion:
+    """
+    Immutable scores of a published version. The overall scores are calculated when publishing, the scores with
+    respect to the other criteria on first use (concurrent readers may calculate them twice, with the same result)
+    """
+
+    def __init__(self, snapshot, number):
+        self.snapshot = snapshot
+        self.number = number  # increases with every published change
+        self.names = np.array(snapshot.alternatives, dtype=object)
+        self.names.flags.writeable = False
+        self._states = {}  # criterion name -> state
+        self._scores = {}  # criterion name -> read only scores
+        self._index(snapshot.root)
+        self.scores(None)
+
+    def _index(self, state):
+        self._states[state.name] = state
+        for child in state.children:
+            self._index(child)
+
+    def criteria(self):
+        return list(self._states)
+
+    def scores(self, criterion=None):
+        """ read only scores of all the alternatives with respect to the criterion of given name or the goal """
+        state = self._states[criterion] if criterion is not None else self.snapshot.root
+        scores = self._scores.get(state.name)
+        if scores is None:
+            if state.is_final_criterion:
+                scores = state.weights
+            else:
+                scores = weighted_sum(((self.scores(child.name), child.weight) for child in state.children),
+                                      len(self.names))
+                scores.flags.writeable = False
+            self._scores[state.name] = scores
+        return scores
+
+    def get_all_scores(self, criterion=None):
+        return self.scores(criterion), self.names
+
+    def get_scores_for(self, indices, criterion=None):
+        """ scores and names of the alternatives selected by indices or a boolean mask """
+        selection = selection_of(indices, len(self.names))
+        return self.scores(criterion)[selection], self.names[selection]
+
+    def get_scores_for_many(self, selections, criterion=None):
+        scores = self.scores(criterion)
+        return [(scores[selection], self.names[selection])
+                for selection in (selection_of(indices, len(self.names)) for indices in selections)]
+
+    def top_k(self, k, criterion=None):
+        """ scores and names of the k best alternatives, best first """
+        scores = self.scores(criterion)
+        best = best_of(scores, k)
+        return scores[best], self.names[best]
+
+
+class PublishedModel:
+    """ a model edited by one writer at a time and read from the published versions by any number of threads """
+
+    def __init__(self, ahp):
+        self._ahp = ahp
+        self._write_lock = threading.RLock()
+        self._version = ModelVersion(ahp.snapshot('publish'), 0)
+
+    def current(self):
+        """ the latest published version, keep the reference for consistent reads of the same version """
+        return self._version
+
+    @contextlib.contextmanager
+    def edit(self, label=''):
+        """
+        with published.edit() as ahp: ... changes the model, the readers see the changes once the block is done.
+        An exception in the block restores the last published version
+        """
+        with self._write_lock:
+            try:
+                yield self._ahp
+            except BaseException:
+                self._ahp.restore(self._version.snapshot)
+                raise
+            self._publish(label)
+
+    @stats.timed("publish")
+    def _publish(self, label):
+        snapshot = self._ahp.snapshot(label)
+        if not snapshot.same_as(self._version.snapshot):
+            self._version = ModelVersion(snapshot, self._version.number + 1)
+
+    def get_all_scores(self, criterion=None):
+        return self._version.get_all_scores(criterion)
+
+    def get_scores_for(self, indices, criterion=None):
+        return self._version.get_scores_for(indices, criterion)
+
+    def get_scores_for_many(self, selections, criterion=None):
+        return self._version.get_scores_for_many(selections, criterion)
+
+    def top_k(self, k, criterion=None):
+        return self._version.top_k(k, criterion)
@@ -0,0 +1,194 @@
+""" Random consistency indices for any matrix size, inconsistency method and completeness.
+
+The random index (RI) of a method is the mean inconsistency index of random reciprocal matrices, the consistency
+ratio is CI / RI. Saaty's published indices are used for SCI of complete matrices up to 20 x 20, anything else is
+estimated with a Monte Carlo simulation: batches of random matrices with values drawn from the Saaty scale (and
+comparisons removed at random for the given completeness) are evaluated at once by the vectorized consistency
+functions. The indices of the common sizes are shipped precomputed (random_index_table.py, written by
+python -m ahp.random_index), the others are stored in a JSON file once estimated, so every (method, n, completeness)
+is simulated only once. An interactive caller can ask for an index without waiting: it gets None while the index
+is estimated in a background thread.
+"""
+import argparse
+import json
+import logging
+import os
+import pprint
+import threading
+import zlib
+
+import numpy as np
+
+from . import triangle
+from . import consistency
+from .random_index_table import RANDOM_INDEX_TABLE
+
+CACHE_ENV = "AHP_RI_CACHE"  # path of the cache file, overrides the default one
+DEFAULT_CACHE = os.path.join(os.path.expanduser('~'), '.cache', 'solicitor_ahp', 'random_index.json')
+CACHE_VERSION = 2  # increased when an index changes, the older cache files are dropped
+VERSION_KEY = "version"
+TABLE_PATH = os.path.join(os.path.dirname(__file__), 'random_index_table.py')
+TABLE_MAX_SIZE = 30  # the table holds all the methods and completeness ratios up to this size
+SAMPLES = 10000  # random matrices of a 20 x 20 or smaller estimate
+MIN_SAMPLES = 200  # larger matrices use fewer, SAMPLES * 20 / n
+BATCH = 500
+COMPLETENESS_STEP = 0.1  # completeness ratios are rounded to the step
+SCALE = np.array([1 / 9, 1 / 8, 1 / 7, 1 / 6, 1 / 5, 1 / 4, 1 / 3, 1 / 2, 1, 2, 3, 4, 5, 6, 7, 8, 9])
+SAATY_RANDOM_INDEX = {3: 0.546, 4: 0.83, 5: 1.08, 6: 1.26, 7: 1.33, 8: 1.41, 9: 1.45, 10: 1.47, 11: 1.51, 12: 1.54,
+                      13: 1.55, 14: 1.57, 15: 1.58, 16: 1.59, 17: 1.61, 18: 1.61, 19: 1.62, 20: 1.63}
+log = logging.getLogger('mylogger')
+
+
+class RandomIndexEngine:
+    """ estimates and caches the random indices, the cache file is read on first use """
+
+    def __init__(self, path=None, samples=SAMPLES):
+        self.path = path or os.environ.get(CACHE_ENV) or DEFAULT_CACHE
+        self.samples = samples
+        self._cache = None  # key -> RI
+        self._lock = threading.Lock()  # guards the cache, the background estimates add to it
+        self._estimating = {}  # key -> thread of a background estimate
+
+    @staticmethod
+    def key(method, n, completeness):
+        return f"{method}:{n}:{completeness:.1f}"
+
+    @staticmethod
+    def rounded(completeness):
+        """ completeness rounded to the step, an incomplete matrix never rounds up to a complete one """
+        rounded = round(round(completeness / COMPLETENESS_STEP) * COMPLETENESS_STEP, 1)
+        return min(max(rounded, COMPLETENESS_STEP), 1 - COMPLETENESS_STEP if completeness < 1 else 1)
+
+    def get(self, method, n, completeness=1.0, wait=True):
+        """
+        the random index of n x n matrices with the given ratio of known comparisons, None for n < 3. A missing
+        index is estimated once in a worker thread, registered under the lock: the callers asking for it meanwhile
+        wait for that thread, wait=False returns None instead
+        """
+        if n < 3:
+            return None
+        completeness = self.rounded(completeness)
+        if method == consistency.SCI and completeness == 1 and n in SAATY_RANDOM_INDEX:
+            return SAATY_RANDOM_INDEX[n]
+        key = self.key(method, n, completeness)
+        if key in RANDOM_INDEX_TABLE:
+            return RANDOM_INDEX_TABLE[key]
+        with self._lock:
+            ri = self._load().get(key)
+            thread = self._estimating.get(key)
+            if ri is None and thread is None:
+                thread = threading.Thread(target=self._add, args=(method, n, completeness), daemon=True)
+                self._estimating[key] = thread
+                thread.start()
+        if ri is not None or not wait:
+            return ri
+        thread.join()
+        with self._lock:
+            return self._cache.get(key)  # None if the estimate failed
+
+    def estimating(self):
+        """ keys of the indices being estimated in the background """
+        with self._lock:
+            return list(self._estimating)
+
+    def _add(self, method, n, completeness):
+        """ estimates and caches an index, runs in a worker thread """
+        key = self.key(method, n, completeness)
+        try:
+            ri = self.estimate(method, n, completeness)
+            with self._lock:
+                self._cache[key] = ri
+                self._save()
+        except Exception as e:
+            log.error("Could not estimate the random index %s: %s", key, e)
+        finally:
+            with self._lock:
+                self._estimating.pop(key, None)  # a failed estimate is tried again by the next caller
+
+    def estimate(self, method, n, completeness=1.0):
+        """ mean index of random reciprocal matrices (Monte Carlo) """
+        log.debug("Estimating the random index of %s for n = %d, completeness %.1f", method, n, completeness)
+        rng = np.random.default_rng(zlib.crc32(self.key(method, n, completeness).encode()))  # reproducible
+        samples = self.samples if n <= 20 else max(MIN_SAMPLES, self.samples * 20 // n)
+        total = 0.0
+        for start in range(0, samples, BATCH):
+            batch = min(BATCH, samples - start)
+            triangles = rng.choice(SCALE, size=(batch, triangle.size(n)))
+            if completeness < 1:
+                triangles[rng.random(triangles.shape) >= completeness] = 0  # missing comparisons
+            total += np.sum(consistency.indices_of(method, triangles, n))
+        return total / samples
+
+    def _load(self):
+        if self._cache is None:
+            try:
+                with open(self.path) as f:
+                    self._cache = json.load(f)
+            except (OSError, ValueError):
+                self._cache = {}
+            if self._cache.get(VERSION_KEY) != CACHE_VERSION:
+                self._cache = {VERSION_KEY: CACHE_VERSION}  # estimated by an older version
+        return self._cache
+
+    def _save(self):
+        """
+        writes the cache to a temporary file first, so a concurrent reader never sees a partial file. Called with
+        the lock held
+        """
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self._cache, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log.debug("Could not save the random index cache: %s", e)
+
+
+_engine = None
+
+
+def engine():
+    """ the shared engine """
+    global _engine
+    if _engine is None:
+        _engine = RandomIndexEngine()
+    return _engine
+
+
+def random_index(method, n, completeness=1.0, wait=True):
+    """ the random index from the shared engine, see RandomIndexEngine.get """
+    return engine().get(method, n, completeness, wait)
+
+
+def table_keys(max_size=TABLE_MAX_SIZE):
+    """ (method, n, completeness) of the precomputed indices """
+    steps = [round(k * COMPLETENESS_STEP, 1) for k in range(1, round(1 / COMPLETENESS_STEP))]
+    for n in range(3, max_size + 1):
+        if n not in SAATY_RANDOM_INDEX:
+            yield consistency.SCI, n, 1.0
+        yield consistency.GW, n, 1.0
+        for completeness in steps:
+            yield consistency.SH, n, completeness
+
+
+def write_table(path=TABLE_PATH, max_size=TABLE_MAX_SIZE, samples=SAMPLES):
+    """ estimates the indices of table_keys and writes them as the random_index_table module """
+    estimator = RandomIndexEngine(samples=samples)
+    table = {RandomIndexEngine.key(*key): round(estimator.estimate(*key), 4) for key in table_keys(max_size)}
+    with open(path, 'w') as f:
+        docstring = f"Precomputed random indices, written by python -m ahp.random_index. {samples} samples per index"
+        f.write(f'""" {docstring} """\n')
+        f.write(f"RANDOM_INDEX_TABLE = {pprint.pformat(table, width=120, compact=True)}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimates the precomputed random indices")
+    parser.add_argument('--max-size', type=int, default=TABLE_MAX_SIZE)
+    parser.add_argument('--samples', type=int, default=SAMPLES)
+    args = parser.parse_args()
+    write_table(max_size=args.max_size, samples=args.samples)
+
+
+if __name__ == '__main__':
+    main()
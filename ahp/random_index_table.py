@@ -0,0 +1,291 @@
+""" Precomputed random indices, written by python -m ahp.random_index. 10000 samples per index """
+RANDOM_INDEX_TABLE = {'GW:10:1.0': 0.8624,
+ 'GW:11:1.0': 0.8741,
+ 'GW:12:1.0': 0.8821,
+ 'GW:13:1.0': 0.8899,
+ 'GW:14:1.0': 0.8956,
+ 'GW:15:1.0': 0.9016,
+ 'GW:16:1.0': 0.906,
+ 'GW:17:1.0': 0.9097,
+ 'GW:18:1.0': 0.9131,
+ 'GW:19:1.0': 0.9158,
+ 'GW:20:1.0': 0.919,
+ 'GW:21:1.0': 0.9212,
+ 'GW:22:1.0': 0.9235,
+ 'GW:23:1.0': 0.9259,
+ 'GW:24:1.0': 0.9275,
+ 'GW:25:1.0': 0.9291,
+ 'GW:26:1.0': 0.9306,
+ 'GW:27:1.0': 0.9322,
+ 'GW:28:1.0': 0.9335,
+ 'GW:29:1.0': 0.9348,
+ 'GW:30:1.0': 0.9359,
+ 'GW:3:1.0': 0.4371,
+ 'GW:4:1.0': 0.6126,
+ 'GW:5:1.0': 0.7054,
+ 'GW:6:1.0': 0.7644,
+ 'GW:7:1.0': 0.801,
+ 'GW:8:1.0': 0.8284,
+ 'GW:9:1.0': 0.8482,
+ 'SCI:21:1.0': 1.636,
+ 'SCI:22:1.0': 1.6402,
+ 'SCI:23:1.0': 1.6479,
+ 'SCI:24:1.0': 1.6515,
+ 'SCI:25:1.0': 1.6549,
+ 'SCI:26:1.0': 1.6598,
+ 'SCI:27:1.0': 1.6627,
+ 'SCI:28:1.0': 1.6666,
+ 'SCI:29:1.0': 1.6698,
+ 'SCI:30:1.0': 1.6734,
+ 'SH:10:0.1': 0.0153,
+ 'SH:10:0.2': 0.1107,
+ 'SH:10:0.3': 0.2712,
+ 'SH:10:0.4': 0.4457,
+ 'SH:10:0.5': 0.6244,
+ 'SH:10:0.6': 0.7993,
+ 'SH:10:0.7': 0.9717,
+ 'SH:10:0.8': 1.1455,
+ 'SH:10:0.9': 1.3204,
+ 'SH:11:0.1': 0.0191,
+ 'SH:11:0.2': 0.1271,
+ 'SH:11:0.3': 0.301,
+ 'SH:11:0.4': 0.4796,
+ 'SH:11:0.5': 0.6566,
+ 'SH:11:0.6': 0.8291,
+ 'SH:11:0.7': 1.0044,
+ 'SH:11:0.8': 1.1748,
+ 'SH:11:0.9': 1.3414,
+ 'SH:12:0.1': 0.0238,
+ 'SH:12:0.2': 0.1539,
+ 'SH:12:0.3': 0.3266,
+ 'SH:12:0.4': 0.5024,
+ 'SH:12:0.5': 0.6803,
+ 'SH:12:0.6': 0.8529,
+ 'SH:12:0.7': 1.0283,
+ 'SH:12:0.8': 1.1982,
+ 'SH:12:0.9': 1.3653,
+ 'SH:13:0.1': 0.0277,
+ 'SH:13:0.2': 0.1671,
+ 'SH:13:0.3': 0.3495,
+ 'SH:13:0.4': 0.5276,
+ 'SH:13:0.5': 0.7009,
+ 'SH:13:0.6': 0.8754,
+ 'SH:13:0.7': 1.0433,
+ 'SH:13:0.8': 1.2144,
+ 'SH:13:0.9': 1.3813,
+ 'SH:14:0.1': 0.034,
+ 'SH:14:0.2': 0.1855,
+ 'SH:14:0.3': 0.3671,
+ 'SH:14:0.4': 0.5436,
+ 'SH:14:0.5': 0.7199,
+ 'SH:14:0.6': 0.889,
+ 'SH:14:0.7': 1.0565,
+ 'SH:14:0.8': 1.229,
+ 'SH:14:0.9': 1.3996,
+ 'SH:15:0.1': 0.038,
+ 'SH:15:0.2': 0.2013,
+ 'SH:15:0.3': 0.3816,
+ 'SH:15:0.4': 0.5575,
+ 'SH:15:0.5': 0.7285,
+ 'SH:15:0.6': 0.9027,
+ 'SH:15:0.7': 1.0722,
+ 'SH:15:0.8': 1.2429,
+ 'SH:15:0.9': 1.4125,
+ 'SH:16:0.1': 0.0455,
+ 'SH:16:0.2': 0.214,
+ 'SH:16:0.3': 0.3932,
+ 'SH:16:0.4': 0.5712,
+ 'SH:16:0.5': 0.7408,
+ 'SH:16:0.6': 0.912,
+ 'SH:16:0.7': 1.0836,
+ 'SH:16:0.8': 1.2543,
+ 'SH:16:0.9': 1.4254,
+ 'SH:17:0.1': 0.0502,
+ 'SH:17:0.2': 0.2266,
+ 'SH:17:0.3': 0.4038,
+ 'SH:17:0.4': 0.577,
+ 'SH:17:0.5': 0.7494,
+ 'SH:17:0.6': 0.923,
+ 'SH:17:0.7': 1.0927,
+ 'SH:17:0.8': 1.2644,
+ 'SH:17:0.9': 1.4359,
+ 'SH:18:0.1': 0.0581,
+ 'SH:18:0.2': 0.2354,
+ 'SH:18:0.3': 0.4135,
+ 'SH:18:0.4': 0.5853,
+ 'SH:18:0.5': 0.7605,
+ 'SH:18:0.6': 0.9309,
+ 'SH:18:0.7': 1.1011,
+ 'SH:18:0.8': 1.2736,
+ 'SH:18:0.9': 1.4445,
+ 'SH:19:0.1': 0.0639,
+ 'SH:19:0.2': 0.2447,
+ 'SH:19:0.3': 0.4221,
+ 'SH:19:0.4': 0.5933,
+ 'SH:19:0.5': 0.7672,
+ 'SH:19:0.6': 0.9371,
+ 'SH:19:0.7': 1.1074,
+ 'SH:19:0.8': 1.2807,
+ 'SH:19:0.9': 1.4528,
+ 'SH:20:0.1': 0.0705,
+ 'SH:20:0.2': 0.2523,
+ 'SH:20:0.3': 0.4292,
+ 'SH:20:0.4': 0.6004,
+ 'SH:20:0.5': 0.7718,
+ 'SH:20:0.6': 0.9441,
+ 'SH:20:0.7': 1.1155,
+ 'SH:20:0.8': 1.2893,
+ 'SH:20:0.9': 1.4579,
+ 'SH:21:0.1': 0.0754,
+ 'SH:21:0.2': 0.2593,
+ 'SH:21:0.3': 0.4347,
+ 'SH:21:0.4': 0.6064,
+ 'SH:21:0.5': 0.7784,
+ 'SH:21:0.6': 0.9505,
+ 'SH:21:0.7': 1.1206,
+ 'SH:21:0.8': 1.2943,
+ 'SH:21:0.9': 1.4633,
+ 'SH:22:0.1': 0.0804,
+ 'SH:22:0.2': 0.2619,
+ 'SH:22:0.3': 0.4388,
+ 'SH:22:0.4': 0.611,
+ 'SH:22:0.5': 0.7839,
+ 'SH:22:0.6': 0.9558,
+ 'SH:22:0.7': 1.1273,
+ 'SH:22:0.8': 1.2984,
+ 'SH:22:0.9': 1.4687,
+ 'SH:23:0.1': 0.0861,
+ 'SH:23:0.2': 0.2695,
+ 'SH:23:0.3': 0.4427,
+ 'SH:23:0.4': 0.6162,
+ 'SH:23:0.5': 0.7884,
+ 'SH:23:0.6': 0.9605,
+ 'SH:23:0.7': 1.1304,
+ 'SH:23:0.8': 1.3027,
+ 'SH:23:0.9': 1.4734,
+ 'SH:24:0.1': 0.0915,
+ 'SH:24:0.2': 0.2723,
+ 'SH:24:0.3': 0.4476,
+ 'SH:24:0.4': 0.6198,
+ 'SH:24:0.5': 0.7921,
+ 'SH:24:0.6': 0.9649,
+ 'SH:24:0.7': 1.1363,
+ 'SH:24:0.8': 1.3074,
+ 'SH:24:0.9': 1.4801,
+ 'SH:25:0.1': 0.0959,
+ 'SH:25:0.2': 0.2778,
+ 'SH:25:0.3': 0.4522,
+ 'SH:25:0.4': 0.6243,
+ 'SH:25:0.5': 0.7951,
+ 'SH:25:0.6': 0.9673,
+ 'SH:25:0.7': 1.1399,
+ 'SH:25:0.8': 1.3112,
+ 'SH:25:0.9': 1.4849,
+ 'SH:26:0.1': 0.1014,
+ 'SH:26:0.2': 0.2811,
+ 'SH:26:0.3': 0.4543,
+ 'SH:26:0.4': 0.6282,
+ 'SH:26:0.5': 0.7996,
+ 'SH:26:0.6': 0.9709,
+ 'SH:26:0.7': 1.1434,
+ 'SH:26:0.8': 1.317,
+ 'SH:26:0.9': 1.4878,
+ 'SH:27:0.1': 0.104,
+ 'SH:27:0.2': 0.2831,
+ 'SH:27:0.3': 0.4582,
+ 'SH:27:0.4': 0.6306,
+ 'SH:27:0.5': 0.8014,
+ 'SH:27:0.6': 0.9751,
+ 'SH:27:0.7': 1.1489,
+ 'SH:27:0.8': 1.3183,
+ 'SH:27:0.9': 1.4909,
+ 'SH:28:0.1': 0.1075,
+ 'SH:28:0.2': 0.2874,
+ 'SH:28:0.3': 0.4608,
+ 'SH:28:0.4': 0.6333,
+ 'SH:28:0.5': 0.8051,
+ 'SH:28:0.6': 0.9772,
+ 'SH:28:0.7': 1.1494,
+ 'SH:28:0.8': 1.3222,
+ 'SH:28:0.9': 1.4926,
+ 'SH:29:0.1': 0.1112,
+ 'SH:29:0.2': 0.2891,
+ 'SH:29:0.3': 0.4626,
+ 'SH:29:0.4': 0.6352,
+ 'SH:29:0.5': 0.8085,
+ 'SH:29:0.6': 0.9801,
+ 'SH:29:0.7': 1.1534,
+ 'SH:29:0.8': 1.3253,
+ 'SH:29:0.9': 1.4989,
+ 'SH:30:0.1': 0.1146,
+ 'SH:30:0.2': 0.2917,
+ 'SH:30:0.3': 0.4665,
+ 'SH:30:0.4': 0.6375,
+ 'SH:30:0.5': 0.8118,
+ 'SH:30:0.6': 0.9823,
+ 'SH:30:0.7': 1.1576,
+ 'SH:30:0.8': 1.3275,
+ 'SH:30:0.9': 1.5004,
+ 'SH:3:0.1': 0.0007,
+ 'SH:3:0.2': 0.0043,
+ 'SH:3:0.3': 0.0175,
+ 'SH:3:0.4': 0.0368,
+ 'SH:3:0.5': 0.066,
+ 'SH:3:0.6': 0.1087,
+ 'SH:3:0.7': 0.1784,
+ 'SH:3:0.8': 0.2647,
+ 'SH:3:0.9': 0.3883,
+ 'SH:4:0.1': 0.001,
+ 'SH:4:0.2': 0.0133,
+ 'SH:4:0.3': 0.0372,
+ 'SH:4:0.4': 0.0852,
+ 'SH:4:0.5': 0.1589,
+ 'SH:4:0.6': 0.2575,
+ 'SH:4:0.7': 0.3936,
+ 'SH:4:0.8': 0.5402,
+ 'SH:4:0.9': 0.7088,
+ 'SH:5:0.1': 0.0033,
+ 'SH:5:0.2': 0.0205,
+ 'SH:5:0.3': 0.069,
+ 'SH:5:0.4': 0.1524,
+ 'SH:5:0.5': 0.2746,
+ 'SH:5:0.6': 0.4118,
+ 'SH:5:0.7': 0.5697,
+ 'SH:5:0.8': 0.75,
+ 'SH:5:0.9': 0.9403,
+ 'SH:6:0.1': 0.0041,
+ 'SH:6:0.2': 0.0339,
+ 'SH:6:0.3': 0.1097,
+ 'SH:6:0.4': 0.2225,
+ 'SH:6:0.5': 0.3697,
+ 'SH:6:0.6': 0.5373,
+ 'SH:6:0.7': 0.7189,
+ 'SH:6:0.8': 0.8932,
+ 'SH:6:0.9': 1.0769,
+ 'SH:7:0.1': 0.007,
+ 'SH:7:0.2': 0.0519,
+ 'SH:7:0.3': 0.1477,
+ 'SH:7:0.4': 0.2962,
+ 'SH:7:0.5': 0.4586,
+ 'SH:7:0.6': 0.6364,
+ 'SH:7:0.7': 0.8187,
+ 'SH:7:0.8': 0.9923,
+ 'SH:7:0.9': 1.1677,
+ 'SH:8:0.1': 0.0092,
+ 'SH:8:0.2': 0.0678,
+ 'SH:8:0.3': 0.194,
+ 'SH:8:0.4': 0.3551,
+ 'SH:8:0.5': 0.5337,
+ 'SH:8:0.6': 0.7109,
+ 'SH:8:0.7': 0.8893,
+ 'SH:8:0.8': 1.059,
+ 'SH:8:0.9': 1.2349,
+ 'SH:9:0.1': 0.013,
+ 'SH:9:0.2': 0.0864,
+ 'SH:9:0.3': 0.2335,
+ 'SH:9:0.4': 0.4077,
+ 'SH:9:0.5': 0.5833,
+ 'SH:9:0.6': 0.7669,
+ 'SH:9:0.7': 0.9342,
+ 'SH:9:0.8': 1.1052,
+ 'SH:9:0.9': 1.2784}
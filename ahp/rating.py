@@ -0,0 +1,127 @@
+""" Rating scale of a final criterion (absolute measurement).
+
+Instead of comparing all the alternatives pairwise, the criterion's matrices compare a few rating intensities
+(e.g. excellent, good, poor). Each alternative is rated with an intensity, or with a raw numeric value normalized
+against the other raw values. The alternative's weight is the ideal priority of its rating - the best intensity
+has the priority 1 - so adding an alternative does not change the others' weights. Unrated alternatives get nan,
+they are not ranked.
+"""
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+BENEFIT = "benefit"  # raw value / max raw value
+COST = "cost"  # min raw value / raw value
+normalizations = [BENEFIT, COST]
+
+
+class RatingScale:
+    """ the rating intensities, their priorities and the alternatives' ratings """
+
+    def __init__(self, intensities, normalization=BENEFIT):
+        assert len(intensities) > 0, "No intensities specified"
+        assert len(set(intensities)) == len(intensities), "Intensities must be unique"
+        assert normalization in normalizations, "Invalid normalization"
+        self.intensities = list(intensities)
+        self.normalization = normalization
+        self.priorities = np.ones(len(self.intensities))  # ideal priorities of the intensities
+        self.ratings = {}  # alternative name -> intensity name or raw value
+
+    def __repr__(self):
+        return f"rating scale {self.intensities}"
+
+    def copy(self):
+        scale = RatingScale(self.intensities, self.normalization)
+        scale.priorities = self.priorities  # replaced, never changed in place
+        scale.ratings = dict(self.ratings)
+        return scale
+
+    def set_normalization(self, normalization):
+        """ the cost normalization divides by the raw values, they all have to be positive """
+        assert normalization in normalizations, f"Expected one of {normalizations}"
+        if normalization == COST:
+            assert all(isinstance(rating, str) or rating > 0 for rating in self.ratings.values()), \
+                "Raw values must be positive for the cost normalization"
+        self.normalization = normalization
+
+    def set_priorities(self, weights):
+        """
+        sets the intensities' priorities from their weights (ideal mode - divided by the max weight). An intensity
+        which is not compared yet (nan) keeps the priority nan, the others are divided by the max known weight
+        """
+        weights = np.asarray(weights, dtype=np.float64)
+        self.priorities = weights / np.nanmax(weights) if not np.isnan(weights).all() else weights
+
+    def rate(self, alternative, rating):
+        """ rates the alternative with an intensity name or a raw numeric value """
+        if rating not in self.intensities:
+            try:
+                rating = float(rating)
+            except ValueError:
+                raise ValueError(f"'{rating}' is not an intensity nor a number")
+            assert rating > 0 or (rating == 0 and self.normalization == BENEFIT), \
+                "Invalid raw value, it must be positive (or 0 for the benefit normalization)"
+        self.ratings[alternative] = rating
+
+    def remove(self, alternative):
+        self.ratings.pop(alternative, None)
+
+    def has_raw_values(self):
+        return any(not isinstance(rating, str) for rating in self.ratings.values())
+
+    def _raw_bound(self):
+        raw = [rating for rating in self.ratings.values() if not isinstance(rating, str)]
+        if not raw:
+            return None
+        return max(raw) if self.normalization == BENEFIT else min(raw)
+
+    def _score(self, rating, bound):
+        if rating is None:
+            return np.nan
+        if isinstance(rating, str):
+            return self.priorities[self.intensities.index(rating)]
+        if self.normalization == BENEFIT:
+            return rating / bound if bound else 0
+        return bound / rating
+
+    def score(self, alternative):
+        """ weight of a single alternative, O(1) unless it has a raw value (normalized by the others) """
+        rating = self.ratings.get(alternative)
+        return self._score(rating, self._raw_bound() if rating is not None and not isinstance(rating, str) else None)
+
+    def scores(self, alternatives):
+        """ weights of the alternatives with given names """
+        bound = self._raw_bound()
+        return np.array([self._score(self.ratings.get(name), bound) for name in alternatives], dtype=np.float64)
+
+    def as_dict(self):
+        return {'intensities': self.intensities, 'normalization': self.normalization, 'ratings': self.ratings}
+
+    @classmethod
+    def from_dict(cls, data):
+        scale = cls(data['intensities'], data['normalization'])
+        for alternative, rating in data['ratings'].items():
+            scale.rate(alternative, rating)
+        return scale
+
+    @classmethod
+    def from_node(cls, node):
+        """ reads the scale from the xml scale node """
+        scale = cls([intensity.get('name') for intensity in node.findall('intensity')],
+                    node.get('normalization', BENEFIT))
+        for rating in node.findall('rating'):
+            value = rating.get('intensity')
+            scale.rate(rating.get('alternative'), value if value is not None else rating.get('value'))
+        return scale
+
+    def create_node_at(self, node, criterion_name):
+        """ creates the scale node in the specified node of the etree """
+        scale_node = ET.SubElement(node, 'scale')
+        scale_node.set('for', criterion_name)
+        scale_node.set('normalization', self.normalization)
+        for intensity in self.intensities:
+            ET.SubElement(scale_node, 'intensity').set('name', intensity)
+        for alternative, rating in self.ratings.items():
+            rating_node = ET.SubElement(scale_node, 'rating')
+            rating_node.set('alternative', alternative)
+            rating_node.set('intensity' if isinstance(rating, str) else 'value', str(rating))
@@ -0,0 +1,76 @@
+""" The alternatives of an AHP model.
+
+All the final criteria compare the same alternatives, so a single registry is shared by the whole tree - it holds
+the only Alternative objects, which are the children of every final criterion. The alternatives' weights are kept
+by the final criteria as arrays in the registry order.
+"""
+import numpy as np
+
+from . import Alternative
+
+
+class AlternativeRegistry:
+    """ ordered alternatives with the name -> index lookup, iterates over the names """
+    __slots__ = ('items', '_indices', '_names')
+
+    def __init__(self, names=()):
+        self.items = []  # Alternative objects, shared as the children list of all final criteria
+        self._indices = {}  # name -> position in items
+        self._names = None  # cached names array
+        for name in names:
+            self.add(name)
+
+    @classmethod
+    def from_node(cls, node):
+        """ reads the names from the xml alternatives node """
+        return cls(alt_node.get('name') for alt_node in node)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.names())
+
+    def __contains__(self, name):
+        return name in self._indices
+
+    def __getitem__(self, idx):
+        return self.items[idx].name
+
+    def __repr__(self):
+        return repr(self.names())
+
+    def names(self):
+        return [alternative.name for alternative in self.items]
+
+    def names_array(self):
+        """ read only names array for fancy indexing along the weights arrays """
+        if self._names is None:
+            self._names = np.array(self.names(), dtype=object)
+            self._names.flags.writeable = False
+        return self._names
+
+    def index(self, name):
+        """ position of the alternative in the weights arrays or None if there is no such alternative """
+        return self._indices.get(name)
+
+    def add(self, name):
+        assert name not in self._indices, f"Alternative {name} already exists"
+        self._indices[name] = len(self.items)
+        self.items.append(Alternative(name))
+        self._names = None
+
+    def reset(self, names):
+        """ replaces the alternatives, keeps the items list shared by the final criteria """
+        self.items[:] = [Alternative(name) for name in names]
+        self._indices = {name: i for i, name in enumerate(names)}
+        self._names = None
+
+    def remove(self, name):
+        """ removes the alternative, returns its former position """
+        k = self._indices.pop(name)
+        del self.items[k]
+        self._names = None
+        for alternative in self.items[k:]:
+            self._indices[alternative.name] -= 1
+        return k
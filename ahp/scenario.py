@@ -0,0 +1,63 @@
+""" What-if scenarios: versions of a model forked from a base one and evaluated side by side.
+
+The forks share the unchanged matrices and weights with the base model and with each other (see snapshot.py), so
+a scenario costs only the arrays it has changed.
+"""
+import numpy as np
+
+from . import AHP
+
+BASE = "base"
+
+
+class Scenarios:
+    """ named forks of a base model """
+
+    def __init__(self, base):
+        self.models = {BASE: base}  # name -> AHP, in the order of creation
+
+    def __contains__(self, name):
+        return name in self.models
+
+    def __getitem__(self, name):
+        return self.models[name]
+
+    def names(self):
+        return list(self.models)
+
+    def fork(self, name, source=BASE):
+        """ creates the scenario name as a copy of the source scenario, returns its model """
+        assert name not in self.models, f"Scenario {name} already exists"
+        assert source in self.models, f"No scenario named {source}"
+        model = self.models[source].fork()
+        self.models[name] = model
+        return model
+
+    def add(self, name, snapshot):
+        """ creates the scenario name in the state of a snapshot, e.g. one from an undo history """
+        assert name not in self.models, f"Scenario {name} already exists"
+        self.models[name] = AHP.from_snapshot(snapshot)
+        return self.models[name]
+
+    def remove(self, name):
+        assert name != BASE, "Can not remove the base scenario"
+        del self.models[name]
+
+    def scores(self, names=None, criterion=None):
+        """
+        Overall scores (or the scores with respect to the criterion of given name) of the alternatives in all or
+        given scenarios. Returns the names of the alternatives of any of the scenarios and a (scenarios,
+        alternatives) array, nan where a scenario lacks the alternative
+        """
+        names = list(self.models) if names is None else names
+        results = []
+        for name in names:
+            model = self.models[name]
+            source = model.root_criterion if criterion is None else model.find_criterion(criterion)
+            results.append(source.get_all_scores() if source else (np.ones(0), np.ones(0, dtype=object)))
+        alternatives = list(dict.fromkeys(name for _, alt_names in results for name in alt_names))
+        column = {name: i for i, name in enumerate(alternatives)}
+        table = np.full((len(names), len(alternatives)), np.nan)
+        for row, (scores, alt_names) in enumerate(results):
+            table[row, [column[name] for name in alt_names]] = scores
+        return alternatives, table
@@ -0,0 +1,169 @@
+""" Immutable snapshots of an AHP model, the undo/redo history built on them.
+
+A snapshot is a tree of CriterionState objects holding the criteria's matrices, aggregated matrices and weights.
+Taking one copies no arrays: they are made read only and shared by the snapshot and the live model. The model
+copies an array before changing it in place (copy on write), so the unchanged arrays stay shared by all the
+versions - a snapshot costs a few small objects per criterion, whatever the sizes of the matrices. A recalculation
+(e.g. aggregating again, or weights from the result cache) creates new arrays with the same values, so the
+versions are compared by the values of the arrays which are not the same objects.
+"""
+import time
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+MAX_HISTORY = 100  # versions kept by the undo history
+
+
+def freeze(array):
+    """ makes the array read only, the model copies it before the next change, returns it """
+    array.flags.writeable = False
+    return array
+
+
+def same_array(a, b):
+    """ True if the arrays are the same object or hold the same values, the missing (nan) weights are equal """
+    return a is b or np.array_equal(a, b, equal_nan=True)
+
+
+def same_scale(a, b):
+    if a is None or b is None:
+        return a is b
+    return a.intensities == b.intensities and a.normalization == b.normalization and a.ratings == b.ratings
+
+
+class CriterionState:
+    """ state of a criterion and its subcriteria, the arrays are read only """
+    __slots__ = ('name', 'weight', 'is_final_criterion', 'calc_weight_method', 'has_custom_matrix', 'scale',
+                 'matrices', 'matrices_completion', 'triangle', 'weights', 'children')
+
+    def __init__(self, criterion, children):
+        self.name = criterion.name
+        self.weight = criterion.weight
+        self.is_final_criterion = criterion.is_final_criterion
+        self.calc_weight_method = criterion.calc_weight_method
+        self.has_custom_matrix = criterion.has_custom_matrix
+        self.scale = criterion.scale.copy() if criterion.scale else None
+        self.matrices = tuple(freeze(matrix) for matrix in criterion.matrices)
+        self.matrices_completion = tuple(criterion.matrices_completion)
+        self.triangle = freeze(criterion.triangle)
+        self.weights = freeze(criterion.weights)
+        self.children = children  # states of the subcriteria, empty for a final criterion
+
+    def same_as(self, other):
+        """
+        True if the subtree has not changed. An unchanged array is usually the same object (copy on write), the
+        values are compared only otherwise
+        """
+        return (self.name == other.name and self.calc_weight_method == other.calc_weight_method and
+                same_array(self.triangle, other.triangle) and same_array(self.weights, other.weights) and
+                len(self.matrices) == len(other.matrices) and
+                all(same_array(a, b) for a, b in zip(self.matrices, other.matrices)) and
+                same_scale(self.scale, other.scale) and len(self.children) == len(other.children) and
+                all(a.same_as(b) for a, b in zip(self.children, other.children)))
+
+
+class ModelSnapshot:
+    """ a version of an AHP model, restored with AHP.restore or forked with AHP.fork """
+
+    def __init__(self, ahp, label=''):
+        self.label = label  # what has been done just before the snapshot, shown by the history
+        self.time = time.time()
+        self.root = ahp.root_criterion.state()
+        self.alternatives = tuple(ahp.alternatives.names())
+        # extra attributes of the xml criterion nodes (e.g. the goal), for rebuilding the xml structure
+        self.attributes = {node.get('name'): dict(node.attrib) for node in ahp.tree.iter('criterion')}
+
+    def __repr__(self):
+        return f"snapshot '{self.label}'"
+
+    def same_as(self, other):
+        return self.alternatives == other.alternatives and self.root.same_as(other.root)
+
+    def criterion_node_at(self, parent_node, state=None):
+        """ creates the xml criterion nodes of the subtree in parent_node """
+        state = state or self.root
+        node = ET.SubElement(parent_node, 'criterion', self.attributes.get(state.name, {}))
+        node.set('name', state.name)
+        for child in state.children:
+            self.criterion_node_at(node, child)
+        return node
+
+    def alternatives_node_at(self, parent_node):
+        node = ET.SubElement(parent_node, 'alternatives')
+        for name in self.alternatives:
+            ET.SubElement(node, 'alternative').set('name', name)
+        return node
+
+    def to_tree(self, tree=None):
+        """
+        xml tree with the structure of the model and no matrices, they are written by save_to_file. Given a tree
+        (e.g. of the model's file), replaces its criteria and alternatives and drops its matrices and scales in
+        place - the other nodes and attributes are kept
+        """
+        if tree is None:
+            tree = ET.ElementTree(ET.Element('root'))
+        root = tree.getroot()
+        for tag, create in (('criterion', self.criterion_node_at), ('alternatives', self.alternatives_node_at)):
+            old = root.find(tag)
+            position = list(root).index(old) if old is not None else len(root)
+            if old is not None:
+                root.remove(old)
+            node = create(root)
+            root.remove(node)
+            root.insert(position, node)
+        data = root.find('data')
+        if data is None:
+            data = ET.SubElement(root, 'data')
+        for node in data.findall('matrix') + data.findall('scale'):
+            data.remove(node)
+        return tree
+
+
+class History:
+    """ undo/redo stack of the versions of a model, record() is called after every change """
+
+    def __init__(self, ahp, max_size=MAX_HISTORY):
+        self.ahp = ahp
+        self.max_size = max_size
+        self.versions = [ahp.snapshot('load')]
+        self.position = 0  # index of the current version
+
+    def record(self, label=''):
+        """
+        Stores the current state of the model as the newest version, the undone versions are dropped. Returns
+        False if nothing has changed since the current version
+        """
+        snapshot = self.ahp.snapshot(label)
+        if snapshot.same_as(self.versions[self.position]):
+            return False
+        del self.versions[self.position + 1:]
+        self.versions.append(snapshot)
+        if len(self.versions) > self.max_size:
+            del self.versions[0]
+        self.position = len(self.versions) - 1
+        return True
+
+    def can_undo(self):
+        return self.position > 0
+
+    def can_redo(self):
+        return self.position < len(self.versions) - 1
+
+    def undo(self):
+        """ restores the previous version, returns the label of the undone change """
+        assert self.can_undo(), "Nothing to undo"
+        label = self.versions[self.position].label
+        self.position -= 1
+        self.ahp.restore(self.versions[self.position])
+        return label
+
+    def redo(self):
+        """ restores the next version, returns the label of the redone change """
+        assert self.can_redo(), "Nothing to redo"
+        self.position += 1
+        self.ahp.restore(self.versions[self.position])
+        return self.versions[self.position].label
+
+    def labels(self):
+        return [snapshot.label for snapshot in self.versions]
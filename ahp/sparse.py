@@ -0,0 +1,201 @@
+""" Incomplete comparison matrices stored as an edge list of the known comparisons.
+
+Both weight calculation methods for incomplete matrices work on the graph of known comparisons:
+- EVM uses Harker's matrix B: the known values, 0 for missing ones and 1 + (missing comparisons in the row) on the
+  diagonal. The weights are its principal eigenvector
+- GMM (logarithmic least squares) solves L y = r, where L is the graph's Laplacian and r the row sums of log values.
+  The weights are exp(y)
+Small matrices are solved densely, large ones with matrix-free iterative solvers that cost O(known comparisons)
+per iteration instead of O(n^2). Items without any known comparison (e.g. a newly added alternative) are not
+compared yet: their weight is nan, the others are solved without them.
+
+The matrices themselves stay condensed triangles (see triangle.py) - the one format of the files, the snapshots,
+the journal and the store. So the graph of an aggregated matrix is built by one vectorized O(n^2) scan when the
+matrix is aggregated, and the cell edits then update its edge list in O(known comparisons), see with_values. The
+solvers work on the edge list only; what stays O(n^2) per edit is the memory of the triangles and the hash of the
+triangle keying the cached weights (see memo.py), both single passes over a float array.
+"""
+import logging
+
+import numpy as np
+
+from . import triangle
+from . import stats
+
+DENSE_MAX_SIZE = 50  # larger matrices are solved iteratively
+TOLERANCE = 1e-12
+MAX_ITERATIONS = 10000
+log = logging.getLogger('mylogger')
+
+
+class ComparisonGraph:
+    """
+    known comparisons of an n x n reciprocal matrix, value of edge k is a[rows[k], cols[k]], rows < cols.
+    positions are the edges' ascending positions in the condensed matrix, if the graph was built from one
+    """
+
+    def __init__(self, n, rows, cols, values, positions=None):
+        self.n = n
+        self.rows = rows
+        self.cols = cols
+        self.values = values
+        self.positions = positions
+        # known comparisons of each alternative (graph node degree)
+        self.degrees = np.bincount(rows, minlength=n) + np.bincount(cols, minlength=n)
+
+    @classmethod
+    def from_triangle(cls, condensed, n):
+        known = np.flatnonzero(condensed)
+        rows, cols = triangle.indices(n)
+        return cls(n, rows[known], cols[known], condensed[known], known)
+
+    def with_values(self, positions, values):
+        """
+        the graph with the condensed positions set to the values, 0 removes a comparison. Costs O(known
+        comparisons + changes) - the edge arrays are copied, not the triangle scanned
+        """
+        positions, first = np.unique(np.asarray(positions, dtype=np.intp)[::-1], return_index=True)
+        values = np.asarray(values, dtype=np.float64)[::-1][first]  # the last value of a position wins
+        at = np.searchsorted(self.positions, positions)
+        exists = at < len(self.positions)
+        exists[exists] = self.positions[at[exists]] == positions[exists]
+        kept_values = self.values.copy()
+        kept_values[at[exists]] = values[exists]
+        keep = np.ones(len(self.positions), dtype=bool)
+        keep[at[exists & (values == 0)]] = False
+        added = ~exists & (values != 0)
+        all_positions = np.concatenate([self.positions[keep], positions[added]])
+        order = np.argsort(all_positions, kind='stable')
+        all_positions = all_positions[order]
+        all_values = np.concatenate([kept_values[keep], values[added]])[order]
+        rows, cols = triangle.pairs(all_positions, self.n)
+        return ComparisonGraph(self.n, rows, cols, all_values, all_positions)
+
+    @classmethod
+    def from_matrix(cls, matrix, n=None):
+        """ accepts a dense or a condensed (then n is required) matrix """
+        matrix = np.asarray(matrix, dtype=np.float64)
+        if matrix.ndim == 2:
+            n = len(matrix)
+            matrix = triangle.condense(matrix)
+        return cls.from_triangle(matrix, n)
+
+    def __len__(self):
+        return len(self.values)
+
+    def harker_dot(self, w):
+        """ B.w for Harker's matrix B """
+        res = (self.n - self.degrees) * w  # diagonal = 1 + missing comparisons
+        res += np.bincount(self.rows, self.values * w[self.cols], minlength=self.n)
+        res += np.bincount(self.cols, w[self.rows] / self.values, minlength=self.n)
+        return res
+
+    def harker_matrix(self):
+        """ dense Harker's matrix """
+        b = np.zeros((self.n, self.n), dtype=np.float64)
+        b[self.rows, self.cols] = self.values
+        b[self.cols, self.rows] = 1 / self.values
+        b[np.diag_indices(self.n)] = self.n - self.degrees
+        return b
+
+    def _not_compared(self):
+        """ weights when nothing is compared - nan, unless there is a single item """
+        return np.full(self.n, 1.0 if self.n == 1 else np.nan)
+
+    def _without_isolated(self):
+        """ returns the graph of the items with at least one known comparison and their indices """
+        keep = np.flatnonzero(self.degrees)
+        new_index = np.full(self.n, -1)
+        new_index[keep] = np.arange(len(keep))
+        return ComparisonGraph(len(keep), new_index[self.rows], new_index[self.cols], self.values), keep
+
+    @stats.timed("harker_eigen")
+    def harker_eigen(self):
+        """ returns the principal eigenvalue and the normalized principal eigenvector of Harker's matrix """
+        if not len(self):
+            return self.n, self._not_compared()  # B = nI
+        if not self.degrees.all():
+            graph, keep = self._without_isolated()
+            lambda_max, sub_weights = graph.harker_eigen()
+            weights = np.full(self.n, np.nan)
+            weights[keep] = sub_weights
+            # the isolated items only add a constant to the other items' diagonal
+            return lambda_max + self.n - graph.n, weights
+        if self.n <= DENSE_MAX_SIZE:
+            stats.count(stats.EIGEN)
+            eigenvalues, eigenvectors = map(np.real, np.linalg.eig(self.harker_matrix()))
+            max_index = np.argmax(eigenvalues)
+            weights = eigenvectors[:, max_index]
+            return eigenvalues[max_index], weights / np.sum(weights)
+        # power iteration, B is non negative with a positive diagonal
+        stats.count("power iteration")
+        w = np.full(self.n, 1 / self.n)
+        lambda_max = 0
+        for _ in range(MAX_ITERATIONS):
+            bw = self.harker_dot(w)
+            lambda_max = np.sum(bw)  # w sums up to 1
+            new_w = bw / lambda_max
+            if np.max(np.abs(new_w - w)) < TOLERANCE:
+                return lambda_max, new_w
+            w = new_w
+        log.debug("Power iteration did not converge for a %d x %d matrix", self.n, self.n)
+        return lambda_max, w
+
+    def laplacian_dot(self, y):
+        """ L.y for the comparison graph's Laplacian L """
+        res = self.degrees * y
+        res -= np.bincount(self.rows, y[self.cols], minlength=self.n)
+        res -= np.bincount(self.cols, y[self.rows], minlength=self.n)
+        return res
+
+    def log_row_sums(self):
+        """ r[i] = sum of log(a[i, j]) over the known comparisons """
+        logs = np.log(self.values)
+        return np.bincount(self.rows, logs, minlength=self.n) - np.bincount(self.cols, logs, minlength=self.n)
+
+    @stats.timed("llsm_weights")
+    def llsm_weights(self):
+        """ logarithmic least squares weights - the geometric mean method for incomplete matrices """
+        if not len(self):
+            return self._not_compared()
+        if not self.degrees.all():
+            graph, keep = self._without_isolated()
+            weights = np.full(self.n, np.nan)
+            weights[keep] = graph.llsm_weights()
+            return weights
+        r = self.log_row_sums()
+        if self.n <= DENSE_MAX_SIZE:
+            # L + J is not singular for a connected graph and gives the solution with sum(y) = 0
+            b = np.ones((self.n, self.n), dtype=np.float64)
+            b[self.rows, self.cols] = 0
+            b[self.cols, self.rows] = 0
+            b[np.diag_indices(self.n)] = self.degrees + 1
+            y = np.linalg.solve(b, r)
+        else:
+            y = self._conjugate_gradient(r)
+        w = np.exp(y - np.max(y))
+        return w / np.sum(w)
+
+    def _conjugate_gradient(self, b):
+        """ solves L y = b with the Jacobi preconditioned conjugate gradient, b sums up to 0 """
+        y = np.zeros(self.n)
+        norm_b = np.linalg.norm(b)
+        if norm_b == 0:
+            return y
+        inv_diag = 1 / np.maximum(self.degrees, 1)
+        r = b.copy()
+        z = inv_diag * r
+        p = z.copy()
+        rz = r @ z
+        for _ in range(MAX_ITERATIONS):
+            lp = self.laplacian_dot(p)
+            alpha = rz / (p @ lp)
+            y += alpha * p
+            r -= alpha * lp
+            if np.linalg.norm(r) < TOLERANCE * norm_b:
+                break
+            z = inv_diag * r
+            rz_new = r @ z
+            p = z + (rz_new / rz) * p
+            rz = rz_new
+        return y
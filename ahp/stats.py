@@ -0,0 +1,61 @@
+""" Call counters and cumulative times of the hot paths, switchable at runtime.
+
+Disabled (the default unless AHP_STATS=1) the instrumented functions only check a flag. Enabled, every call of a
+timed function adds to its count and inclusive time (nested calls are included in the caller's time), count()
+adds to plain counters, e.g. the eigendecompositions. snapshot() returns the numbers as a JSON serializable dict.
+"""
+import functools
+import json
+import os
+import time
+
+EIGEN = "eigendecomposition"
+_enabled = os.environ.get("AHP_STATS") == "1"
+_counters = {}  # name -> [calls, seconds]
+
+
+def enable(on=True):
+    global _enabled
+    _enabled = on
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    _counters.clear()
+
+
+def count(name, n=1):
+    """ adds n to a counter without a time """
+    if _enabled:
+        _counters.setdefault(name, [0, 0.0])[0] += n
+
+
+def timed(name):
+    """ decorator counting the calls and the time of a function """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                counter = _counters.setdefault(name, [0, 0.0])
+                counter[0] += 1
+                counter[1] += time.perf_counter() - start
+        return wrapper
+    return decorator
+
+
+def snapshot():
+    """ {name: {'calls': n, 'seconds': t}} of everything counted since the last reset """
+    return {name: {'calls': calls, 'seconds': seconds} for name, (calls, seconds) in sorted(_counters.items())}
+
+
+def save(filename):
+    with open(filename, 'w') as f:
+        json.dump({'enabled': _enabled, 'counters': snapshot()}, f, indent=2)
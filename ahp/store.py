@@ -0,0 +1,290 @@
+""" SQLite store of many ranking studies.
+
+A study is a model: its criteria hierarchy, alternatives, experts and the experts' matrices, one row per criterion
+and expert with the condensed matrix as a float64 blob (see triangle.py). The ith matrix of a criterion belongs to
+the ith expert of the study, like the matrices loaded from the files of several experts.
+
+Loading a criterion reads only the rows of its subtree (a recursive query on the indexed parent column), so a
+query about a part of a large study does not read the rest. The changes of a loaded model are written by commit()
+in one transaction, only the rows of the changed matrices - they are found by comparing snapshots of the model
+(see snapshot.py). The matrices of an expert across all the studies are found with the expert index.
+"""
+import json
+import sqlite3
+import weakref
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from . import AHP
+from . import stats
+from .rating import RatingScale
+from .snapshot import same_array, same_scale
+from .journal import criteria_of, states_of
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS studies (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS criteria (
+    id INTEGER PRIMARY KEY,
+    study INTEGER NOT NULL REFERENCES studies (id) ON DELETE CASCADE,
+    parent INTEGER REFERENCES criteria (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    attributes TEXT NOT NULL,
+    scale TEXT,
+    UNIQUE (study, name)
+);
+CREATE INDEX IF NOT EXISTS criteria_parent ON criteria (parent, position);
+CREATE TABLE IF NOT EXISTS alternatives (
+    study INTEGER NOT NULL REFERENCES studies (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (study, position)
+);
+CREATE TABLE IF NOT EXISTS experts (
+    id INTEGER PRIMARY KEY,
+    study INTEGER NOT NULL REFERENCES studies (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    UNIQUE (study, position)
+);
+CREATE INDEX IF NOT EXISTS experts_name ON experts (name);
+CREATE TABLE IF NOT EXISTS matrices (
+    criterion INTEGER NOT NULL REFERENCES criteria (id) ON DELETE CASCADE,
+    expert INTEGER NOT NULL REFERENCES experts (id) ON DELETE CASCADE,
+    complete INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (criterion, expert)
+);
+CREATE INDEX IF NOT EXISTS matrices_expert ON matrices (expert);
+"""
+SUBTREE = """
+WITH RECURSIVE subtree (id, parent, position, name, attributes, scale) AS (
+    SELECT id, parent, position, name, attributes, scale FROM criteria WHERE study = ? AND {}
+    UNION ALL
+    SELECT c.id, c.parent, c.position, c.name, c.attributes, c.scale FROM criteria c JOIN subtree s ON c.parent = s.id
+)
+"""
+
+
+def expert_name(position):
+    return f"expert {position + 1}"
+
+
+def blob(matrix):
+    return np.ascontiguousarray(matrix, dtype=np.float64).tobytes()
+
+
+def from_blob(data):
+    return np.frombuffer(data, dtype=np.float64).copy()
+
+
+class Loaded:
+    """ what a model was loaded from, to commit its changes """
+
+    def __init__(self, study, experts, snapshot, partial):
+        self.study = study  # study id
+        self.experts = experts  # criterion name -> expert ids of its matrices
+        self.snapshot = snapshot  # the stored state
+        self.partial = partial  # True if only a subtree was loaded
+
+
+class ModelStore:
+    """ the studies in a SQLite database file """
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.execute("PRAGMA journal_mode = WAL")  # readers do not block the writer
+        self.connection.executescript(SCHEMA)
+        self._loaded = weakref.WeakKeyDictionary()  # AHP -> Loaded
+
+    def close(self):
+        self.connection.close()
+
+    def studies(self):
+        return [name for name, in self.connection.execute("SELECT name FROM studies ORDER BY name")]
+
+    def _study_id(self, study):
+        row = self.connection.execute("SELECT id FROM studies WHERE name = ?", (study,)).fetchone()
+        assert row, f"No study named {study}"
+        return row[0]
+
+    def import_xml(self, filename, study=None, experts=None):
+        """ stores the model of an xml file as a study (named after the file by default), returns the study name """
+        study = study or filename.replace('\\', '/').rsplit('/', 1)[-1].rsplit('.', 1)[0]
+        self.save(AHP(filename), study, experts)
+        return study
+
+    def export_xml(self, study, filename, compact=False):
+        self.load(study).save_to_file(filename, compact)
+
+    @stats.timed("store_save")
+    def save(self, ahp, study, experts=None):
+        """ stores the whole model as the study, replacing it. experts names the matrices in their order """
+        snapshot = ahp.snapshot('store')
+        with self.connection:
+            self.connection.execute("DELETE FROM studies WHERE name = ?", (study,))
+            study_id = self.connection.execute("INSERT INTO studies (name) VALUES (?)", (study,)).lastrowid
+            self.connection.executemany("INSERT INTO alternatives VALUES (?, ?, ?)",
+                                        [(study_id, i, name) for i, name in enumerate(snapshot.alternatives)])
+            count = max(len(state.matrices) for state in states_of(snapshot.root).values())
+            names = list(experts or []) + [expert_name(i) for i in range(len(experts or []), count)]
+            expert_ids = [self.connection.execute("INSERT INTO experts (study, position, name) VALUES (?, ?, ?)",
+                                                  (study_id, i, name)).lastrowid for i, name in enumerate(names)]
+            loaded = Loaded(study_id, {}, snapshot, False)
+            self._insert_criterion(snapshot, snapshot.root, study_id, None, 0, expert_ids, loaded)
+        self._loaded[ahp] = loaded
+
+    def _insert_criterion(self, snapshot, state, study_id, parent, position, expert_ids, loaded):
+        scale = json.dumps(state.scale.as_dict()) if state.scale else None
+        criterion_id = self.connection.execute(
+            "INSERT INTO criteria (study, parent, position, name, attributes, scale) VALUES (?, ?, ?, ?, ?, ?)",
+            (study_id, parent, position, state.name, json.dumps(snapshot.attributes.get(state.name, {})), scale)
+        ).lastrowid
+        self.connection.executemany("INSERT INTO matrices VALUES (?, ?, ?, ?)",
+                                    [(criterion_id, expert_ids[i], int(bool(complete)), blob(matrix))
+                                     for i, (matrix, complete) in
+                                     enumerate(zip(state.matrices, state.matrices_completion))])
+        loaded.experts[state.name] = expert_ids[:len(state.matrices)]
+        for i, child in enumerate(state.children):
+            self._insert_criterion(snapshot, child, study_id, criterion_id, i, expert_ids, loaded)
+
+    @stats.timed("store_load")
+    def load(self, study, criterion=None):
+        """ loads the study, or only the subtree of a criterion as a model with the criterion as its root """
+        study_id = self._study_id(study)
+        condition = "name = ?" if criterion is not None else "parent IS NULL"
+        args = (study_id, criterion) if criterion is not None else (study_id,)
+        rows = self.connection.execute(SUBTREE.format(condition) + "SELECT * FROM subtree", args).fetchall()
+        assert rows, f"No criterion named {criterion} in {study}"
+        matrices = {}  # criterion id -> [(expert id, complete, data)] in the experts' order
+        query = SUBTREE.format(condition) + """
+            SELECT m.criterion, m.expert, m.complete, m.data FROM matrices m
+            JOIN subtree s ON m.criterion = s.id JOIN experts e ON m.expert = e.id
+            ORDER BY m.criterion, e.position"""
+        for criterion_id, expert_id, complete, data in self.connection.execute(query, args):
+            matrices.setdefault(criterion_id, []).append((expert_id, complete, data))
+        alternatives = [name for name, in self.connection.execute(
+            "SELECT name FROM alternatives WHERE study = ? ORDER BY position", (study_id,))]
+
+        # the structure as an xml tree, the judgments are set afterwards
+        root = ET.Element('root')
+        nodes = {None: root}
+        children = {}  # parent id -> children rows, None is the parent of the loaded root
+        ids = {row[0] for row in rows}
+        for criterion_id, parent, position, name, attributes, scale in rows:
+            row = (position, criterion_id, name, attributes)
+            children.setdefault(parent if parent in ids else None, []).append(row)
+        self._criterion_nodes(children, None, nodes)
+        alternatives_node = ET.SubElement(root, 'alternatives')
+        for name in alternatives:
+            ET.SubElement(alternatives_node, 'alternative').set('name', name)
+        ET.SubElement(root, 'data')
+        ahp = AHP.from_tree(ET.ElementTree(root))
+
+        experts = {}
+        for criterion_id, parent, position, name, attributes, scale in rows:
+            stored = matrices.get(criterion_id, [])
+            experts[name] = [expert_id for expert_id, _, _ in stored]
+            if stored or scale:
+                ahp.find_criterion(name).set_judgments([from_blob(data) for _, _, data in stored],
+                                                       [bool(complete) for _, complete, _ in stored],
+                                                       RatingScale.from_dict(json.loads(scale)) if scale else None)
+        self._loaded[ahp] = Loaded(study_id, experts, ahp.snapshot('store'), criterion is not None)
+        return ahp
+
+    def _criterion_nodes(self, children, parent_id, nodes):
+        for position, criterion_id, name, attributes in sorted(children.get(parent_id, [])):
+            node = ET.SubElement(nodes[parent_id], 'criterion', json.loads(attributes))
+            node.set('name', name)
+            nodes[criterion_id] = node
+            self._criterion_nodes(children, criterion_id, nodes)
+
+    @stats.timed("store_commit")
+    def commit(self, ahp):
+        """
+        Writes the changes of a model loaded from (or saved to) the store in one transaction - only the rows of the
+        changed matrices, unless the hierarchy or the alternatives have changed and the whole study is written again.
+        Returns the number of written rows
+        """
+        loaded = self._loaded.get(ahp)
+        assert loaded, "The model was not loaded from this store"
+        snapshot = ahp.snapshot('store')
+        old = loaded.snapshot
+        if snapshot.alternatives != old.alternatives or criteria_of(snapshot.root) != criteria_of(old.root):
+            assert not loaded.partial, "Can not change the structure of a partially loaded study"
+            study, = self.connection.execute("SELECT name FROM studies WHERE id = ?", (loaded.study,)).fetchone()
+            experts = [name for name, in self.connection.execute(
+                "SELECT name FROM experts WHERE study = ? ORDER BY position", (loaded.study,))]
+            self.save(ahp, study, experts)
+            return sum(len(state.matrices) for state in states_of(snapshot.root).values())
+        changes = 0
+        old_states = states_of(old.root)
+        with self.connection:
+            for name, state in states_of(snapshot.root).items():
+                changes += self._commit_criterion(loaded, state, old_states[name])
+        loaded.snapshot = snapshot
+        return changes
+
+    def _commit_criterion(self, loaded, state, old):
+        criterion_id, = self.connection.execute("SELECT id FROM criteria WHERE study = ? AND name = ?",
+                                                (loaded.study, state.name)).fetchone()
+        changes = 0
+        if not same_scale(state.scale, old.scale):
+            scale = json.dumps(state.scale.as_dict()) if state.scale else None
+            self.connection.execute("UPDATE criteria SET scale = ? WHERE id = ?", (scale, criterion_id))
+            changes += 1
+        old_experts = loaded.experts[state.name]
+        # an unchanged matrix is the same object (copy on write), it keeps its expert even if its index changed
+        kept = {id(matrix): old_experts[i] for i, matrix in enumerate(old.matrices)}
+        used = {kept[id(matrix)] for matrix in state.matrices if id(matrix) in kept}
+        free = [expert for expert in old_experts if expert not in used]
+        experts = []
+        for i, (matrix, complete) in enumerate(zip(state.matrices, state.matrices_completion)):
+            if id(matrix) in kept:
+                experts.append(kept[id(matrix)])
+                continue
+            if i < len(old.matrices) and old_experts[i] in free and same_array(matrix, old.matrices[i]):
+                free.remove(old_experts[i])  # set again to the same values
+                experts.append(old_experts[i])
+                continue
+            expert = free.pop(0) if free else self._free_expert(loaded.study, old_experts + experts)
+            self.connection.execute("INSERT OR REPLACE INTO matrices VALUES (?, ?, ?, ?)",
+                                    (criterion_id, expert, int(bool(complete)), blob(matrix)))
+            experts.append(expert)
+            changes += 1
+        for expert in free:
+            self.connection.execute("DELETE FROM matrices WHERE criterion = ? AND expert = ?", (criterion_id, expert))
+            changes += 1
+        loaded.experts[state.name] = experts
+        return changes
+
+    def _free_expert(self, study_id, taken):
+        """ the first expert of the study without a matrix in taken, a new one if all have """
+        for expert_id, in self.connection.execute("SELECT id FROM experts WHERE study = ? ORDER BY position",
+                                                  (study_id,)):
+            if expert_id not in taken:
+                return expert_id
+        position, = self.connection.execute("SELECT COUNT(*) FROM experts WHERE study = ?", (study_id,)).fetchone()
+        return self.connection.execute("INSERT INTO experts (study, position, name) VALUES (?, ?, ?)",
+                                       (study_id, position, expert_name(position))).lastrowid
+
+    def matrices(self, study, criterion):
+        """ [(expert name, condensed matrix, complete)] of a criterion """
+        return [(expert, from_blob(data), bool(complete)) for expert, complete, data in self.connection.execute(
+            """SELECT e.name, m.complete, m.data FROM matrices m JOIN experts e ON m.expert = e.id
+               JOIN criteria c ON m.criterion = c.id WHERE c.study = ? AND c.name = ? ORDER BY e.position""",
+            (self._study_id(study), criterion))]
+
+    def matrices_by_expert(self, expert):
+        """ [(study, criterion, condensed matrix, complete)] of the expert of given name in all the studies """
+        return [(study, criterion, from_blob(data), bool(complete))
+                for study, criterion, complete, data in self.connection.execute(
+                    """SELECT s.name, c.name, m.complete, m.data FROM experts e JOIN matrices m ON m.expert = e.id
+                       JOIN criteria c ON m.criterion = c.id JOIN studies s ON e.study = s.id
+                       WHERE e.name = ? ORDER BY s.name, c.id""", (expert,))]
@@ -0,0 +1,130 @@
+""" Condensed storage of reciprocal comparison matrices.
+
+A reciprocal matrix is determined by its n(n-1)/2 values above the diagonal, which are stored row by row in a flat
+array - the same order as the values in the xml matrix node. 0 marks a missing comparison, in both triangles.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+RECIPROCITY = 0.01  # relative tolerance of a_ij * a_ji = 1 and of the scale range, the judgments are often rounded
+SCALE_MAX = 9  # the judgments are within [1 / SCALE_MAX, SCALE_MAX], 0 for a missing one
+
+
+def size(n):
+    """ length of the condensed triangle of an n x n matrix """
+    return n * (n - 1) // 2
+
+
+@lru_cache(maxsize=64)
+def indices(n):
+    """ (rows, cols) of the upper triangle values in the condensed order """
+    rows, cols = np.triu_indices(n, 1)
+    rows.flags.writeable = False
+    cols.flags.writeable = False
+    return rows, cols
+
+
+def index(row, col, n):
+    """ position of the (row, col) upper triangle value in the condensed triangle, row < col """
+    return row * n - row * (row + 1) // 2 + col - row - 1
+
+
+def pairs(positions, n):
+    """ (rows, cols) of condensed positions - the inverse of index, without the O(n^2) indices """
+    row = np.arange(n)
+    starts = index(row, row + 1, n)  # position of each row's first value
+    rows = np.searchsorted(starts, positions, side='right') - 1
+    return rows, positions - starts[rows] + rows + 1
+
+
+def value_at(triangle, row, col, n):
+    """ the (row, col) value of the dense reciprocal matrix, missing (0) values are 0 """
+    if row == col:
+        return 1.0
+    if row < col:
+        return float(triangle[index(row, col, n)])
+    value = triangle[index(col, row, n)]
+    return float(1 / value) if value else 0.0
+
+
+def ones(n):
+    return np.ones(size(n), dtype=np.float64)
+
+
+def condense(matrix):
+    """ returns the upper triangle of a dense matrix """
+    return matrix[indices(len(matrix))].astype(np.float64)
+
+
+def expand(triangle, n):
+    """ materializes the dense reciprocal matrix, missing (0) values stay 0 in both triangles """
+    matrix = np.ones((n, n), dtype=np.float64)
+    rows, cols = indices(n)
+    matrix[rows, cols] = triangle
+    with np.errstate(divide='ignore'):
+        matrix[cols, rows] = np.where(triangle != 0, 1 / triangle, 0)
+    return matrix
+
+
+def remove(triangle, n, k):
+    """ drops the kth row and column of an n x n matrix """
+    rows, cols = indices(n)
+    return triangle[(rows != k) & (cols != k)]
+
+
+def insert(triangle, n, k):
+    """ inserts a new kth row and column of missing (0) comparisons into an n x n matrix """
+    rows, cols = indices(n + 1)
+    res = np.zeros(size(n + 1), dtype=np.float64)
+    res[(rows != k) & (cols != k)] = triangle  # the row by row order of the other values does not change
+    return res
+
+
+def to_text(triangle):
+    """ the values as whitespace separated text, the compact xml form of a matrix """
+    return ' '.join(map(str, triangle.tolist()))
+
+
+def from_text(text, n):
+    """
+    condensed matrix of the compact xml form - the whitespace separated upper triangle (or whole matrix) row by
+    row. Negative values stand for the reciprocals, as in the value nodes. Raises ValueError if it is invalid: of a
+    wrong shape, not reciprocal or with a judgment out of the [1/9, 9] scale
+    """
+    values = np.array((text or '').split(), dtype=np.float64)
+    if len(values) not in (size(n), n * n):
+        raise ValueError(f"expected {size(n)} values of the upper triangle of a {n} x {n} matrix, got {len(values)}")
+    if not np.isfinite(values).all():
+        raise ValueError("the values have to be finite numbers")
+    negative = values < 0
+    values[negative] = -1 / values[negative]
+    present = values[values != 0]
+    if np.any((present < (1 - RECIPROCITY) / SCALE_MAX) | (present > SCALE_MAX * (1 + RECIPROCITY))):
+        raise ValueError(f"the judgments have to be within [1/{SCALE_MAX}, {SCALE_MAX}]")
+    if len(values) == size(n):
+        return values
+    matrix = values.reshape(n, n)
+    if not np.allclose(np.diagonal(matrix), 1):
+        raise ValueError("the diagonal has to be ones")
+    rows, cols = indices(n)
+    upper, lower = matrix[rows, cols], matrix[cols, rows]
+    known = (upper != 0) & (lower != 0)
+    if np.any((upper == 0) != (lower == 0)) or not np.allclose(upper[known] * lower[known], 1, rtol=RECIPROCITY):
+        raise ValueError("the matrix is not reciprocal")
+    return upper
+
+
+@lru_cache(maxsize=16)
+def triads(n):
+    """ (ij, jk, ik) condensed positions of the values of all the triads i < j < k, in the lexicographic order """
+    rows, cols = indices(n)
+    counts = n - 1 - cols  # k > j
+    i = np.repeat(rows, counts)
+    j = np.repeat(cols, counts)
+    starts = np.cumsum(counts) - counts
+    k = j + 1 + np.arange(np.sum(counts)) - np.repeat(starts, counts)
+    positions = index(i, j, n), index(j, k, n), index(i, k, n)
+    for array in positions:
+        array.flags.writeable = False
+    return positions
@@ -0,0 +1 @@
+""" Synthetic AHP models and the performance benchmarks of the ahp package, run with python -m benchmarks """
@@ -0,0 +1,45 @@
+""" python -m benchmarks [run | baseline | compare] """
+import argparse
+import json
+import sys
+
+from tabulate import tabulate
+
+from benchmarks import suite
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks of the ahp package")
+    parser.add_argument('command', choices=['run', 'baseline', 'compare'],
+                        help="run: print the timings, baseline: store them, compare: check them against a baseline")
+    parser.add_argument('--name', default=suite.DEFAULT_BASELINE, help="baseline name")
+    parser.add_argument('--quick', action='store_true', help="skip the slow cases")
+    parser.add_argument('--repeat', type=int, default=suite.REPEAT)
+    parser.add_argument('--threshold', type=float, default=suite.THRESHOLD, help="max slowdown ratio")
+    parser.add_argument('--output', help="also write the results to a JSON file")
+    args = parser.parse_args()
+
+    results = suite.run(args.quick, args.repeat)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.command == 'run':
+        rows = [(case, op, f"{seconds * 1000:.2f}") for case, ops in results.items() for op, seconds in ops.items()]
+        print(tabulate(rows, headers=["Case", "Operation", "ms"], tablefmt='simple'))
+    elif args.command == 'baseline':
+        suite.save_baseline(results, args.name)
+        print(f"Baseline saved to {suite.baseline_path(args.name)}")
+    else:
+        rows = suite.compare(results, suite.load_baseline(args.name))
+        print(tabulate([(case, op, f"{base * 1000:.2f}", f"{sec * 1000:.2f}", f"{ratio:.2f}")
+                        for case, op, base, sec, ratio in rows],
+                       headers=["Case", "Operation", "Baseline ms", "ms", "Ratio"], tablefmt='simple'))
+        slower = suite.regressions(rows, args.threshold)
+        if slower:
+            print(f"{len(slower)} operations slower than {args.threshold}x the baseline")
+            sys.exit(1)
+        print("No regressions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+""" Generates random, valid AHP models of any size.
+
+The criteria form a full tree of the given depth and branching factor, every criterion gets a matrix from each
+expert. An expert's matrix is a consistent matrix of random priorities perturbed by a log-normal noise, so the
+models have realistic inconsistencies. A ratio of the comparisons can be left out (incomplete matrices) - the
+comparisons of the neighbouring items are always kept, so the known comparisons stay connected.
+"""
+import argparse
+import io
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from ahp import AHP, triangle
+
+NOISE = 0.2  # sigma of the log-normal perturbation of the judgments
+
+
+def criterion_names(depth, branching):
+    """ {criterion name: [sub-criteria names]} of a full tree, the root is 'Goal' """
+    tree = {}
+    level = ['Goal']
+    for d in range(depth):
+        next_level = []
+        for name in level:
+            prefix = '' if name == 'Goal' else name + '.'
+            tree[name] = [f"{prefix}{i + 1}" if prefix else f"c{i + 1}" for i in range(branching)]
+            next_level += tree[name]
+        level = next_level
+    for name in level:
+        tree[name] = []
+    return tree
+
+
+def random_matrix(n, rng, incompleteness=0.0):
+    """ condensed matrix of a perturbed consistent matrix with values clipped to [1/9, 9], 0 for missing values """
+    priorities = rng.random(n) + 0.1
+    rows, cols = triangle.indices(n)
+    values = priorities[rows] / priorities[cols] * rng.lognormal(0, NOISE, len(rows))
+    values = np.round(np.clip(values, 1 / 9, 9), 4)
+    if incompleteness > 0:
+        missing = (rng.random(len(rows)) < incompleteness) & (cols != rows + 1)
+        values[missing] = 0
+    return values
+
+
+def generate_tree(depth=2, branching=3, alternatives=10, experts=1, incompleteness=0.0, seed=0, compact=False):
+    """ builds the xml ElementTree of a random model, compact=True writes the matrices as triangle nodes """
+    rng = np.random.default_rng(seed)
+    tree = criterion_names(depth, branching)
+    root = ET.Element('root')
+
+    def add_criterion(parent_node, name):
+        node = ET.SubElement(parent_node, 'criterion')
+        node.set('name', name)
+        for child in tree[name]:
+            add_criterion(node, child)
+
+    add_criterion(root, 'Goal')
+    alternatives_node = ET.SubElement(root, 'alternatives')
+    for i in range(alternatives):
+        ET.SubElement(alternatives_node, 'alternative').set('name', f"alt {i + 1}")
+    data = ET.SubElement(root, 'data')
+    for name, children in tree.items():
+        n = len(children) if children else alternatives
+        rows, cols = triangle.indices(n)
+        for expert in range(experts):
+            matrix = ET.SubElement(data, 'matrix')
+            matrix.set('for', name)
+            matrix.set('id', str(expert))
+            matrix.set('width', str(n))
+            matrix.set('height', str(n))
+            values = random_matrix(n, rng, incompleteness)
+            if compact:
+                ET.SubElement(matrix, 'triangle').text = triangle.to_text(values)
+                continue
+            for k in np.flatnonzero(values).tolist():
+                value = ET.SubElement(matrix, 'value')
+                value.set('x', str(cols[k]))
+                value.set('y', str(rows[k]))
+                value.text = str(values[k])
+    return ET.ElementTree(root)
+
+
+def generate_xml(**kwargs):
+    """ the xml bytes of a random model, see generate_tree for the arguments """
+    f = io.BytesIO()
+    generate_tree(**kwargs).write(f)
+    return f.getvalue()
+
+
+def generate_ahp(**kwargs):
+    """ builds the AHP object of a random model directly, without a file """
+    return AHP(io.BytesIO(generate_xml(**kwargs)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Writes a random AHP model to an xml file")
+    parser.add_argument('filename')
+    parser.add_argument('--depth', type=int, default=2)
+    parser.add_argument('--branching', type=int, default=3)
+    parser.add_argument('--alternatives', type=int, default=10)
+    parser.add_argument('--experts', type=int, default=1)
+    parser.add_argument('--incompleteness', type=float, default=0.0, help="ratio of missing comparisons")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--compact', action='store_true', help="a single node of values per matrix")
+    args = vars(parser.parse_args())
+    tree = generate_tree(**{key: value for key, value in args.items() if key != 'filename'})
+    ET.indent(tree, space="\t", level=0)
+    tree.write(args['filename'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+""" Timings of the main operations on synthetic models of growing sizes.
+
+Each case is a generated model, each operation is repeated and its best time is kept (the least disturbed run).
+The results are stored as JSON {case: {operation: seconds}}; regressions() reports the operations slower than a
+stored baseline by more than the threshold ratio. The result cache (see ahp/memo.py) is switched off for the
+timings, otherwise every repeat after the first one would time a cache lookup instead of the calculation.
+"""
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+
+from ahp import AHP, memo
+from ahp.criterion import EVM, GMM, SCI, SH
+from ahp.consistency import iterate_criteria
+from benchmarks.generator import generate_xml
+
+BASELINES_DIR = os.path.join(os.path.dirname(__file__), 'baselines')
+DEFAULT_BASELINE = 'default'
+THRESHOLD = 1.25  # slower than 125 % of the baseline is a regression
+MIN_DIFFERENCE = 0.001  # seconds, smaller slowdowns are timer noise
+REPEAT = 5
+# name -> generator arguments, the quick sweep skips the cases marked as slow
+CASES = {
+    'small': dict(depth=2, branching=3, alternatives=10, experts=1),
+    'deep': dict(depth=4, branching=3, alternatives=20, experts=2),
+    'wide': dict(depth=1, branching=8, alternatives=100, experts=3),
+    'incomplete': dict(depth=2, branching=4, alternatives=100, experts=2, incompleteness=0.5),
+    'catalogue': dict(depth=2, branching=5, alternatives=300, experts=1, incompleteness=0.7),
+}
+SLOW_CASES = {'catalogue'}
+
+
+def best_time(func, repeat=REPEAT):
+    """ the shortest of the repeated runs in seconds """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+@contextlib.contextmanager
+def memo_disabled():
+    """ switches the shared result cache off and empties it, restores its size afterwards """
+    max_bytes = memo.cache.max_bytes
+    memo.cache.resize(0)
+    try:
+        yield
+    finally:
+        memo.cache.resize(max_bytes)
+
+
+def calculate_all_weights(ahp, method):
+    for criterion in iterate_criteria(ahp.root_criterion):
+        criterion.calc_weight_method = method
+        criterion.calculate_weights(criterion.triangle, criterion.is_complete())
+        criterion.calc_weight_method = EVM
+
+
+def aggregate_all(ahp):
+    for criterion in iterate_criteria(ahp.root_criterion):
+        criterion.aggregate()
+
+
+def ic_all(ahp):
+    for criterion in iterate_criteria(ahp.root_criterion):
+        criterion.ic(SCI if criterion.is_complete() else SH)
+
+
+def run_case(name, repeat=REPEAT):
+    """ {operation: seconds} of a single case """
+    xml = generate_xml(**CASES[name])
+    compact_xml = generate_xml(compact=True, **CASES[name])
+    ahp = AHP(io.BytesIO(xml))
+    complete = 'complete' if all(c.is_complete() for c in iterate_criteria(ahp.root_criterion)) else 'incomplete'
+    ic_all(ahp)  # the random indices are estimated (and cached) once, outside of the timings
+    with tempfile.TemporaryDirectory() as tmp_dir, memo_disabled():
+        path = os.path.join(tmp_dir, 'model.xml')
+        return {
+            'load': best_time(lambda: AHP(io.BytesIO(xml)), repeat),
+            'load compact': best_time(lambda: AHP(io.BytesIO(compact_xml)), repeat),
+            'aggregate': best_time(lambda: aggregate_all(ahp), repeat),
+            f'weights {EVM} {complete}': best_time(lambda: calculate_all_weights(ahp, EVM), repeat),
+            f'weights {GMM} {complete}': best_time(lambda: calculate_all_weights(ahp, GMM), repeat),
+            'ic': best_time(lambda: ic_all(ahp), repeat),
+            'get_all_scores': best_time(ahp.root_criterion.get_all_scores, repeat),
+            'save_to_file': best_time(lambda: ahp.save_to_file(path), repeat),
+            'save_to_file compact': best_time(lambda: ahp.save_to_file(path, compact=True), repeat),
+        }
+
+
+def run(quick=False, repeat=REPEAT, log=print):
+    results = {}
+    for name in CASES:
+        if quick and name in SLOW_CASES:
+            continue
+        log(f"Running {name}: {CASES[name]}")
+        results[name] = run_case(name, repeat)
+    return results
+
+
+def baseline_path(name=DEFAULT_BASELINE):
+    return os.path.join(BASELINES_DIR, f"{name}.json")
+
+
+def save_baseline(results, name=DEFAULT_BASELINE):
+    os.makedirs(BASELINES_DIR, exist_ok=True)
+    with open(baseline_path(name), 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def load_baseline(name=DEFAULT_BASELINE):
+    with open(baseline_path(name)) as f:
+        return json.load(f)
+
+
+def compare(results, baseline):
+    """ returns [(case, operation, baseline seconds, seconds, ratio)] of all the operations found in both """
+    rows = []
+    for case, operations in results.items():
+        for operation, seconds in operations.items():
+            base = baseline.get(case, {}).get(operation)
+            if base:
+                rows.append((case, operation, base, seconds, seconds / base))
+    return rows
+
+
+def regressions(rows, threshold=THRESHOLD):
+    return [row for row in rows if row[4] > threshold and row[3] - row[2] > MIN_DIFFERENCE]
@@ -1,5 +1,12 @@
+import numpy as np
 from tabulate import tabulate
 from ahp.ahp import AHP
+from ahp import stats, memo
+from ahp.rating import BENEFIT, normalizations
+from ahp.consistency import WORST_TRIADS, REPAIR_SUGGESTIONS
+from ahp.snapshot import History
+from ahp.scenario import Scenarios, BASE
+from ahp.store import ModelStore
 
 
 def on_help(comm):
@@ -7,20 +14,40 @@ def on_help(comm):
                 ["show", "displays current AHP status and the selected criterion"],
                 ["select [criterion name]", "select criterion with specified name or None if it doesn't exist"],
                 ["scores ['all' | indices] sort?", "display chosen alternatives' scores at selected criterion"],
+                ["scores top k", "display the k best alternatives at selected criterion"],
+                ["export [filename]", "writes the scores at selected criterion split into the final criteria's contributions, and the global weights of the criteria, as .npz or CSV"],
                 ["change-matrix", "manually change matrix values at the selected criterion"],
+                ["change-matrix adaptive [k]", "asks only for comparisons needed for a stable top k order (default 3)"],
                 ["show-matrix", "display selected criterion's matrix"],
                 ["reset-matrix i", "set selected criterion's ith matrix to an identity matrix"],
                 ["remove-matrix i", "remove ith matrix of the selected criterion"],
-                ["save [filename]", "save the model with decision weights to the specified file"],
+                ["save [filename] compact?", "save the model with decision weights to the specified file, optionally with a single node of values per matrix"],
                 ["ic [SCI | GW | SH] ", "calculates criterion inconsistency using the specified method"],
+                ["ic-report [triads] [workers]", "inconsistency of every matrix below the selected criterion with the worst triads, optionally in a process pool"],
+                ["repair [count] [matrix index]", "judgments of the aggregated (or index-th) matrix to revisit to reduce the inconsistency"],
+                ["stats [on | off | reset | save filename]", "call counts and times of the calculations, switch the counting on or off, or save them as JSON"],
                 ["load-additional [filename]", "loads additional matrix from other expert"],
                 ["select-multiple [criterion name1] [criterion name2] ...", "multiple level criteria selection"],
+                ["rating-scale [intensity1] [intensity2] ... | off", "rate the alternatives of the selected final criterion with given intensities (best first) instead of comparing them"],
+                ["rating-normalization [benefit | cost]", "how raw rating values are normalized, divided by the max or dividing the min"],
+                ["rate [alternative name] [intensity | value]", "rates an alternative at the selected criterion"],
+                ["journal [compact | discard]", "unsaved changes are journaled next to the loaded file and recovered on load. Folds them into the file, or drops them and loads the file again"],
+                ["store list | import [db] [filenames...]", "lists the studies of a SQLite store or imports xml files into it"],
+                ["store load [db] [study] [criterion name]?", "loads a study, or only the subtree of a criterion, from a SQLite store"],
+                ["store save [db] [study]?", "writes the changed matrices of a loaded study, or the model as a new study"],
+                ["store export [db] [study] [filename]", "saves a study of a SQLite store as an xml file"],
+                ["undo / redo", "undoes or redoes the last change of the model"],
+                ["history", "lists the changes which can be undone and redone"],
+                ["scenario fork [name] [source]?", "copies the current (or source) scenario as a new what-if scenario and switches to it"],
+                ["scenario switch [name] | remove [name] | list", "switches between the scenarios, the loaded model is 'base'"],
+                ["scenario compare [criterion name]?", "scores of the alternatives in all the scenarios side by side"],
                 ["exit", "exits the program"]]
     print(tabulate(help_msg, headers=["Command", "Description"], tablefmt='simple'))
 
 
 EVM = "EVM"
 GMM = "GMM"
+NOT_RATED = "not rated"  # the score of an alternative which is not compared or rated yet (nan)
 
 
 class CLI:
@@ -31,7 +58,14 @@ class CLI:
         self.selected_criterion = None
         self.selected_multiple_criterion = []
         self.done = False
-        self.doesnt_need_ahp = ['help', 'exit', 'load']
+        self.doesnt_need_ahp = ['help', 'exit', 'load', 'stats', 'store']
+        # commands changing the model, recorded in the undo history
+        self.modifying = ['change-matrix', 'reset-matrix', 'remove-matrix', 'load-additional', 'rating-scale',
+                          'rating-normalization', 'rate']
+        self.scenarios = None
+        self.scenario = BASE  # name of the current scenario
+        self.histories = {}  # scenario name -> undo history
+        self.stores = {}  # database path -> ModelStore
         self.actions = {
             'load': self.on_load,
             'show': self.on_show,
@@ -42,9 +76,22 @@ class CLI:
             'reset-matrix': self.on_reset_matrix,
             'remove-matrix': self.on_remove_matrix,
             'save': self.on_save,
+            'export': self.on_export,
             'ic': self.on_ic,
+            'ic-report': self.on_ic_report,
+            'repair': self.on_repair,
+            'stats': self.on_stats,
             'load-additional': self.load_additional,
             'select-multiple': self.select_multiple,
+            'rating-scale': self.on_rating_scale,
+            'rating-normalization': self.on_rating_normalization,
+            'rate': self.on_rate,
+            'undo': self.on_undo,
+            'redo': self.on_redo,
+            'history': self.on_history,
+            'journal': self.on_journal,
+            'store': self.on_store,
+            'scenario': self.on_scenario,
             'help': on_help,
         }
 
@@ -64,19 +111,191 @@ class CLI:
     def on_ic(self, *comm):
         assert len(comm) > 0, "No method specified"
         method = comm[0]
-        if self.selected_criterion.is_complete and method == "SH":
+        if self.selected_criterion.is_complete() and method == "SH":
             raise ValueError("Can not use SH method for a complete matrix")
-        if not self.selected_criterion.is_complete and method != "SH":
+        if not self.selected_criterion.is_complete() and method != "SH":
             raise ValueError("Must use SH method for an incomplete matrix")
         inc, inc_ratio = self.selected_criterion.ic(method)
         if inc:
             print(f"Inconsistency = {round(inc, 3)}")
             print(f"Inconsistency Ratio = {round(inc_ratio, 3)}")
 
+    def on_ic_report(self, *comm):
+        assert len(comm) <= 2, "Expected 'ic-report [triads] [workers]'"
+        triad_count, workers = list(map(int, comm)) + [WORST_TRIADS, None][len(comm):]
+        report = self.selected_criterion.consistency_report(triad_count, workers)
+        print(tabulate(report.rows(), headers=report.headers(), tablefmt='simple'))
+        for entry in report.worst():
+            if entry.triads:
+                triads = ', '.join(f"({i}, {j}, {k}) = {round(index, 3)}" for i, j, k, index in entry.triad_names())
+                print(f"{entry.criterion} {entry.label()}: {triads}")
+
+    def on_repair(self, *comm):
+        assert len(comm) <= 2, "Expected 'repair [count] [matrix index]'"
+        count = int(comm[0]) if comm else REPAIR_SUGGESTIONS
+        idx = self._validate_matrices_idx(comm[1]) if len(comm) > 1 else None
+        if len(comm) > 1 and idx is None:
+            return
+        names = self.selected_criterion.compared_names()
+        triads = self.selected_criterion.worst_triads(WORST_TRIADS, idx)
+        if not triads:
+            print("No inconsistent triads")
+            return
+        print("Worst triads: " + ', '.join(f"({names[i]}, {names[j]}, {names[k]}) = {round(index, 3)}"
+                                           for i, j, k, index in triads))
+        rows = [[names[row], names[col], round(value, 3), round(suggested, 3), round(improvement, 3)]
+                for row, col, value, suggested, improvement in self.selected_criterion.repair_suggestions(count, idx)]
+        print(tabulate(rows, headers=["Row", "Column", "Value", "Suggested", "Improvement"], tablefmt='simple'))
+
+    def on_stats(self, *comm):
+        if not comm:
+            if not stats.is_enabled():
+                print("Counting is off, use 'stats on'")
+            rows = [[name, counter['calls'], round(counter['seconds'] * 1000, 3) if counter['seconds'] else '']
+                    for name, counter in stats.snapshot().items()]
+            print(tabulate(rows, headers=["Name", "Calls", "ms"], tablefmt='simple'))
+            info = memo.cache.info()
+            print(f"Result cache: {info['entries']} entries, {info['bytes'] / 2 ** 20:.2f} of "
+                  f"{info['max_bytes'] / 2 ** 20:.0f} MB, {info['hits']} hits, {info['misses']} misses, "
+                  f"{info['evictions']} evictions")
+        elif comm[0] in ('on', 'off'):
+            stats.enable(comm[0] == 'on')
+            print(f"Counting is {comm[0]}")
+        elif comm[0] == 'reset':
+            stats.reset()
+        elif comm[0] == 'save' and len(comm) == 2:
+            stats.save(comm[1])
+            print("Stats saved to " + comm[1])
+        else:
+            raise ValueError("Expected 'stats [on | off | reset | save filename]'")
+
     def on_load(self, *comm):
         assert len(comm) == 1, "No filename specified"
-        self.ahp = AHP(comm[0])
+        self._set_model(AHP(comm[0], journal=True))
+        if self.ahp.journal.replayed:
+            print(f"Recovered {self.ahp.journal.replayed} unsaved changes, use 'journal discard' to drop them")
+
+    def _set_model(self, ahp):
+        self.ahp = ahp
         self.selected_criterion = self.ahp.root_criterion
+        self.scenarios = Scenarios(self.ahp)
+        self.scenario = BASE
+        self.histories = {BASE: History(self.ahp)}
+
+    @property
+    def history(self):
+        return self.histories[self.scenario]
+
+    def record(self, label):
+        """ adds the current state of the model to the undo history and to the journal if it has changed """
+        if self.ahp and self.history.record(label):
+            self.journal_changes()
+
+    def journal_changes(self):
+        if self.ahp.journal:
+            self.ahp.save()
+
+    def on_journal(self, *comm):
+        journal = self.ahp.journal
+        assert journal, "The current scenario has no journal"
+        if not comm:
+            print(f"Journal {journal.path}: {journal.size()} bytes")
+        elif comm == ('compact',):
+            journal.compact(wait=True)
+            print(f"Changes saved to {journal.base}")
+        elif comm == ('discard',):
+            journal.reset()
+            self.on_load(journal.base)
+            print("Unsaved changes dropped")
+        else:
+            raise ValueError("Expected 'journal [compact | discard]'")
+
+    def _reselect(self):
+        """ selects the criterion of the same name after the model was replaced or restored """
+        name = self.selected_criterion.name if self.selected_criterion else None
+        self.selected_criterion = self.ahp.find_criterion(name) or self.ahp.root_criterion
+        self.selected_multiple_criterion = []
+
+    def on_undo(self, *comm):
+        assert self.history.can_undo(), "Nothing to undo"
+        label = self.history.undo()
+        self.journal_changes()
+        self._reselect()
+        print(f"Undone '{label}'")
+
+    def on_redo(self, *comm):
+        assert self.history.can_redo(), "Nothing to redo"
+        label = self.history.redo()
+        self.journal_changes()
+        self._reselect()
+        print(f"Redone '{label}'")
+
+    def on_history(self, *comm):
+        for i, label in enumerate(self.history.labels()):
+            print(f"{'*' if i == self.history.position else ' '} {i}: {label}")
+
+    def on_scenario(self, *comm):
+        assert comm, "Expected 'scenario [fork | switch | remove | list | compare]'"
+        if comm[0] == 'fork':
+            assert len(comm) in (2, 3), "Expected 'scenario fork [name] [source]?'"
+            model = self.scenarios.fork(comm[1], comm[2] if len(comm) == 3 else self.scenario)
+            self.histories[comm[1]] = History(model)
+            self._switch(comm[1])
+        elif comm[0] == 'switch':
+            assert len(comm) == 2 and comm[1] in self.scenarios, f"Expected one of {self.scenarios.names()}"
+            self._switch(comm[1])
+        elif comm[0] == 'remove':
+            assert len(comm) == 2 and comm[1] in self.scenarios, f"Expected one of {self.scenarios.names()}"
+            assert comm[1] != self.scenario, "Can not remove the current scenario"
+            self.scenarios.remove(comm[1])
+            del self.histories[comm[1]]
+        elif comm[0] == 'list':
+            for name in self.scenarios.names():
+                print(f"{'*' if name == self.scenario else ' '} {name}")
+        elif comm[0] == 'compare':
+            names = self.scenarios.names()
+            alternatives, table = self.scenarios.scores(names, comm[1] if len(comm) > 1 else None)
+            rows = [[alternative] + [round(score, 3) if score == score else '' for score in table[:, i]]
+                    for i, alternative in enumerate(alternatives)]
+            print(tabulate(rows, headers=["Alternative"] + names, tablefmt='simple'))
+        else:
+            raise ValueError("Expected 'scenario [fork | switch | remove | list | compare]'")
+
+    def on_store(self, *comm):
+        assert len(comm) > 1, "Expected 'store [list | import | load | save | export] [db] ...'"
+        command, path, args = comm[0], comm[1], comm[2:]
+        if path not in self.stores:
+            self.stores[path] = ModelStore(path)
+        store = self.stores[path]
+        if command == 'list':
+            print('\n'.join(store.studies()))
+        elif command == 'import':
+            assert args, "No filenames specified"
+            for filename in args:
+                print(f"Imported {filename} as {store.import_xml(filename)}")
+        elif command == 'load':
+            assert len(args) in (1, 2), "Expected 'store load [db] [study] [criterion name]?'"
+            self._set_model(store.load(*args))
+            print(f"Loaded {' '.join(args)}")
+        elif command == 'save':
+            assert self.ahp, "No ahp loaded"
+            if args:
+                store.save(self.ahp, args[0])
+                print(f"Saved as {args[0]}")
+            else:
+                print(f"{store.commit(self.ahp)} rows written")
+        elif command == 'export':
+            assert len(args) == 2, "Expected 'store export [db] [study] [filename]'"
+            store.export_xml(*args)
+            print(f"Saved to {args[1]}")
+        else:
+            raise ValueError("Expected 'store [list | import | load | save | export] [db] ...'")
+
+    def _switch(self, name):
+        self.scenario = name
+        self.ahp = self.scenarios[name]
+        self._reselect()
+        print(f"Current scenario: {name}")
 
     def on_show(self, *comm):
         assert len(comm) == 0, "No arguments required"
@@ -91,10 +310,17 @@ class CLI:
         self.selected_criterion = self.ahp.find_criterion(comm[0])
         print(f"Selected criterion: {self.selected_criterion}")
 
-    def on_scores(self, *comm):  # TODO test this
+    def on_scores(self, *comm):
         try:
-            assert len(comm) > 1, "No option specified"
-            if comm[0] == 'all':
+            assert len(comm) > 0, "No option specified"
+            sort = comm[-1] == 'sort'
+            if sort:
+                comm = comm[:-1]
+            if comm[0] == 'top':
+                assert len(comm) == 2, "Expected 'scores top k'"
+                scores, names = self.selected_criterion.top_k(int(comm[1]))
+                sort = False  # already sorted
+            elif comm[0] == 'all':
                 scores, names = self.selected_criterion.get_all_scores()
             elif comm[0] == 'multiple':
                 if not self.selected_multiple_criterion:
@@ -105,27 +331,25 @@ class CLI:
                     for criterion in self.selected_multiple_criterion:
                         scores, names = criterion.get_all_scores()
                         scores_tab.append(scores)
-                    res = [0] * len(scores_tab[0])
-                    for i in range(0, len(scores_tab[0])):
-                        sm = 0
-                        for j in range(0, len(scores_tab)):
-                            sm += scores_tab[j][i]
-                        res[i] = sm / len(scores_tab)
-                    scores = res
+                    scores = np.mean(scores_tab, axis=0)
             else:
                 indices = list(map(int, comm[0:]))
                 scores, names = self.selected_criterion.get_scores_for(indices)
             res = zip(names, scores)
-            if len(comm) > 2 and comm[2] == 'sort':
-                res = sorted(res, reverse=True, key=lambda x: x[1])
-            print('\n'.join([f"{item[0]}: {round(item[1], 3)}" for item in res]))
+            if sort:  # the alternatives not rated yet (nan) last
+                res = sorted(res, reverse=True, key=lambda x: (x[1] == x[1], x[1] if x[1] == x[1] else 0))
+            print('\n'.join([f"{item[0]}: {round(item[1], 3) if item[1] == item[1] else NOT_RATED}" for item in res]))
         except IndexError as e:
-            raise ValueError("Expected 'score [all | indices | multiple] " + str(e))
+            raise ValueError("Expected 'scores [all | indices | multiple | top k] sort?' " + str(e))
 
     def on_change_matrix(self, *comm):
-        assert len(comm) == 0, "No arguments required"
+        assert len(comm) == 0 or comm[0] == 'adaptive', "Expected 'change-matrix [adaptive [k]]'"
         if self.selected_criterion:
-            matrix, is_complete = self.selected_criterion.input_matrix()
+            if comm:
+                top_k = int(comm[1]) if len(comm) > 1 else 3
+                matrix, is_complete = self.selected_criterion._input_matrix_adaptive(top_k)
+            else:
+                matrix, is_complete = self.selected_criterion._input_matrix()
             self.selected_criterion.add_matrix(matrix, is_complete)
         else:
             print("No criterion selected")
@@ -133,13 +357,33 @@ class CLI:
     def on_show_matrix(self, *comm):
         assert len(comm) == 0, "No arguments required"
         if self.selected_criterion:
-            name_labels = list(map(lambda x: x.name, self.selected_criterion.children))
+            name_labels = self.selected_criterion.compared_names()
             matrix = self.selected_criterion.matrix
             rows = [[name_labels[i]] + list(matrix[i]) for i in range(len(name_labels))]
             print(tabulate(rows, headers=name_labels, tablefmt='simple'))
         else:
             print("No criterion selected")
 
+    def on_rating_scale(self, *comm):
+        assert len(comm) > 0, "No intensities specified"
+        assert self.selected_criterion.is_final_criterion, "Only final criteria can be rated"
+        scale = self.selected_criterion.scale
+        if comm == ('off',):
+            self.selected_criterion.set_rating_scale(None)
+            print("Alternatives are compared pairwise")
+        else:
+            self.selected_criterion.set_rating_scale(list(comm), scale.normalization if scale else BENEFIT)
+            print(f"Alternatives are rated with {', '.join(comm)}. Compare the intensities with change-matrix")
+
+    def on_rating_normalization(self, *comm):
+        assert len(comm) == 1 and comm[0] in normalizations, f"Expected one of {normalizations}"
+        self.selected_criterion.set_rating_normalization(comm[0])
+
+    def on_rate(self, *comm):
+        assert len(comm) > 1, "Expected 'rate [alternative name] [intensity | value]'"
+        self.selected_criterion.rate(' '.join(comm[:-1]), comm[-1])
+        print(f"Rated {' '.join(comm[:-1])} with {comm[-1]}")
+
     def _validate_matrices_idx(self, arg):
         try:
             idx = int(arg)
@@ -153,7 +397,7 @@ class CLI:
         assert len(comm) > 0, "No index specified"
         if self.selected_criterion:
             idx = self._validate_matrices_idx(comm[0])
-            if not idx:
+            if idx is None:
                 return
             self.selected_criterion.reset_matrix(idx)
             print("Matrix has been reset")
@@ -164,7 +408,7 @@ class CLI:
         assert len(comm) > 0, 'No index specified'
         if self.selected_criterion:
             idx = self._validate_matrices_idx(comm[0])
-            if not idx:
+            if idx is None:
                 return
             self.selected_criterion.remove_matrix(idx)
             print("Matrix has been removed")
@@ -172,10 +416,17 @@ class CLI:
             print("No criterion selected")
 
     def on_save(self, *comm):
-        assert len(comm) == 1, "no filename specified"
-        self.ahp.save_decisions(comm[0])
+        assert len(comm) in (1, 2), "no filename specified"
+        assert len(comm) == 1 or comm[1] == 'compact', "Expected 'save [filename] compact?'"
+        self.ahp.save_to_file(comm[0], compact=len(comm) == 2 or None)
         print("Decisions saved successfully to " + comm[0])
 
+    def on_export(self, *comm):
+        assert len(comm) == 1, "no filename specified"
+        contributions = self.ahp.export_contributions(comm[0], self.selected_criterion)
+        print(f"Contributions of {len(contributions.criteria)} criteria to the scores of {len(contributions)} "
+              f"alternatives saved to {comm[0]}")
+
     def loop(self):
         while not self.done:
             comm = None
@@ -189,6 +440,8 @@ class CLI:
                     self.actions[comm[0]](*comm[1:])
                 except (AssertionError, ValueError) as e:
                     print(str(e))
+                if comm[0] in self.modifying:
+                    self.record(' '.join(comm))  # also after a failed command, it might have changed something
             elif comm[0] == 'exit':
                 self.done = True
             else:
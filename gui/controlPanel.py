@@ -1,23 +1,29 @@
 import logging
 import os
+from collections import deque
 from typing import Optional
 from pathlib import Path
 
 import numpy as np
+from kivy.clock import Clock
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.button import Button
-from kivy.uix.filechooser import FileChooserListView
 from kivy.uix.gridlayout import GridLayout
+from kivy.lang import Builder
 from kivy.uix.popup import Popup
 from kivy.uix.scrollview import ScrollView
 
 from cli import CLI
+from ahp import triangle
 from ahp.criterion import calc_weight_methods, ic_complete_methods, ic_incomplete_methods
+from ahp.events import MATRIX_CHANGED, WEIGHTS_CHANGED, STRUCTURE_CHANGED, ALTERNATIVES_CHANGED
 from gui.methodSelect import MethodSelect
 from gui.scoreDisplay import ScoreDisplay
 
 log = logging.getLogger('mylogger')
 MAX_OUTPUT_HEIGHT = 20
+MAX_SCORE_ROWS = 100  # larger models show only the best alternatives
+POPUPS_KV = "popups.kv"  # popup rules, loaded when the first popup is opened
 
 
 class MyButton(Button):
@@ -25,7 +31,9 @@ class MyButton(Button):
 
 
 class ChooseFilePopup(Popup):
-    pass
+    def __init__(self, **kwargs):
+        self.on_choose = kwargs.pop('on_choose')
+        super().__init__(**kwargs)
 
 
 class TextInputPopup(Popup):
@@ -35,10 +43,6 @@ class TextInputPopup(Popup):
         super().__init__(**kwargs)
 
 
-class MyFileChooser(FileChooserListView):
-    pass
-
-
 class OutputView(ScrollView):
     def __init__(self, **kwargs):
         text = kwargs.pop('text', '')
@@ -49,47 +53,106 @@ class OutputView(ScrollView):
         self.ids['label'].text = new_text
 
 
+class OutputHandler(logging.Handler):
+    """Keeps the last MAX_OUTPUT_HEIGHT log messages and shows them in the output view at most once per frame"""
+
+    def __init__(self, level=logging.INFO):
+        super().__init__(level)
+        self.output = None  # set once the output view is created
+        self.messages = deque(maxlen=MAX_OUTPUT_HEIGHT)
+        self._flush_trigger = Clock.create_trigger(lambda dt: self.flush())
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+        self._flush_trigger()
+
+    def flush(self):
+        if self.output and self.messages:
+            self.output.set_text('\n'.join(self.messages))
+
+
 class ControlPanel(BoxLayout):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         # all set in setup, sorry
-        self.addCriterionPopup = None
-        self.removeAlternativePopup = None
-        self.addAlternativePopup = None
-        self.rankingNameInputPopup = None
+        self.popups = {}  # created on first use
+        self.popup_factories = {}
         self.score_display = None
-        self.fileChoosePopup = None
         self.output = None  # log output label
         self.cli: Optional[CLI] = None
         self.on_change_ahp = None
-        self.on_edit_criterion = None
+        self.on_change_selection = None
+        self.request_update = Clock.create_trigger(lambda dt: self.update())  # coalesces the updates in a frame
+        self.last_change = None  # label of the last model change, recorded in the undo history once per frame
+        self.request_record = Clock.create_trigger(lambda dt: self.record())
         self.matrices_display = None
         self.on_change_ic_method = None
 
-        self.logs = []
+        self.log_handler = OutputHandler()
         log.setLevel(logging.INFO)
-        log.addFilter(self.update_output)
+        log.addHandler(self.log_handler)
 
     def update(self):
-        scores, names = self.cli.selected_criterion.get_all_scores()
+        if len(self.cli.ahp.alternatives) > MAX_SCORE_ROWS:
+            scores, names = self.cli.selected_criterion.top_k(MAX_SCORE_ROWS)
+        else:
+            scores, names = self.cli.selected_criterion.get_all_scores()
         self.score_display.update(scores, names, self.cli.selected_criterion.name)
 
+    def subscribe(self, events):
+        events.subscribe(self.on_model_change, WEIGHTS_CHANGED, STRUCTURE_CHANGED, ALTERNATIVES_CHANGED)
+        events.subscribe(self.on_edit, MATRIX_CHANGED, WEIGHTS_CHANGED, STRUCTURE_CHANGED, ALTERNATIVES_CHANGED)
+
+    def on_model_change(self, event):
+        """Scores depend on the weights of the selected criterion's subtree and on the alternatives"""
+        if event.criterion is None or event.criterion.is_descendant_of(self.cli.selected_criterion):
+            self.request_update()
+
+    def on_edit(self, event):
+        if not self.last_change:  # the first change names the frame's edit
+            where = event.criterion.name if event.criterion else 'model'
+            self.last_change = f"{event.type.replace('_', ' ')} at {where}"
+        self.request_record()
+
+    def record(self):
+        """Adds the changes of the last frame to the undo history, a restored version is not recorded again"""
+        self.request_record.cancel()
+        if self.last_change:
+            self.cli.record(self.last_change)
+            self.last_change = None
+
+    def undo(self, instance, redo=False):
+        if not self.cli.ahp:
+            log.error("No ahp loaded")
+            return
+        self.matrices_display.flush_edits()
+        self.record()
+        history = self.cli.history
+        if not (history.can_redo() if redo else history.can_undo()):
+            log.info(f"Nothing to {'redo' if redo else 'undo'}")
+            return
+        label = history.redo() if redo else history.undo()
+        self.cli.journal_changes()
+        self.last_change = None  # the restore's events
+        self.cli._reselect()
+        self.setup_score_display()  # the number of alternatives might have changed
+        self.on_change_selection()
+        log.info(f"# {'Redone' if redo else 'Undone'} '{label}'")
+
     def setup_score_display(self):
-        self.score_display.setup(len(self.cli.ahp.alternatives))
-
-    def update_output(self, record):
-        """Updates output label data each time something of level INFO or ERROR is logged"""
-        if self.output and record.levelname in ['INFO', 'ERROR']:
-            self.logs.append(record.msg)
-            if len(self.logs) > MAX_OUTPUT_HEIGHT:
-                self.logs = self.logs[-MAX_OUTPUT_HEIGHT:]
-            self.output.set_text('\n'.join(self.logs))
-            return True
-        return False
+        self.score_display.setup(min(len(self.cli.ahp.alternatives), MAX_SCORE_ROWS))
+
+    def get_popup(self, name):
+        """Returns the popup with given name, creating it on first use. Loads the popup rules if needed"""
+        if name not in self.popups:
+            if not self.popups:
+                Builder.load_file(POPUPS_KV)
+            self.popups[name] = self.popup_factories[name]()
+        return self.popups[name]
 
     def create_ahp(self):
-        self.rankingNameInputPopup.dismiss()
-        input = self.rankingNameInputPopup.ids['text_input'].text
+        self.get_popup('new_ranking').dismiss()
+        input = self.get_popup('new_ranking').ids['text_input'].text
         split = input.split()
         if not split:
             log.error("Invalid goal name")
@@ -117,7 +180,7 @@ class ControlPanel(BoxLayout):
         self.on_change_ahp()
 
     def modify_alternatives(self, remove=False):
-        popup = self.addAlternativePopup if not remove else self.removeAlternativePopup
+        popup = self.get_popup('add_alternative' if not remove else 'remove_alternative')
         popup.dismiss()
         if not self.cli.ahp:
             log.error("No ahp loaded")
@@ -125,21 +188,20 @@ class ControlPanel(BoxLayout):
         name = popup.ids['text_input'].text
         popup.ids['text_input'].text = ""  # clear input
         if len(name) > 0:
-            log.info("All matrices dependent on alternatives will be removed")
             if not remove:
                 res = self.cli.ahp.add_alternative(name)
             else:
                 res = self.cli.ahp.remove_alternative(name)
             if res:
-                self.on_edit_criterion()
-                log.info(f"Alternative {name} removed")
+                log.info(f"Alternative {name} removed" if remove else
+                         f"Alternative {name} added, its comparisons are missing")
             else:
-                log.error("Could not remove alternative " + name)
+                log.error(f"Could not {'remove' if remove else 'add'} alternative {name}")
         else:
             log.error("No name specified")
 
     def add_criterion(self):
-        popup = self.addCriterionPopup
+        popup = self.get_popup('add_criterion')
         popup.dismiss()
         if not self.cli.ahp:
             log.error("No ahp loaded")
@@ -147,9 +209,8 @@ class ControlPanel(BoxLayout):
         name = popup.ids['text_input'].text
         popup.ids['text_input'].text = ""  # clear input
         if len(name) > 0:
-            log.info("All matrices dependent on alternatives will be removed")
             self.cli.selected_criterion.add_subcriterion(name)
-            self.on_change_ahp()  # to update criterion select
+            log.info(f"Criterion {name} added, its comparisons are missing")
         else:
             log.error("No name specified")
 
@@ -163,43 +224,51 @@ class ControlPanel(BoxLayout):
         toSelectNext = self.cli.selected_criterion.parent
         self.cli.selected_criterion.remove()
         self.cli.selected_criterion = toSelectNext
-        self.on_change_ahp()  # to update criterion select
+        self.on_change_selection()
 
     def setup(self, **kwargs):
         """Creates the layout. Buttons, scores, method dropdowns and console log"""
         self.cli = kwargs['cli']
         self.matrices_display = kwargs['matrices_display']
         self.on_change_ahp = kwargs['on_change_ahp']
-        self.on_edit_criterion = kwargs['on_edit_criterion']
+        self.on_change_selection = kwargs['on_change_selection']
         self.on_change_ic_method = kwargs.pop('on_change_ic_method')
-        self.fileChoosePopup = ChooseFilePopup()
-        self.fileChoosePopup.on_choose = self.load_ahp
-        self.rankingNameInputPopup = TextInputPopup(label_text="Choose new ranking's filename:",
-                                                    on_choose=self.create_ahp)
-        self.addAlternativePopup = TextInputPopup(label_text="What is the new alternatives name?",
-                                                  on_choose=self.modify_alternatives)
-        self.removeAlternativePopup = TextInputPopup(
-            label_text="What is the name of the alternative you want to remove?",
-            on_choose=lambda: self.modify_alternatives(True))
-        self.addCriterionPopup = TextInputPopup(label_text="Choose new criterion's name?",
-                                                on_choose=self.add_criterion)
-        self.chooseSaveNamePopup = TextInputPopup(
-            label_text="Choose filename to save to. Leave blank to overwrite the previously loaded file.",
-            on_choose=self.save_all)
+        # the popups (and the file chooser scanning the filesystem) are created when first opened
+        self.popup_factories = {
+            'load': lambda: ChooseFilePopup(on_choose=self.load_ahp),
+            'new_ranking': lambda: TextInputPopup(label_text="Choose new ranking's filename:",
+                                                  on_choose=self.create_ahp),
+            'add_alternative': lambda: TextInputPopup(label_text="What is the new alternatives name?",
+                                                      on_choose=self.modify_alternatives),
+            'remove_alternative': lambda: TextInputPopup(
+                label_text="What is the name of the alternative you want to remove?",
+                on_choose=lambda: self.modify_alternatives(True)),
+            'add_criterion': lambda: TextInputPopup(label_text="Choose new criterion's name?",
+                                                    on_choose=self.add_criterion),
+            'save': lambda: TextInputPopup(
+                label_text="Choose filename to save to. Leave blank to overwrite the previously loaded file.",
+                on_choose=self.save_all)
+        }
+
+        def open_popup(name):
+            return lambda instance: self.get_popup(name).open()
 
         cont = GridLayout(cols=3)
         cont.size_hint_y = 0.7
-        btns = [MyButton(text="Load ranking", on_press=self.fileChoosePopup.open),
-                MyButton(text="New ranking", on_press=self.rankingNameInputPopup.open),
+        btns = [MyButton(text="Load ranking", on_press=open_popup('load')),
+                MyButton(text="New ranking", on_press=open_popup('new_ranking')),
                 MyButton(text="Apply matrix", on_press=self.apply_matrix),
                 MyButton(text="Add matrix", on_press=self.add_matrix),
                 MyButton(text="Remove matrix", on_press=self.remove_matrix),
                 MyButton(text="Reset matrix", on_press=self.reset_matrix),
-                MyButton(text="Add alternative", on_press=self.addAlternativePopup.open),
-                MyButton(text="Erase alternative", on_press=self.removeAlternativePopup.open),
-                MyButton(text="Add criterion", on_press=self.addCriterionPopup.open),
+                MyButton(text="Add alternative", on_press=open_popup('add_alternative')),
+                MyButton(text="Erase alternative", on_press=open_popup('remove_alternative')),
+                MyButton(text="Add criterion", on_press=open_popup('add_criterion')),
                 MyButton(text="Remove criterion", on_press=self.remove_criterion),
-                MyButton(text="Save to file", on_press=self.chooseSaveNamePopup.open)
+                MyButton(text="Save to file", on_press=open_popup('save')),
+                MyButton(text="Live preview: on", on_press=self.toggle_live_preview),
+                MyButton(text="Undo", on_press=self.undo),
+                MyButton(text="Redo", on_press=lambda instance: self.undo(instance, redo=True))
                 ]
         for btn in btns:
             cont.add_widget(btn)
@@ -221,19 +290,25 @@ class ControlPanel(BoxLayout):
         output = BoxLayout()
         self.output = OutputView(text="Log console:")
         output.add_widget(self.output)
+        self.log_handler.output = self.output
+        self.log_handler.flush()
         self.add_widget(output)
 
     def on_change_calc_weight_method(self, new_method):
         if self.cli.ahp:
             self.cli.ahp.set_all_calc_weight_method(new_method)
-            self.update()
+
+    def toggle_live_preview(self, instance):
+        self.matrices_display.live_preview = not self.matrices_display.live_preview
+        instance.text = f"Live preview: {'on' if self.matrices_display.live_preview else 'off'}"
+        log.info(f"# Live preview turned {'on' if self.matrices_display.live_preview else 'off'}")
 
     def save_all(self):
         if not self.cli.ahp:
             log.error("No ahp loaded")
             return
-        self.chooseSaveNamePopup.dismiss()
-        text = self.chooseSaveNamePopup.ids['text_input'].text
+        self.get_popup('save').dismiss()
+        text = self.get_popup('save').ids['text_input'].text
         filename = self.cli.ahp.filename if not text else text
         if not filename.endswith('.xml'):
             filename += ".xml"
@@ -243,8 +318,8 @@ class ControlPanel(BoxLayout):
         log.info(f"Ranking saved successfully to '{filename}'")
 
     def load_ahp(self):
-        self.fileChoosePopup.dismiss()
-        fc = self.fileChoosePopup.ids['filechooser']
+        self.get_popup('load').dismiss()
+        fc = self.get_popup('load').ids['filechooser']
         if not fc.selection:
             log.error("Loading unsuccessful - no file selected")
             return
@@ -278,9 +353,8 @@ class ControlPanel(BoxLayout):
                 values[i] = -(1 / val)
             if val == 0:
                 is_complete = False
-        matrix = np.reshape(values, self.cli.selected_criterion.matrix.shape)
+        matrix = np.reshape(values, (self.cli.selected_criterion.size,) * 2)
         self.cli.selected_criterion.set_matrix(int(curr_idx) - 1, matrix, is_complete)
-        self.on_edit_criterion()
 
     def remove_matrix(self, instance):
         if self.cli.ahp:
@@ -291,16 +365,14 @@ class ControlPanel(BoxLayout):
             else:
                 self.cli.selected_criterion.remove_matrix(int(curr_idx) - 1)
                 log.info("# Matrix removed successfully")
-                self.on_edit_criterion()
         else:
             log.info("No loaded ahp")
 
     def add_matrix(self, instance):
         if self.cli.selected_criterion:
-            new_matrix = np.ones(self.cli.selected_criterion.matrix.shape)
+            new_matrix = triangle.ones(self.cli.selected_criterion.size)
             # this matrix is complete
             self.cli.selected_criterion.add_matrix(new_matrix, True)
-            self.on_edit_criterion()
         else:
             log.info("No loaded ahp")
 
@@ -313,4 +385,3 @@ class ControlPanel(BoxLayout):
             log.info("Can not reset the aggregated matrix")
             return
         self.cli.selected_criterion.reset_matrix(int(curr_idx) - 1)
-        self.on_edit_criterion()
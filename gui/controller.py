@@ -1,15 +1,10 @@
 from kivy.clock import Clock
-from kivy.config import Config
-
-Config.set('graphics', 'width', '1200')
-Config.set('graphics', 'height', '600')
-Config.set('input', 'mouse', 'mouse,multitouch_on_demand')
-Config.write()
-
 import kivy
+import startup
 from cli import CLI
 import os
 from ahp.criterion import ic_complete_methods
+from ahp.events import MATRIX_CHANGED, STRUCTURE_CHANGED, ALTERNATIVES_CHANGED
 
 kivy.require('2.0.0')
 
@@ -18,6 +13,7 @@ from kivy.properties import StringProperty
 import logging
 
 log = logging.getLogger('mylogger')
+ESTIMATE_POLL = 0.5  # seconds between the checks of a random index estimated in the background
 
 
 class Controller(BoxLayout):
@@ -27,6 +23,7 @@ class Controller(BoxLayout):
         self.cli = CLI()
         self.ic_method = ic_complete_methods[0]
         super().__init__(**kwargs)
+        self._ic_trigger = Clock.create_trigger(lambda dt: self.update_inconsistency())
         Clock.schedule_once(lambda x: self.setup(), 0.1)
 
     def setup(self):
@@ -40,31 +37,41 @@ class Controller(BoxLayout):
         self.ids['control_panel'].setup(
             cli=self.cli,
             on_change_ahp=self.on_change_ahp,
-            on_edit_criterion=self.on_edit_criterion,
+            on_change_selection=self.on_change_selection,
             matrices_display=self.ids['matrices_display'],
             on_change_ic_method=self.on_change_ic_method
         )
         if self.cli.ahp:
             self.ids['criterion_select'].update(self.cli.selected_criterion.name)
             self.update_inconsistency()
-
-    def on_edit_criterion(self):
-        self.ids['matrices_display'].update()
-        self.ids['control_panel'].update()
-        self.update_inconsistency()
-
-    def on_change_matrices(self):
-        self.ids['criterion_select'].update(self.cli.selected_criterion.name)
-        self.ids['matrices_display'].update()
-        self.ids['control_panel'].update()
+        startup.mark("Controls ready")
+        startup.report()
 
     def on_change_ahp(self):
+        """Called after a new ahp has been loaded. Subscribes the widgets to its change events"""
+        events = self.cli.ahp.events
+        events.subscribe(self.on_model_change, MATRIX_CHANGED, STRUCTURE_CHANGED, ALTERNATIVES_CHANGED)
+        self.ids['criterion_select'].subscribe(events)
+        self.ids['matrices_display'].subscribe(events)
+        self.ids['control_panel'].subscribe(events)
         self.ids['matrices_display'].update()
         self.ids['criterion_select'].update(self.cli.selected_criterion.name)
         self.ids['control_panel'].setup_score_display()  # let the score table know how many rows to make
         self.ids['control_panel'].update()
         self.update_inconsistency()
 
+    def on_change_selection(self):
+        """Refreshes everything that depends on the selected criterion"""
+        self.ids['matrices_display'].request_update()
+        self.ids['control_panel'].request_update()
+        self._ic_trigger()
+
+    def on_model_change(self, event):
+        """Recalculates the inconsistency only if the selected criterion's aggregated matrix has changed"""
+        selected = self.cli.selected_criterion
+        if event.criterion is selected or (event.type == ALTERNATIVES_CHANGED and selected.is_final_criterion):
+            self._ic_trigger()
+
     def on_change_ic_method(self, new_method):
         self.ic_method = new_method
         log.info(f'# Changed inconsistency calc method to {new_method}')
@@ -75,18 +82,21 @@ class Controller(BoxLayout):
         if self.cli.selected_criterion:
             if not self.cli.selected_criterion or self.cli.selected_criterion.name != criterion_name:
                 self.cli.on_select(criterion_name)
-                self.ids['matrices_display'].update()
-                self.ids['control_panel'].update()
-                self.update_inconsistency()
+                self.on_change_selection()
 
     def update_inconsistency(self):
         if not self.cli.ahp:
             return
-        ic, icr = self.cli.selected_criterion.ic(self.ic_method)
+        # a new random index is estimated in the background, the ratio is shown once it is ready
+        ic, icr = self.cli.selected_criterion.ic(self.ic_method, wait=False)
         if ic is None:
             log.error(f"Invalid method. Can not use {self.ic_method} with current matrices")
             self.inconsistency_text = f'Inconsistency = ?\n\n'
             self.inconsistency_text += f'Inconsistency ratio = ?'
             return
         self.inconsistency_text = f'Inconsistency = {"{:.5f}".format(ic)}\n\n'
+        if icr is None:
+            self.inconsistency_text += 'Inconsistency ratio = estimating...'
+            Clock.schedule_once(lambda dt: self._ic_trigger(), ESTIMATE_POLL)
+            return
         self.inconsistency_text += f'Inconsistency ratio = {"{:.5f}".format(icr)}'
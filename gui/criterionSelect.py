@@ -1,6 +1,9 @@
+from kivy.clock import Clock
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.treeview import TreeViewLabel, TreeView
 
+from ahp.events import STRUCTURE_CHANGED
+
 
 class CriterionSelect(BoxLayout):
     def __init__(self, **kwargs):
@@ -10,11 +13,15 @@ class CriterionSelect(BoxLayout):
         self.add_widget(self.tv)
         self.cli = None
         self.on_select_criterion = None
+        self._update_trigger = Clock.create_trigger(lambda dt: self.update(self.cli.selected_criterion.name))
 
     def setup(self, **kwargs):
         self.cli = kwargs['cli']
         self.on_select_criterion = kwargs['on_select_criterion']
 
+    def subscribe(self, events):
+        events.subscribe(lambda event: self._update_trigger(), STRUCTURE_CHANGED)
+
     def update(self, selected_name):
         if self.cli.ahp:
             for node in [i for i in self.tv.iterate_all_nodes()]:
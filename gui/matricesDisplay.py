@@ -1,16 +1,85 @@
+import time
+
+from kivy.clock import Clock
 from kivy.uix.tabbedpanel import TabbedPanelItem, TabbedPanel
+from ahp.events import MATRIX_CHANGED, STRUCTURE_CHANGED, ALTERNATIVES_CHANGED
+from ahp.consistency import KOCZKODAJ_THRESHOLD
 from gui.matrixEditor import MatrixEditor
 
+LIVE_PREVIEW_DELAY = 0.3  # seconds without a cell edit before the pending edits are applied
+FRAME_BUDGET = 1 / 60  # max seconds spent applying edits in a single frame
+HIGHLIGHTED_JUDGMENTS = 3  # judgments suggested for a revision in an inconsistent matrix
+
 
 class MatricesDisplay(TabbedPanel):
     def __init__(self, **kwargs):
-        self.on_matrix_edit = None
         super().__init__(**kwargs)
         self.cli = None
+        self.live_preview = True
+        self.aggr_editor = None
+        self.editors = {}  # matrix idx -> editor of the expert's matrix
+        self._pending_edits = {}  # (criterion, matrix idx) -> {(row, col): value}
+        self._apply_trigger = Clock.create_trigger(self.apply_pending_edits, LIVE_PREVIEW_DELAY)
+        self.request_update = Clock.create_trigger(lambda dt: self.update())  # coalesces the updates in a frame
 
     def setup(self, **kwargs):
         self.cli = kwargs['cli']
 
+    def subscribe(self, events):
+        events.subscribe(self.on_model_change, MATRIX_CHANGED, STRUCTURE_CHANGED, ALTERNATIVES_CHANGED)
+
+    def on_model_change(self, event):
+        selected = self.cli.selected_criterion
+        if event.type == ALTERNATIVES_CHANGED:
+            if selected.is_final_criterion:
+                self.request_update()
+        elif event.criterion is selected:
+            if 'cells' in event.details and self.aggr_editor:
+                # single cells edited in the editor - only the aggregated cells need to be displayed
+                for row, col in event.details['cells']:
+                    self.aggr_editor.set_value(row, col, selected.aggregated_value(row, col))
+                self.aggr_editor.highlight(self.suggested_cells(selected))
+                editor = self.editors.get(event.details['idx'])
+                if editor:
+                    editor.highlight(self.suggested_cells(selected, event.details['idx']))
+            else:
+                self.request_update()
+
+    def on_matrix_edit(self, idx, row, col, value):
+        """Called on every valid cell edit. Debounces the edits, so they are applied once the user stops typing"""
+        if not self.live_preview:
+            return
+        self._pending_edits.setdefault((self.cli.selected_criterion, idx), {})[(row, col)] = value
+        self._apply_trigger.cancel()  # restart the delay
+        self._apply_trigger()
+
+    def apply_pending_edits(self, dt):
+        """Applies the pending edits as single cell changes, leftovers are applied in the next frame"""
+        start = time.perf_counter()
+        while self._pending_edits and time.perf_counter() - start < FRAME_BUDGET:
+            (criterion, idx), cells = self._pending_edits.popitem()
+            if idx >= len(criterion.matrices):
+                continue  # matrix removed in the meantime
+            criterion.set_matrix_values(idx, [(row, col, value) for (row, col), value in cells.items()])
+        if self._pending_edits:
+            Clock.schedule_once(self.apply_pending_edits, 0)
+
+    def flush_edits(self):
+        """Applies all the pending edits at once, e.g. before an undo"""
+        self._apply_trigger.cancel()
+        while self._pending_edits:
+            (criterion, idx), cells = self._pending_edits.popitem()
+            if idx < len(criterion.matrices):
+                criterion.set_matrix_values(idx, [(row, col, value) for (row, col), value in cells.items()])
+
+    @staticmethod
+    def suggested_cells(criterion, idx=None):
+        """The judgments to revisit if the aggregated (or idx-th) matrix has a too inconsistent triad"""
+        triads = criterion.worst_triads(1, idx)
+        if not triads or triads[0][3] <= KOCZKODAJ_THRESHOLD:
+            return []
+        return [(row, col) for row, col, *_ in criterion.repair_suggestions(HIGHLIGHTED_JUDGMENTS, idx)]
+
     def update(self):  # TODO optimize update - cache matrix editors?
         if self.cli.ahp:
             prev_tab_name = self.current_tab._label.text
@@ -18,13 +87,18 @@ class MatricesDisplay(TabbedPanel):
             self.clear_tabs()
             panel_items = []
             aggr_panel = TabbedPanelItem(text="A")
-            aggr_panel.add_widget(MatrixEditor(idx=-1, children=selected.children, matrix=selected.matrix,
-                                               on_matrix_edit=self.on_matrix_edit))
+            self.aggr_editor = MatrixEditor(idx=-1, headers=selected.compared_names(), matrix=selected.matrix,
+                                            on_matrix_edit=self.on_matrix_edit,
+                                            highlights=self.suggested_cells(selected))
+            self.editors = {}
+            aggr_panel.add_widget(self.aggr_editor)
             panel_items.append(aggr_panel)
             for i, matrix in enumerate(self.cli.selected_criterion.matrices):
                 panel = TabbedPanelItem(text=f"{i + 1}")
-                panel.add_widget(MatrixEditor(idx=i, children=selected.children, matrix=selected.matrices[i],
-                                              on_matrix_edit=self.on_matrix_edit))
+                self.editors[i] = MatrixEditor(idx=i, headers=selected.compared_names(), matrix=selected.get_matrix(i),
+                                               on_matrix_edit=self.on_matrix_edit,
+                                               highlights=self.suggested_cells(selected, i))
+                panel.add_widget(self.editors[i])
                 panel_items.append(panel)
             for panel in panel_items:
                 self.add_widget(panel)
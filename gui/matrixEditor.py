@@ -2,6 +2,7 @@ from kivy.uix.gridlayout import GridLayout
 from kivy.uix.textinput import TextInput
 
 MAX_INP_LEN = 6  # max amount of characters in a matrix input field = input accuracy
+HIGHLIGHT_COLOR = 1, .55, .2, 1  # background of the judgments suggested for a revision
 
 
 class MatrixInput(TextInput):
@@ -20,6 +21,7 @@ class MatrixInput(TextInput):
         if self.readonly:
             self.background_color = .7, .7, .7, .2
             self.foreground_color = .75, .75, .75, 1
+        self.default_background = self.background_color
 
     def insert_text(self, diff, from_undo=False):
         diff = diff.replace("\n", "")
@@ -58,9 +60,10 @@ class MatrixInput(TextInput):
 class MatrixEditor(GridLayout):
     def __init__(self, **kwargs):
         self.matrix = kwargs.pop('matrix')
-        headers = kwargs.pop('children')
+        headers = kwargs.pop('headers')  # names of the compared items
         self.on_matrix_edit = kwargs.pop('on_matrix_edit')
         self.idx = kwargs.pop('idx')
+        highlights = kwargs.pop('highlights', ())
         self.cols = self.matrix.shape[1] + 1  # +1 for the headers
         super().__init__(**kwargs)
 
@@ -71,9 +74,9 @@ class MatrixEditor(GridLayout):
                 if y == 0 and x == 0:
                     inp = MatrixInput(text="", readonly=True, font_size="5sp")
                 elif y == 0:
-                    inp = MatrixInput(text=headers[x - 1].name, readonly=True, font_size="15sp", shortable=False)
+                    inp = MatrixInput(text=headers[x - 1], readonly=True, font_size="15sp", shortable=False)
                 elif x == 0:
-                    inp = MatrixInput(text=headers[y - 1].name, readonly=True, font_size="15sp", shortable=False)
+                    inp = MatrixInput(text=headers[y - 1], readonly=True, font_size="15sp", shortable=False)
                 else:
                     is_lower_triangle = y >= x
                     # if idx == -1, this matrix is the aggregated one - make is readonly
@@ -84,6 +87,8 @@ class MatrixEditor(GridLayout):
                                       )
                     self.inputs[str((x - 1, y - 1))] = inp
                 self.add_widget(inp)
+        self.highlighted = []
+        self.highlight(highlights)
 
     def on_input_change(self, inp_pos):
         if str(inp_pos) not in self.inputs:
@@ -100,3 +105,22 @@ class MatrixEditor(GridLayout):
             sym_input.text = str(-value)
         else:
             sym_input.text = str(1 / value)
+        if self.on_matrix_edit and self.idx != -1:
+            # negative values are the inverses of positive ones
+            self.on_matrix_edit(self.idx, inp_pos[1], inp_pos[0], -(1 / value) if value < 0 else value)
+
+    def highlight(self, cells):
+        """Highlights the (row, col) judgments and their symmetric cells, clears the previous highlights"""
+        for inp in self.highlighted:
+            inp.background_color = inp.default_background
+        self.highlighted = []
+        for row, col in cells:
+            for pos in ((col, row), (row, col)):
+                inp = self.inputs[str(pos)]
+                inp.background_color = HIGHLIGHT_COLOR
+                self.highlighted.append(inp)
+
+    def set_value(self, row, col, value):
+        """Updates the displayed value of a readonly matrix cell and its symmetric cell"""
+        self.inputs[str((col, row))].text = str(value)
+        self.inputs[str((row, col))].text = str(1 / value if value else 0)
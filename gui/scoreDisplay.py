@@ -2,6 +2,7 @@ from kivy.uix.label import Label
 from kivy.uix.scrollview import ScrollView
 
 SCORE_ACC = 6
+NOT_RATED = "not rated"  # the score of an alternative which is not compared or rated yet (nan)
 
 
 class ScoreDisplay(ScrollView):
@@ -39,7 +40,7 @@ class ScoreDisplay(ScrollView):
         self.labels[str((1, 0))].text = f"Score for {criterion_name}"
         for i, name in enumerate(names):
             self.labels[str((0, i + 1))].text = name
-            self.labels[str((1, i + 1))].text = str(scores[i])[:SCORE_ACC]
+            self.labels[str((1, i + 1))].text = str(scores[i])[:SCORE_ACC] if scores[i] == scores[i] else NOT_RATED
         # clear the additional labels (left after removal of alternatives)
         for y in range(len(names)+1, len(self.labels) // 2):
             self.labels[str((0, y))].text = ''
@@ -1,12 +1,22 @@
+import startup  # first, to measure the imports
 import os
 import sys
 import win32timezone  # for kivy filechooser
+from kivy.config import Config
+
+# set before any widget import creates the window. Not written to the config file to keep the startup fast
+Config.set('graphics', 'width', '1200')
+Config.set('graphics', 'height', '600')
+Config.set('input', 'mouse', 'mouse,multitouch_on_demand')
+
 import kivy
 from kivy.app import App
 from kivy.lang import Builder
 import logging
+startup.mark("Kivy imported")
 # important do not remove. Loads custom widgets
 import gui
+startup.mark("Widgets imported")
 
 log = logging.getLogger("mylogger")
 
@@ -21,12 +31,16 @@ class MainApp(App):
         except:
             pass
         self.root = Builder.load_file("layout.kv")
+        startup.mark("Layout built")
         return self.root
 
 
 def reset():
-    import kivy.core.window as window
+    """Reloads the window provider if an app has already been run in this interpreter (e.g. IDE console)"""
     from kivy.base import EventLoop
+    if EventLoop.status == 'idle':
+        return  # cold start - the provider is fresh, reloading it would create a second window
+    import kivy.core.window as window
     if not EventLoop.event_listeners:
         from kivy.cache import Cache
         window.Window = window.core_select_lib('window', window.window_impl, True)
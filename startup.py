@@ -0,0 +1,31 @@
+"""Measures the application startup. Imported first by main.py, so the times include the imports"""
+import logging
+import os
+import time
+
+log = logging.getLogger('mylogger')
+START = time.perf_counter()
+REPORT_ENV = "AHP_STARTUP_REPORT"  # set to 1 to log the report at the INFO level (shown in the log console)
+
+_marks = []
+_reported = False
+
+
+def mark(label):
+    """Records the time of a startup step"""
+    _marks.append((label, time.perf_counter()))
+
+
+def report():
+    """Logs the duration of each startup step. Only the first call has an effect"""
+    global _reported
+    if _reported:
+        return
+    _reported = True
+    lines = []
+    prev = START
+    for label, t in _marks:
+        lines.append(f"{label}: {(t - prev) * 1000:.0f} ms (total {(t - START) * 1000:.0f} ms)")
+        prev = t
+    level = logging.INFO if os.environ.get(REPORT_ENV) == "1" else logging.DEBUG
+    log.log(level, "Startup times:\n" + '\n'.join(lines))
@@ -0,0 +1,47 @@
+""" Shared fixtures of the tests, run with python -m pytest from the repository root """
+import os
+
+import numpy as np
+import pytest
+
+from ahp import AHP, triangle
+from ahp import random_index
+from ahp.journal import Journal
+
+XMLS = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'xmls')
+
+
+def xml_path(name):
+    return os.path.join(XMLS, name)
+
+
+def consistent_triangle(n, seed=0):
+    """ condensed matrix of a perfectly consistent matrix of random priorities """
+    priorities = np.random.default_rng(seed).random(n) + 0.1
+    rows, cols = triangle.indices(n)
+    return priorities[rows] / priorities[cols]
+
+
+def same_model(a, b):
+    """ no journal record changes one model into the other """
+    return Journal.records(a.snapshot(), b.snapshot()) == []
+
+
+@pytest.fixture(autouse=True, scope='session')
+def random_index_cache(tmp_path_factory):
+    """ the random indices estimated by the tests go to a temporary cache, not the user's one """
+    path = str(tmp_path_factory.mktemp('ri') / 'random_index.json')
+    previous = os.environ.get(random_index.CACHE_ENV)
+    os.environ[random_index.CACHE_ENV] = path
+    random_index._engine = None
+    yield path
+    random_index._engine = None
+    if previous is None:
+        del os.environ[random_index.CACHE_ENV]
+    else:
+        os.environ[random_index.CACHE_ENV] = previous
+
+
+@pytest.fixture
+def car_model():
+    return AHP(xml_path('car_selection.xml'))
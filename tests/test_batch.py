@@ -0,0 +1,67 @@
+import io
+import json
+import time
+
+from ahp import batch
+
+from .conftest import xml_path, XMLS
+
+
+def test_a_file_is_scored():
+    result = batch.score_file(xml_path('car_selection.xml'), top=2)
+    assert result['status'] == batch.OK and len(result['scores']) == 2
+    assert result['scores'][0][1] >= result['scores'][1][1] and result['max_cr'] > 0
+
+
+def test_a_broken_file_is_an_error(tmp_path):
+    path = tmp_path / 'broken.xml'
+    path.write_text('<root><criterion name="Goal">')
+    result = batch.score_file(str(path))
+    assert result['status'] == batch.ERROR and 'ValueError' in result['error']
+    assert batch.score_file(str(tmp_path / 'missing.xml'))['status'] == batch.ERROR
+
+
+SLOW = 'slow.xml'
+score_file = batch.score_file  # the forked workers see the patched batch.score_file
+
+
+def score_slowly(filename, top=None):
+    """ score_file of the workers, never ends for SLOW. Importable by the spawned workers too """
+    while filename == SLOW:
+        time.sleep(0.01)
+    return score_file(filename, top)
+
+
+def test_a_slow_file_times_out(monkeypatch):
+    monkeypatch.setattr(batch, 'score_file', score_slowly)
+    files = [xml_path('car_selection.xml'), SLOW, xml_path('phone.xml'), xml_path('data_cars.xml')]
+    results = []
+    start = time.perf_counter()
+    counts = batch.run(files, results.append, workers=2, timeout=2)
+    assert time.perf_counter() - start < 20
+    assert counts == {batch.OK: 3, batch.ERROR: 0, batch.TIMEOUT: 1}
+    assert [result['file'] for result in results if result['status'] == batch.TIMEOUT] == [SLOW]
+    assert sorted(result['file'] for result in results) == sorted(files)  # the others in flight are scored again
+    assert batch.score_isolated(SLOW, timeout=0.5)['status'] == batch.TIMEOUT
+
+
+def test_run_writes_every_file(tmp_path):
+    broken = tmp_path / 'broken.xml'
+    broken.write_text('not xml')
+    files = list(batch.expand([XMLS + '/car_*.xml', XMLS + '/phone.xml', str(broken)]))
+    assert files[0].endswith('car_selection.xml') and len(files) == 3
+    f = io.StringIO()
+    counts = batch.run(files, batch.JsonLinesWriter(f).write, workers=2, top=3)
+    results = [json.loads(line) for line in f.getvalue().splitlines()]
+    assert counts == {batch.OK: 2, batch.ERROR: 1, batch.TIMEOUT: 0}
+    assert sorted(result['file'] for result in results) == sorted(files)
+
+
+def test_csv_rows_per_alternative():
+    f = io.StringIO()
+    writer = batch.CsvWriter(f)
+    writer.write(batch.score_file(xml_path('car_selection.xml')))
+    writer.write({'file': 'broken.xml', 'status': batch.ERROR, 'error': 'ValueError: x', 'seconds': 0.0})
+    rows = f.getvalue().splitlines()
+    assert rows[0] == ','.join(batch.CSV_FIELDS) and len(rows) == 1 + 4 + 1
+    assert rows[1].split(',')[2:4] == ['1', 'Car 3']
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from ahp import triangle
+from ahp.consistency import (ConsistencyReport, SCI, GW, SH, harker_indices, saaty_indices, expand_batch,
+                             iterate_criteria, worst_triads, repair_suggestions)
+from ahp.sparse import ComparisonGraph
+
+from .conftest import consistent_triangle
+
+
+def test_the_report_matches_each_criterion(car_model):
+    report = ConsistencyReport(car_model.root_criterion)
+    aggregated = {entry.criterion: entry for entry in report if entry.matrix is None}
+    assert set(aggregated) == {node.name for node in iterate_criteria(car_model.root_criterion) if node.size >= 3}
+    for name, entry in aggregated.items():
+        criterion = car_model.find_criterion(name)
+        for method in ((SCI, GW) if criterion.is_complete() else (SH,)):
+            ci, ratio = criterion.ic(method)
+            assert entry.indices[method] == pytest.approx(ci) and entry.ratio(method) == pytest.approx(ratio)
+    ratios = [entry.worst_ratio() or 0 for entry in report.worst()]
+    assert ratios == sorted(ratios, reverse=True)
+
+
+def test_a_process_pool_gives_the_same_report(car_model):
+    def values(report):
+        return [(entry.criterion, entry.matrix, entry.indices, entry.triads) for entry in report]
+    assert values(ConsistencyReport(car_model.root_criterion, workers=2)) == \
+        values(ConsistencyReport(car_model.root_criterion))
+
+
+@pytest.mark.parametrize('n', [6, 55])
+def test_batched_harker_indices_match_single_matrices(n):
+    rng = np.random.default_rng(n)
+    triangles = np.stack([consistent_triangle(n, seed) * rng.uniform(0.5, 2, triangle.size(n))
+                          for seed in range(3)])
+    rows, cols = triangle.indices(n)
+    triangles[:, (cols - rows > 1) & (rng.random(triangle.size(n)) < 0.3)] = 0
+    expected = [(ComparisonGraph.from_triangle(t, n).harker_eigen()[0] - n) / (n - 1) for t in triangles]
+    assert np.allclose(harker_indices(triangles, n), expected)
+
+
+def test_consistent_matrices_have_no_inconsistency():
+    complete = np.stack([consistent_triangle(7, seed) for seed in range(4)])
+    assert np.allclose(saaty_indices(expand_batch(complete, 7)), 0, atol=1e-9)
+    incomplete = complete.copy()
+    incomplete[:, [2, 9]] = 0
+    assert np.allclose(harker_indices(incomplete, 7), 0, atol=1e-9)
+
+
+def koczkodaj(matrix, i, j, k):
+    ratio = matrix[i, k] / (matrix[i, j] * matrix[j, k])
+    return 1 - min(ratio, 1 / ratio)
+
+
+def test_worst_triads_match_a_loop_over_all_triads():
+    n = 8
+    condensed = consistent_triangle(n) * np.random.default_rng(5).uniform(0.5, 2, triangle.size(n))
+    condensed[4] = 0  # the triads with a missing value are left out
+    matrix = triangle.expand(condensed, n)
+    expected = sorted(((koczkodaj(matrix, i, j, k), (i, j, k)) for i in range(n) for j in range(i + 1, n)
+                       for k in range(j + 1, n) if matrix[i, j] and matrix[j, k] and matrix[i, k]), reverse=True)
+    triads = worst_triads(condensed, n, 5)
+    assert [(i, j, k) for i, j, k, _ in triads] == [triad for _, triad in expected[:5]]
+    assert np.allclose([index for *_, index in triads], [index for index, _ in expected[:5]])
+
+
+def test_a_repair_suggestion_fixes_a_wrong_judgment():
+    n = 6
+    condensed = consistent_triangle(n)
+    assert repair_suggestions(condensed, n) == [] and worst_triads(condensed, n) == []
+    k = triangle.index(1, 4, n)
+    right = condensed[k]
+    condensed[k] = right * 5
+    row, col, value, suggested, improvement = repair_suggestions(condensed, n)[0]
+    assert (row, col) == (1, 4) and value == pytest.approx(right * 5) and improvement > 0
+    assert suggested == pytest.approx(right)
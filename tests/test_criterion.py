@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from ahp.consistency import SCI
+from ahp.criterion import best_of
+
+
+def test_cell_edits_keep_the_matrix_reciprocal(car_model):
+    criterion = car_model.find_criterion('cost')
+    criterion.set_matrix_values(0, [(0, 1, 3.0), (2, 1, 4.0)])
+    matrix = criterion.get_matrix(0)
+    assert matrix[0, 1] == 3 and matrix[1, 0] == pytest.approx(1 / 3)
+    assert matrix[1, 2] == pytest.approx(0.25) and matrix[2, 1] == 4
+    assert np.allclose(criterion.matrix * criterion.matrix.T, 1)
+
+
+def test_the_dense_matrix_is_not_kept(car_model):
+    criterion = car_model.find_criterion('Goal')
+    criterion.ic(SCI)
+    criterion.set_matrix_values(0, [(0, 4, 2.0), (3, 1, 0.0)])
+    assert not any(isinstance(getattr(criterion, slot, None), np.ndarray) and getattr(criterion, slot).ndim == 2
+                   for slot in type(criterion).__slots__)
+    matrix = criterion.matrix
+    assert matrix[0, 4] == 2 and matrix[4, 0] == 0.5 and matrix[3, 1] == 0 and matrix[1, 3] == 0
+    n = criterion.size
+    assert all(criterion.aggregated_value(row, col) == matrix[row, col] for row in range(n) for col in range(n))
+
+
+@pytest.mark.parametrize('cell', [(1, 1), (0, 3), (-1, 0)])
+def test_invalid_cells_are_rejected(car_model, cell):
+    criterion = car_model.find_criterion('cost')
+    before = criterion.matrices[0].copy()
+    with pytest.raises(ValueError):
+        criterion.set_matrix_values(0, [(0, 1, 5.0), (*cell, 2.0)])
+    assert np.array_equal(criterion.matrices[0], before)
+
+
+def test_incremental_edit_matches_a_full_aggregation(car_model):
+    criterion = car_model.find_criterion('Goal')
+    criterion.add_matrix(criterion.matrices[0] * 1.5, True)
+    criterion.set_matrix_values(1, [(0, 4, 2.0), (3, 1, 0.5)])
+    weights, triangle = criterion.weights.copy(), criterion.triangle.copy()
+    criterion.is_aggregated = False
+    criterion.aggregate()
+    assert np.allclose(criterion.triangle, triangle) and np.allclose(criterion.weights, weights)
+
+
+def test_a_new_alternative_is_not_rated(car_model):
+    car_model.add_alternative('Car 5')
+    scores, names = car_model.root_criterion.get_all_scores()
+    assert np.isnan(scores[-1]) and not np.isnan(scores[:-1]).any()
+    assert np.isnan(car_model.find_criterion('safety').weights[-1])
+    top_scores, top_names = car_model.top_k(10)
+    assert 'Car 5' not in top_names.tolist() and len(top_names) == 4
+
+
+@pytest.mark.parametrize('k', [0, 1, 5, 99, 200])
+def test_best_of_matches_a_full_sort(k):
+    scores = np.random.default_rng(k).random(150).round(2)  # with ties
+    scores[::7] = np.nan
+    rated = np.flatnonzero(~np.isnan(scores))
+    expected = rated[np.argsort(-scores[rated], kind='stable')][:k]
+    assert np.array_equal(best_of(scores, k), expected)  # the same indices of the ties too
+
+
+def test_removing_an_alternative_keeps_the_other_judgments(car_model):
+    criterion = car_model.find_criterion('design')
+    before = criterion.get_matrix(0)
+    car_model.remove_alternative('Car 2')
+    assert np.allclose(criterion.get_matrix(0), np.delete(np.delete(before, 1, 0), 1, 1))
+    car_model.add_alternative('Car 2')
+    matrix = criterion.get_matrix(0)
+    assert np.allclose(matrix[:3, :3], np.delete(np.delete(before, 1, 0), 1, 1))
+    assert not matrix[3, :3].any() and not matrix[:3, 3].any()  # not compared yet
+
+
+def test_a_new_subcriterion_takes_over_the_judgments(car_model):
+    design = car_model.find_criterion('design')
+    before = design.get_matrix(0)
+    design.add_subcriterion('style')
+    style = car_model.find_criterion('style')
+    assert not design.is_final_criterion and np.array_equal(style.get_matrix(0), before)
+
+
+
+def test_a_new_sibling_is_not_compared(car_model):
+    cost = car_model.find_criterion('cost')
+    weights = cost.weights.copy()
+    cost.add_subcriterion('insurance')
+    assert np.isnan(car_model.find_criterion('insurance').weight)
+    assert np.allclose(cost.weights[:3], weights)
+    assert not np.isnan(car_model.root_criterion.get_all_scores()[0]).any()  # the other costs still score
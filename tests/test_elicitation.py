@@ -0,0 +1,36 @@
+import numpy as np
+
+from ahp import triangle
+from ahp.elicitation import AdaptiveElicitation
+from ahp.sparse import ComparisonGraph
+
+from benchmarks.generator import generate_ahp
+
+
+def consistent_answers(priorities):
+    return lambda i, j: priorities[i] / priorities[j]
+
+
+def test_the_top_order_is_found_with_fewer_questions():
+    criterion = generate_ahp(depth=1, branching=12, alternatives=2).root_criterion
+    priorities = np.random.default_rng(6).random(12) + 0.1
+    elicitation = AdaptiveElicitation(criterion, top_k=3)
+    matrix = elicitation.run(consistent_answers(priorities))
+    assert elicitation.questions < triangle.size(12)
+    assert ComparisonGraph.from_triangle(matrix, 12).degrees.all()  # every child compared
+    weights = criterion.calculate_weights(matrix, False)
+    assert np.allclose(weights, priorities / priorities.sum())
+    assert elicitation.top_order(weights) == tuple(np.argsort(-priorities)[:3])
+
+
+def test_unanswered_comparisons_stay_missing():
+    criterion = generate_ahp(depth=1, branching=6, alternatives=2).root_criterion
+    priorities = np.arange(1, 7, dtype=np.float64)
+
+    def ask(i, j):
+        return 0 if (i, j) == (0, 1) else priorities[i] / priorities[j]  # the expert skips a pair
+    elicitation = AdaptiveElicitation(criterion, top_k=2)
+    matrix = elicitation.run(ask)
+    assert matrix[triangle.index(0, 1, 6)] == 0
+    assert ComparisonGraph.from_triangle(matrix, 6).degrees.all()
+    assert not np.isnan(elicitation.weights()).any()
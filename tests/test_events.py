@@ -0,0 +1,75 @@
+import pytest
+
+from ahp.events import (MATRIX_CHANGED, WEIGHTS_CHANGED, STRUCTURE_CHANGED, ALTERNATIVES_CHANGED, EventBus,
+                        event_types)
+
+
+@pytest.fixture
+def received(car_model):
+    """ the events of the car model, in the order they were emitted """
+    events = []
+    car_model.events.subscribe(events.append)
+    return events
+
+
+def of_type(events, event_type):
+    return [event for event in events if event.type == event_type]
+
+
+def test_cell_edits_change_the_matrix_and_the_weights(car_model, received):
+    cost = car_model.find_criterion('cost')
+    cost.set_matrix_values(0, [(0, 1, 3.0), (2, 1, 4.0)])
+    matrix_events = of_type(received, MATRIX_CHANGED)
+    assert len(matrix_events) == 1 and matrix_events[0].criterion is cost
+    assert matrix_events[0].details == {'idx': 0, 'cells': [(0, 1), (2, 1)]}
+    assert [event.criterion for event in of_type(received, WEIGHTS_CHANGED)] == [cost]
+    assert not of_type(received, STRUCTURE_CHANGED) and not of_type(received, ALTERNATIVES_CHANGED)
+
+
+def test_subcriteria_change_the_structure(car_model, received):
+    cost = car_model.find_criterion('cost')
+    cost.add_subcriterion('insurance')
+    assert [event.criterion for event in of_type(received, STRUCTURE_CHANGED)] == [cost]
+    received.clear()
+    car_model.find_criterion('insurance').remove()
+    assert [event.criterion for event in of_type(received, STRUCTURE_CHANGED)] == [cost]
+    received.clear()
+    safety = car_model.find_criterion('safety')
+    safety.add_subcriterion('crash tests')  # takes over the judgments of the final criterion
+    assert [event.criterion for event in of_type(received, STRUCTURE_CHANGED)] == [safety]
+
+
+def test_a_new_alternative_changes_the_model_and_the_final_criteria(car_model, received):
+    car_model.add_alternative('Car 5')
+    assert received[-1].type == ALTERNATIVES_CHANGED and received[-1].criterion is None  # the whole model
+    assert received[-1].details == {'name': 'Car 5', 'added': True}
+    assert len(of_type(received, ALTERNATIVES_CHANGED)) == 1
+    finals = ['purchase price', 'fuel costs', 'maintenance cost', 'safety', 'design', 'trunk size',
+              'passenger capacity', 'warranty']
+    assert [event.criterion.name for event in of_type(received, MATRIX_CHANGED)] == finals
+    assert [event.criterion.name for event in of_type(received, WEIGHTS_CHANGED)] == finals
+    received.clear()
+    assert not car_model.add_alternative('Car 5')  # already there, nothing changes
+    assert received == []
+
+
+def test_unsubscribed_callbacks_are_not_called(car_model):
+    everything, weights = [], []
+    car_model.events.subscribe(everything.append)
+    car_model.events.subscribe(weights.append, WEIGHTS_CHANGED)
+    car_model.events.unsubscribe(everything.append)
+    car_model.find_criterion('cost').set_matrix_values(0, [(0, 1, 3.0)])
+    assert everything == [] and [event.type for event in weights] == [WEIGHTS_CHANGED]
+
+
+def test_subscribing_twice_calls_once():
+    bus = EventBus()
+    events = []
+    bus.subscribe(events.append)
+    bus.subscribe(events.append, MATRIX_CHANGED)
+    for event_type in event_types:
+        bus.emit(event_type, extra=1)
+    assert [event.type for event in events] == event_types
+    assert all(event.criterion is None and event.details == {'extra': 1} for event in events)
+    with pytest.raises(AssertionError):
+        bus.subscribe(events.append, 'no such event')
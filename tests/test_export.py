@@ -0,0 +1,41 @@
+import csv
+
+import numpy as np
+import pytest
+
+from ahp.export import weights_filename
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 1000])
+def test_npz_contributions_sum_up_to_the_scores(car_model, tmp_path, chunk_size):
+    filename = str(tmp_path / 'contributions.npz')
+    car_model.export_contributions(filename, chunk_size=chunk_size)
+    data = np.load(filename)
+    scores, names = car_model.root_criterion.get_all_scores()
+    assert data['alternatives'].tolist() == names.tolist()
+    assert data['contributions'].shape == (4, 8)
+    assert np.allclose(data['contributions'].sum(axis=1), scores) and np.allclose(data['scores'], scores)
+    node_weights = dict(zip(data['nodes'].tolist(), data['node_weights']))
+    assert node_weights['Goal'] == 1 and np.isclose(sum(node_weights[path] for path in data['criteria']), 1)
+
+
+def test_csv_of_a_subcriterion(car_model, tmp_path):
+    filename = str(tmp_path / 'cost.csv')
+    car_model.export_contributions(filename, car_model.find_criterion('cost'), chunk_size=3)
+    with open(filename) as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['alternative', 'cost/purchase price', 'cost/fuel costs', 'cost/maintenance cost', 'score']
+    scores = car_model.find_criterion('cost').get_all_scores()[0]
+    assert [row[0] for row in rows[1:]] == ['Car 1', 'Car 2', 'Car 3', 'Car 4']
+    assert np.allclose([float(row[-1]) for row in rows[1:]], scores)
+    assert np.allclose([sum(map(float, row[1:-1])) for row in rows[1:]], scores)
+    with open(weights_filename(filename)) as f:
+        assert next(csv.reader(f)) == ['criterion', 'global_weight']
+
+
+def test_unrated_alternatives_have_no_score(car_model, tmp_path):
+    car_model.add_alternative('Car 5')
+    filename = str(tmp_path / 'contributions.npz')
+    car_model.export_contributions(filename)
+    data = np.load(filename)
+    assert np.isnan(data['scores'][-1]) and not np.isnan(data['scores'][:-1]).any()
@@ -0,0 +1,119 @@
+import json
+import os
+import shutil
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from ahp import AHP
+from ahp.journal import Journal, JUDGMENTS
+
+from .conftest import same_model, xml_path
+
+
+@pytest.fixture
+def model_file(tmp_path):
+    path = str(tmp_path / 'car_selection.xml')
+    shutil.copy(xml_path('car_selection.xml'), path)
+    return path
+
+
+def change(ahp):
+    ahp.find_criterion('cost').set_matrix_values(0, [(0, 1, 3.0)])
+    ahp.find_criterion('safety').set_rating_scale(['good', 'poor'])
+    ahp.find_criterion('safety').rate('Car 1', 'good')
+    ahp.add_alternative('Car 5')
+    ahp.find_criterion('design').add_subcriterion('style')
+    ahp.save()
+    with open(ahp.journal.path) as f:
+        return len(f.readlines())  # journaled records
+
+
+def test_replay_recovers_the_saved_changes(model_file):
+    ahp = AHP(model_file, journal=True)
+    records = change(ahp)
+    assert not same_model(ahp, AHP(model_file))  # only the journal has the changes
+    recovered = AHP(model_file, journal=True)
+    assert recovered.journal.replayed == records and same_model(recovered, ahp)
+
+
+def test_replaying_twice_changes_nothing(model_file):
+    records = change(AHP(model_file, journal=True))
+    recovered = AHP(model_file, journal=True)
+    before = recovered.snapshot()
+    assert recovered.journal.replay() == records
+    assert Journal.records(recovered.snapshot(), before) == []
+
+
+def test_a_changed_cell_is_journaled_alone(model_file):
+    ahp = AHP(model_file, journal=True)
+    ahp.find_criterion('Goal').set_matrix_values(0, [(0, 4, 2.0)])
+    ahp.save()
+    with open(ahp.journal.path) as f:
+        records = [json.loads(line) for line in f]
+    assert records == [{'type': JUDGMENTS, 'criterion': 'Goal', 'matrices': [{'cells': [[3, 2.0]]}],
+                        'completion': [True], 'scale': None}]
+
+
+def test_saving_without_changes_appends_nothing(model_file):
+    ahp = AHP(model_file, journal=True)
+    change(ahp)
+    size = ahp.journal.size()
+    ahp.root_criterion.aggregate()
+    assert ahp.journal.append() == 0 and ahp.journal.size() == size
+
+
+def test_a_torn_last_record_is_skipped(model_file):
+    records = change(AHP(model_file, journal=True))
+    with open(model_file + '.journal', 'a') as f:
+        f.write('{"type": "judgments", "crit')
+    assert AHP(model_file, journal=True).journal.replayed == records
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_compaction_folds_the_journal_into_the_file(model_file, compact):
+    AHP(model_file).save_to_file(model_file, compact)
+    ahp = AHP(model_file, journal=True)
+    change(ahp)
+    ahp.journal.compact(wait=True)
+    assert ahp.journal.size() == 0
+    compacted = AHP(model_file)
+    assert same_model(compacted, ahp) and compacted.compact == compact
+    assert AHP(model_file, journal=True).journal.replayed == 0
+
+
+def test_compaction_keeps_the_other_xml_nodes(model_file):
+    tree = ET.parse(model_file)
+    root = tree.getroot()
+    root.set('version', '3')
+    ET.SubElement(root, 'notes').text = 'kept'
+    ET.SubElement(root.find('data'), 'comment', {'for': 'cost'}).text = 'kept too'
+    tree.write(model_file)
+    ahp = AHP(model_file, journal=True)
+    change(ahp)
+    ahp.journal.compact(wait=True)
+    root = ET.parse(model_file).getroot()
+    assert root.get('version') == '3' and root.find('notes').text == 'kept'
+    assert root.find('data/comment').text == 'kept too'
+    assert [node.tag for node in root][:2] == ['criterion', 'alternatives']
+    assert same_model(AHP(model_file), ahp)
+
+
+def test_compaction_keeps_the_later_records(model_file):
+    ahp = AHP(model_file, journal=True)
+    change(ahp)
+    ahp.journal.compact(wait=True)
+    ahp.find_criterion('cost').set_matrix_values(0, [(1, 2, 5.0)])
+    ahp.save()
+    ahp.journal.compact(wait=True)
+    ahp.find_criterion('warranty').set_matrix_values(0, [(0, 1, 7.0)])
+    ahp.save()
+    assert same_model(AHP(model_file, journal=True), ahp)
+
+
+def test_saving_the_file_empties_the_journal(model_file):
+    ahp = AHP(model_file, journal=True)
+    change(ahp)
+    ahp.save_to_file(model_file)
+    assert not os.path.exists(ahp.journal.path)
+    assert same_model(AHP(model_file, journal=True), ahp)
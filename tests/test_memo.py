@@ -0,0 +1,60 @@
+import numpy as np
+
+from ahp import memo, triangle
+from ahp.memo import ResultCache, ENTRY_OVERHEAD
+from benchmarks.generator import generate_ahp
+from benchmarks.suite import memo_disabled
+
+
+def test_cached_arrays_are_copies():
+    cache = ResultCache(2 ** 20)
+    value = np.arange(3.0)
+    cache.put('key', value)
+    value[0] = 10
+    first = cache.get('key')
+    first[1] = 10
+    assert cache.get('key').tolist() == [0, 1, 2]
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ResultCache(2 * (80 + ENTRY_OVERHEAD))
+    for key in 'abc':
+        cache.put(key, np.zeros(10))
+        cache.get('a')
+    assert cache.get('a') is not None and cache.get('b') is None and cache.get('c') is not None
+    assert cache.evictions == 1
+
+
+def test_calculate_on_a_miss_only():
+    cache = ResultCache(2 ** 20)
+    calls = []
+    for _ in range(3):
+        assert cache.cached('key', lambda: calls.append(1) or 1.5) == 1.5
+    assert len(calls) == 1 and cache.hits == 2 and cache.misses == 1
+
+
+def test_same_matrix_of_different_criteria_shares_the_key(car_model):
+    a = car_model.find_criterion('safety')
+    b = car_model.find_criterion('design')
+    b.set_matrix(0, a.matrices[0].copy(), True)
+    assert memo.matrix_key('weights', 'EVM', True, a.triangle) == memo.matrix_key('weights', 'EVM', True, b.triangle)
+    assert np.array_equal(a.weights, b.weights)
+
+
+def test_benchmarks_time_without_the_cache():
+    memo.cache.put('key', 1.0)
+    max_bytes = memo.cache.max_bytes
+    with memo_disabled():
+        assert not memo.cache.enabled and memo.cache.get('key') is None
+        memo.cache.put('other', 1.0)
+        assert len(memo.cache) == 0
+    assert memo.cache.enabled and memo.cache.max_bytes == max_bytes
+
+
+def test_a_dense_and_a_condensed_matrix_of_as_many_values_do_not_share_a_key():
+    model = generate_ahp(depth=1, branching=9, alternatives=6)
+    goal = model.root_criterion  # 9 children, a condensed matrix has 36 values
+    leaf = goal.children[0]  # 6 alternatives, a dense matrix has 36 values
+    assert len(leaf.calculate_weights(np.ones((6, 6)), True)) == 6
+    assert len(goal.calculate_weights(triangle.ones(9), True)) == 9
+    assert np.allclose(goal.calculate_weights(triangle.ones(9), True), 1 / 9)
@@ -0,0 +1,73 @@
+import threading
+
+import numpy as np
+import pytest
+
+from ahp.published import PublishedModel
+
+
+def test_versions_match_the_live_model(car_model):
+    published = PublishedModel(car_model)
+    for criterion in published.current().criteria():
+        assert np.allclose(published.get_all_scores(criterion)[0],
+                           car_model.find_criterion(criterion).get_all_scores()[0])
+    scores, names = car_model.top_k(2)
+    top_scores, top_names = published.top_k(2)
+    assert np.array_equal(top_scores, scores) and top_names.tolist() == names.tolist()
+
+
+def test_a_reader_keeps_its_version(car_model):
+    published = PublishedModel(car_model)
+    version = published.current()
+    before = version.scores().copy()
+    with published.edit() as ahp:
+        ahp.root_criterion.set_matrix_values(0, [(0, 4, 9.0)])
+        assert published.current() is version  # not published before the edit is done
+    assert published.current().number == version.number + 1
+    assert np.array_equal(version.scores(), before)
+    assert not np.allclose(published.current().scores(), before)
+    with pytest.raises(ValueError):
+        version.scores()[0] = 1  # read only
+
+
+def test_an_unchanged_edit_publishes_nothing(car_model):
+    published = PublishedModel(car_model)
+    version = published.current()
+    with published.edit():
+        car_model.root_criterion.aggregate()
+    assert published.current() is version
+
+
+def test_a_failed_edit_is_rolled_back(car_model):
+    published = PublishedModel(car_model)
+    before = published.current().scores().copy()
+    with pytest.raises(RuntimeError):
+        with published.edit() as ahp:
+            ahp.root_criterion.set_matrix_values(0, [(0, 4, 9.0)])
+            raise RuntimeError
+    assert np.allclose(car_model.root_criterion.get_all_scores()[0], before)
+    assert published.current().number == 0
+
+
+def test_readers_see_whole_versions(car_model):
+    published = PublishedModel(car_model)
+    expected = {0: published.current().scores().copy()}
+    seen = []
+    done = threading.Event()
+
+    def read():
+        while not done.is_set():
+            version = published.current()
+            seen.append((version.number, version.scores().copy()))
+
+    readers = [threading.Thread(target=read) for _ in range(3)]
+    for reader in readers:
+        reader.start()
+    for value in (2.0, 3.0, 4.0, 5.0):
+        with published.edit() as ahp:
+            ahp.root_criterion.set_matrix_values(0, [(0, 4, value)])
+        expected[published.current().number] = published.current().scores().copy()
+    done.set()
+    for reader in readers:
+        reader.join()
+    assert all(np.array_equal(scores, expected[number]) for number, scores in seen)
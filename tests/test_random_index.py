@@ -0,0 +1,96 @@
+import json
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from ahp import random_index
+from ahp.consistency import SCI, SH, harker_indices, consistency_ratio
+from ahp.random_index import RandomIndexEngine, RANDOM_INDEX_TABLE, CACHE_VERSION, VERSION_KEY
+from tests.conftest import consistent_triangle
+
+
+@pytest.mark.parametrize('n', [4, 8, 12, 60])  # 60 is solved by the power iteration
+def test_consistent_incomplete_matrix_has_zero_harker_index(n):
+    condensed = consistent_triangle(n)
+    condensed[1] = 0
+    ci = harker_indices(condensed[None], n)[0]
+    assert ci == pytest.approx(0, abs=1e-9)
+    assert consistency_ratio(ci, n, SH, np.count_nonzero(condensed) / len(condensed)) == pytest.approx(0, abs=1e-9)
+
+
+def test_criterion_harker_index_matches_the_batched_one(car_model):
+    criterion = car_model.find_criterion('Goal')
+    criterion.set_matrix_value(0, 0, 1, 0)
+    ci, cr = criterion.ic(SH)
+    assert ci == pytest.approx(harker_indices(criterion.triangle[None], criterion.size)[0])
+    assert cr > 0
+
+
+def test_table_indices_are_not_estimated(tmp_path, monkeypatch):
+    engine = RandomIndexEngine(str(tmp_path / 'ri.json'))
+    monkeypatch.setattr(engine, 'estimate', lambda *args: pytest.fail("estimated a table index"))
+    assert engine.get(SH, 10, 0.5) == RANDOM_INDEX_TABLE['SH:10:0.5']
+    assert engine.get(SCI, 25) == RANDOM_INDEX_TABLE['SCI:25:1.0']
+
+
+def test_estimates_are_cached_in_the_file(tmp_path, monkeypatch):
+    path = str(tmp_path / 'ri.json')
+    engine = RandomIndexEngine(path, samples=50)
+    ri = engine.get(SH, 40, 0.5)
+    assert 0 < ri
+    assert json.load(open(path))['SH:40:0.5'] == ri
+    again = RandomIndexEngine(path)
+    monkeypatch.setattr(again, 'estimate', lambda *args: pytest.fail("estimated a cached index"))
+    assert again.get(SH, 40, 0.5) == ri
+
+
+def test_cache_of_an_older_version_is_dropped(tmp_path):
+    path = tmp_path / 'ri.json'
+    path.write_text(json.dumps({'SH:40:0.5': -1.0}))
+    engine = RandomIndexEngine(str(path), samples=50)
+    assert engine.get(SH, 40, 0.5) > 0
+    assert json.loads(path.read_text())[VERSION_KEY] == CACHE_VERSION
+
+
+def test_estimate_in_the_background(tmp_path):
+    engine = RandomIndexEngine(str(tmp_path / 'ri.json'), samples=50)
+    assert engine.get(SCI, 41, wait=False) is None
+    ri = engine.get(SCI, 41)  # waits for the running estimate
+    assert ri > 0 and not engine.estimating()
+    assert engine.get(SCI, 41, wait=False) == ri
+
+
+def test_shared_engine_uses_the_cache_path(random_index_cache):
+    assert random_index.engine().path == random_index_cache
+
+
+def test_concurrent_callers_share_a_single_estimate(tmp_path, monkeypatch):
+    engine = RandomIndexEngine(str(tmp_path / 'ri.json'))
+    calls = []
+    started = threading.Event()
+
+    def estimate(method, n, completeness=1.0):
+        calls.append((method, n, completeness))
+        started.set()
+        time.sleep(0.2)
+        return 1.25
+    monkeypatch.setattr(engine, 'estimate', estimate)
+    results = []
+    callers = [threading.Thread(target=lambda: results.append(engine.get(SCI, 45))) for _ in range(4)]
+    for caller in callers:
+        caller.start()
+    started.wait()
+    assert engine.get(SCI, 45, wait=False) is None
+    for caller in callers:
+        caller.join()
+    assert calls == [(SCI, 45, 1.0)] and results == [1.25] * 4
+
+
+def test_a_failed_estimate_is_tried_again(tmp_path, monkeypatch):
+    engine = RandomIndexEngine(str(tmp_path / 'ri.json'))
+    monkeypatch.setattr(engine, 'estimate', lambda *args: 1 / 0)
+    assert engine.get(SCI, 45) is None and not engine.estimating()
+    monkeypatch.setattr(engine, 'estimate', lambda *args: 1.5)
+    assert engine.get(SCI, 45) == 1.5
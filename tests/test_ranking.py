@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from benchmarks.generator import generate_ahp
+
+
+@pytest.fixture(scope='module')
+def generated():
+    return generate_ahp(depth=2, branching=3, alternatives=300, incompleteness=0.3, seed=4)
+
+
+@pytest.mark.parametrize('k', [1, 10, 300, 1000])
+def test_top_k_matches_a_full_sort(generated, k):
+    scores, names = generated.root_criterion.get_all_scores()
+    order = np.argsort(-scores, kind='stable')[:k]
+    top_scores, top_names = generated.top_k(k)
+    assert np.array_equal(top_scores, scores[order])
+    assert top_names.tolist() == names[order].tolist()  # no ties in the random scores
+
+
+def test_top_k_of_a_subcriterion(generated):
+    criterion = generated.root_criterion.children[1]
+    scores, names = criterion.get_all_scores()
+    top_scores, top_names = criterion.top_k(5)
+    assert top_names.tolist() == names[np.argsort(-scores, kind='stable')[:5]].tolist()
+    assert np.array_equal(top_scores, np.sort(scores)[::-1][:5])
+
+
+def test_selections_follow_the_requested_order(generated):
+    scores, names = generated.root_criterion.get_all_scores()
+    indices = np.array([7, 2, 250, 2, 0])
+    selected_scores, selected_names = generated.get_scores_for(indices)
+    assert np.array_equal(selected_scores, scores[indices])
+    assert selected_names.tolist() == names[indices].tolist()
+    assert generated.get_scores_for([7, 2])[1].tolist() == [names[7], names[2]]  # a list, not the registry order
+
+
+def test_masks_and_batched_selections(generated):
+    scores, names = generated.root_criterion.get_all_scores()
+    wanted = [names[5], 'no such alternative', names[1]]
+    mask = np.isin(names, wanted)  # the unknown name selects nothing
+    mask_scores, mask_names = generated.get_scores_for(mask)
+    assert mask_names.tolist() == [names[1], names[5]] and np.array_equal(mask_scores, scores[[1, 5]])
+    selections = [[3, 1], mask, np.array([], dtype=np.intp), np.arange(len(names))[::-1]]
+    for (batch_scores, batch_names), selection in zip(generated.get_scores_for_many(selections), selections):
+        single_scores, single_names = generated.get_scores_for(selection)
+        assert np.array_equal(batch_scores, single_scores) and batch_names.tolist() == single_names.tolist()
+    with pytest.raises(AssertionError):
+        generated.get_scores_for(mask[:-1])
+
+
+@pytest.mark.parametrize('k', [1, 2, 3, 4])
+def test_top_k_keeps_the_registry_order_of_ties(car_model, k):
+    criterion = car_model.find_criterion('safety')
+    criterion.set_rating_scale(['good', 'poor'])
+    criterion.add_matrix(np.array([3.0]), True)
+    for name, rating in [('Car 1', 'poor'), ('Car 2', 'good'), ('Car 3', 'poor'), ('Car 4', 'good')]:
+        criterion.rate(name, rating)
+    scores, names = criterion.get_all_scores()
+    order = np.argsort(-scores, kind='stable')[:k]
+    top_scores, top_names = criterion.top_k(k)
+    assert np.array_equal(top_scores, scores[order]) and top_names.tolist() == names[order].tolist()
+    assert top_names.tolist() == ['Car 2', 'Car 4', 'Car 1', 'Car 3'][:k]
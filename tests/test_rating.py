@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from ahp.rating import RatingScale, BENEFIT, COST
+
+
+def test_raw_values_are_normalized():
+    scale = RatingScale(['good', 'poor'])
+    scale.rate('a', 2)
+    scale.rate('b', 4)
+    scale.rate('c', 'good')
+    np.testing.assert_array_equal(scale.scores(['a', 'b', 'c', 'd']), [0.5, 1, 1, np.nan])  # d is not rated
+    scale.set_normalization(COST)
+    assert scale.scores(['a', 'b']).tolist() == [1, 0.5]
+
+
+def test_cost_normalization_rejects_a_raw_zero():
+    scale = RatingScale(['good'])
+    scale.rate('a', 0)
+    with pytest.raises(AssertionError):
+        scale.set_normalization(COST)
+    assert scale.normalization == BENEFIT
+    scale.remove('a')
+    scale.set_normalization(COST)
+    with pytest.raises(AssertionError):
+        scale.rate('a', 0)
+
+
+def test_unknown_normalization_is_rejected():
+    with pytest.raises(AssertionError):
+        RatingScale(['good']).set_normalization('median')
+
+
+def test_rated_criterion_normalization(car_model):
+    criterion = car_model.find_criterion('safety')
+    criterion.set_rating_scale(['good', 'poor'])
+    criterion.rate('Car 1', '0')
+    criterion.rate('Car 2', '5')
+    with pytest.raises(AssertionError):
+        criterion.set_rating_normalization(COST)
+    np.testing.assert_array_equal(criterion.weights, [0, 1, np.nan, np.nan])
+    criterion.rate('Car 1', '10')
+    criterion.set_rating_normalization(COST)
+    np.testing.assert_array_equal(criterion.weights, [0.5, 1, np.nan, np.nan])
+
+
+def test_an_intensity_not_compared_yet_leaves_the_others(car_model):
+    criterion = car_model.find_criterion('safety')
+    criterion.set_rating_scale(['excellent', 'good', 'poor'])
+    criterion.add_matrix(np.array([3.0, 0, 0]), False)  # poor is not compared yet
+    np.testing.assert_allclose(criterion.scale.priorities, [1, 1 / 3, np.nan])
+    criterion.rate('Car 1', 'excellent')
+    criterion.rate('Car 2', 'good')
+    criterion.rate('Car 3', 'poor')
+    np.testing.assert_allclose(criterion.weights, [1, 1 / 3, np.nan, np.nan])
+
+
+def test_added_alternatives_share_a_growing_buffer(car_model):
+    criterion = car_model.find_criterion('safety')
+    criterion.set_rating_scale(['good', 'poor'])
+    criterion.add_matrix(np.array([3.0]), True)
+    criterion.rate('Car 1', 'good')
+    before = car_model.snapshot()
+    for i in range(5, 40):
+        car_model.add_alternative(f'Car {i}')
+        criterion.rate(f'Car {i}', 'good' if i % 2 else 'poor')
+    buffer, weights = criterion._weights_buffer
+    assert weights is criterion.weights and weights.base is buffer and len(buffer) > len(weights)
+    assert np.array_equal(criterion.weights[4:], criterion.scale.scores(car_model.alternatives.names()[4:]))
+    middle = car_model.snapshot()
+    car_model.restore(before)
+    car_model.add_alternative('Car 5')
+    criterion = car_model.find_criterion('safety')
+    criterion.rate('Car 5', 'poor')
+    assert criterion.weights[-1] == pytest.approx(1 / 3)
+    assert middle.root.children[1].weights[4] == 1  # Car 5 of the other version is not overwritten
+    car_model.restore(middle)
+    np.testing.assert_array_equal(car_model.find_criterion('safety').weights, middle.root.children[1].weights)
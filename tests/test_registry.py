@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from ahp import Alternative, AlternativeRegistry
+
+
+def test_indices_stay_consistent_after_remove_then_add():
+    registry = AlternativeRegistry(['a', 'b', 'c', 'd'])
+    names = registry.names_array()
+    assert registry.remove('b') == 1
+    registry.add('e')
+    assert registry.names() == ['a', 'c', 'd', 'e'] and registry.names_array().tolist() == registry.names()
+    assert all(registry.index(name) == i and registry[i] == name for i, name in enumerate(registry.names()))
+    assert registry.index('b') is None and 'b' not in registry and 'e' in registry
+    assert names.tolist() == ['a', 'b', 'c', 'd']  # the earlier names array is not changed
+    with pytest.raises(AssertionError):
+        registry.add('a')
+
+
+def test_final_criteria_share_the_registry(car_model):
+    registry = car_model.alternatives
+    finals = [car_model.find_criterion(name) for name in ('purchase price', 'safety', 'warranty', 'trunk size')]
+    assert all(criterion.alternatives is registry and criterion.children is registry.items for criterion in finals)
+    assert finals[0].children[0] is finals[1].children[0]  # a single Alternative object per alternative
+    car_model.remove_alternative('Car 2')
+    car_model.add_alternative('Car 5')
+    assert registry.names() == ['Car 1', 'Car 3', 'Car 4', 'Car 5']
+    assert all([child.name for child in criterion.children] == registry.names() for criterion in finals)
+    assert all(len(criterion.weights) == len(registry) for criterion in finals)
+    scores, names = car_model.root_criterion.get_all_scores()
+    assert names.tolist() == registry.names() and np.isnan(scores[-1]) and not np.isnan(scores[:-1]).any()
+
+
+def test_removed_alternatives_keep_the_others_weights(car_model):
+    safety = car_model.find_criterion('safety')
+    matrix = safety.get_matrix(0)
+    car_model.remove_alternative('Car 2')
+    assert np.allclose(safety.get_matrix(0), np.delete(np.delete(matrix, 1, axis=0), 1, axis=1))
+
+
+@pytest.mark.parametrize('obj', [AlternativeRegistry(['a']), Alternative('a')])
+def test_slots_reject_other_attributes(obj):
+    with pytest.raises(AttributeError):
+        obj.other = 1
+    assert not hasattr(obj, '__dict__')
+
+
+def test_criteria_have_no_attribute_dict(car_model):
+    criterion = car_model.find_criterion('cost')
+    with pytest.raises(AttributeError):
+        criterion.other = 1
+    assert not hasattr(criterion, '__dict__') and not hasattr(criterion.state(), '__dict__')  # see snapshot.py
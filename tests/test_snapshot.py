@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from ahp import AHP
+from ahp.scenario import Scenarios, BASE
+from ahp.snapshot import History
+
+
+def scores(model):
+    return model.root_criterion.get_all_scores()[0]
+
+
+def test_snapshot_is_not_changed_by_later_edits(car_model):
+    snapshot = car_model.snapshot()
+    cost = car_model.find_criterion('cost')
+    old = snapshot.root.children[0]
+    values = old.matrices[0].copy()
+    cost.set_matrix_value(0, 0, 1, 2.0)
+    assert np.array_equal(old.matrices[0], values)
+    assert not old.matrices[0].flags.writeable and cost.matrices[0].flags.writeable
+    with pytest.raises(ValueError):
+        old.matrices[0][0] = 1
+
+
+def test_unchanged_arrays_are_shared(car_model):
+    snapshot = car_model.snapshot()
+    car_model.find_criterion('cost').set_matrix_value(0, 0, 1, 2.0)
+    again = car_model.snapshot()
+    safety_before, safety_after = snapshot.root.children[1], again.root.children[1]
+    assert safety_before.matrices[0] is safety_after.matrices[0]
+    assert safety_before.weights is safety_after.weights
+    assert not snapshot.same_as(again)
+
+
+def test_recalculation_without_a_change_is_not_recorded(car_model):
+    history = History(car_model)
+    for criterion in [car_model.find_criterion('Goal'), car_model.find_criterion('safety')]:
+        criterion.is_aggregated = False
+        criterion.aggregate()  # new arrays of the same values, the weights come from the result cache
+    cost = car_model.find_criterion('cost')
+    cost.set_matrix(0, cost.matrices[0].copy(), cost.matrices_completion[0])
+    assert not history.record('nothing')
+    assert not history.can_undo()
+
+
+def test_undo_and_redo(car_model):
+    history = History(car_model)
+    original = scores(car_model)
+    car_model.find_criterion('cost').set_matrix_value(0, 0, 1, 9.0)
+    assert history.record('cost')
+    changed = scores(car_model)
+    car_model.add_alternative('Car 5')
+    assert history.record('add')
+    assert history.labels() == ['load', 'cost', 'add']
+    assert history.undo() == 'add' and len(car_model.alternatives) == 4
+    assert history.undo() == 'cost' and np.allclose(scores(car_model), original)
+    assert history.redo() == 'cost' and np.allclose(scores(car_model), changed)
+    car_model.find_criterion('design').set_matrix_value(0, 0, 1, 2.0)
+    history.record('design')
+    assert not history.can_redo()
+
+
+def test_structural_undo(car_model):
+    history = History(car_model)
+    car_model.find_criterion('safety').add_subcriterion('crash tests')
+    car_model.remove_alternative('Car 2')
+    history.record('structure')
+    history.undo()
+    assert car_model.find_criterion('crash tests') is None
+    assert car_model.find_criterion('safety').is_final_criterion
+    assert car_model.alternatives.names() == ['Car 1', 'Car 2', 'Car 3', 'Car 4']
+    assert np.allclose(scores(car_model), scores(AHP(car_model.filename)))
+
+
+def test_forks_are_independent(car_model):
+    scenarios = Scenarios(car_model)
+    fork = scenarios.fork('cheap')
+    fork.find_criterion('Goal').set_matrix_value(0, 0, 4, 1 / 9)
+    fork.remove_alternative('Car 4')
+    alternatives, table = scenarios.scores()
+    assert alternatives == ['Car 1', 'Car 2', 'Car 3', 'Car 4']
+    assert np.allclose(table[0], scores(car_model))
+    assert np.isnan(table[1, 3]) and not np.allclose(table[1, :3], table[0, :3])
+    assert scenarios.names() == [BASE, 'cheap']
@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+
+from ahp import sparse, triangle
+from ahp.sparse import ComparisonGraph
+
+from .conftest import consistent_triangle
+
+
+@pytest.mark.parametrize('method', ['harker_eigen', 'llsm_weights'])
+def test_isolated_items_are_not_compared(method):
+    condensed = consistent_triangle(4)
+    graph = ComparisonGraph.from_triangle(triangle.insert(condensed, 4, 3), 5)  # item 3 has no comparisons
+    weights = getattr(graph, method)()
+    weights = weights[1] if method == 'harker_eigen' else weights
+    assert np.isnan(weights[3]) and np.isclose(np.nansum(weights), 1)
+    full = getattr(ComparisonGraph.from_triangle(condensed, 4), method)()
+    assert np.allclose(np.delete(weights, 3), full[1] if method == 'harker_eigen' else full)
+
+
+def test_nothing_compared():
+    assert np.isnan(ComparisonGraph.from_triangle(np.zeros(3), 3).llsm_weights()).all()
+    assert ComparisonGraph.from_triangle(np.zeros(0), 1).harker_eigen()[1].tolist() == [1]
+
+
+def random_triangle(n, seed=0):
+    """ condensed matrix of an inconsistent reciprocal matrix, values from 1/9 to 9 """
+    rng = np.random.default_rng(seed)
+    values = rng.integers(1, 10, triangle.size(n)).astype(np.float64)
+    return np.where(rng.random(len(values)) < 0.5, values, 1 / values)
+
+
+def dense_evm(matrix):
+    eigenvalues, eigenvectors = map(np.real, np.linalg.eig(matrix))
+    weights = eigenvectors[:, np.argmax(eigenvalues)]
+    return np.max(eigenvalues), weights / np.sum(weights)
+
+
+def dense_gmm(matrix):
+    weights = np.exp(np.mean(np.log(matrix), axis=1))
+    return weights / np.sum(weights)
+
+
+@pytest.mark.parametrize('n', [7, 80])  # solved densely, iteratively
+def test_complete_matrices_match_the_dense_methods(n):
+    condensed = random_triangle(n)
+    matrix = triangle.expand(condensed, n)
+    graph = ComparisonGraph.from_triangle(condensed, n)
+    lambda_max, weights = graph.harker_eigen()
+    expected_lambda, expected = dense_evm(matrix)  # Harker's matrix of a complete matrix is the matrix itself
+    assert lambda_max == pytest.approx(expected_lambda) and np.allclose(weights, expected, rtol=1e-8)
+    assert np.allclose(graph.llsm_weights(), dense_gmm(matrix), rtol=1e-8)
+
+
+def test_iterative_solvers_match_the_dense_ones(monkeypatch):
+    n = 70
+    condensed = random_triangle(n, seed=1)
+    rows, cols = triangle.indices(n)
+    condensed[(np.random.default_rng(2).random(len(condensed)) < 0.8) & (cols - rows > 1)] = 0  # keeps a path
+    graph = ComparisonGraph.from_triangle(condensed, n)
+    lambda_max, weights = graph.harker_eigen()
+    llsm = graph.llsm_weights()
+    monkeypatch.setattr(sparse, 'DENSE_MAX_SIZE', n)
+    dense_lambda, dense_weights = graph.harker_eigen()
+    assert lambda_max == pytest.approx(dense_lambda) and np.allclose(weights, dense_weights, rtol=1e-8)
+    assert np.allclose(llsm, graph.llsm_weights(), rtol=1e-8)
+
+
+@pytest.mark.parametrize('n', [5, 60])
+def test_consistent_incomplete_matrices_give_the_priorities(n):
+    condensed = consistent_triangle(n)
+    expected = triangle.expand(condensed, n)[:, 0]
+    expected /= expected.sum()
+    rows, cols = triangle.indices(n)
+    condensed[(rows + cols) % 3 == 0] = 0
+    graph = ComparisonGraph.from_triangle(condensed, n)
+    assert graph.degrees.all()
+    lambda_max, weights = graph.harker_eigen()
+    assert lambda_max == pytest.approx(n) and np.allclose(weights, expected)
+    assert np.allclose(graph.llsm_weights(), expected)
+
+
+def test_matrix_free_products_match_the_dense_matrix():
+    n = 9
+    condensed = random_triangle(n)
+    condensed[::4] = 0
+    graph = ComparisonGraph.from_triangle(condensed, n)
+    w = np.random.default_rng(3).random(n)
+    assert np.allclose(graph.harker_dot(w), graph.harker_matrix() @ w)
+    adjacency = (triangle.expand(condensed, n) > 0) & ~np.eye(n, dtype=bool)
+    assert np.allclose(graph.laplacian_dot(w), (np.diag(graph.degrees) - adjacency) @ w)
+
+
+def test_edited_edges_match_a_rebuilt_graph():
+    n = 30
+    condensed = random_triangle(n, seed=3)
+    condensed[np.random.default_rng(4).random(len(condensed)) < 0.7] = 0
+    graph = ComparisonGraph.from_triangle(condensed, n)
+    rng = np.random.default_rng(5)
+    for _ in range(5):
+        positions = rng.integers(0, len(condensed), 20)
+        values = np.where(rng.random(20) < 0.3, 0, rng.uniform(0.2, 5, 20))
+        graph = graph.with_values(positions, values)
+        condensed[positions] = values  # the last of the repeated positions wins, as in with_values
+        expected = ComparisonGraph.from_triangle(condensed, n)
+        for name in ('positions', 'rows', 'cols', 'values', 'degrees'):
+            assert np.array_equal(getattr(graph, name), getattr(expected, name))
+
+
+def test_a_cell_edit_does_not_rebuild_the_graph(car_model, monkeypatch):
+    criterion = car_model.find_criterion('warranty')
+    graph = criterion.graph
+    monkeypatch.setattr(ComparisonGraph, 'from_triangle', None)  # the triangle is not scanned again
+    criterion.set_matrix_values(0, [(0, 1, 0), (0, 2, 3.0)])
+    monkeypatch.undo()
+    assert criterion.graph is not graph
+    expected = ComparisonGraph.from_triangle(criterion.triangle, criterion.size)
+    assert np.array_equal(criterion.graph.positions, expected.positions)
+    assert np.array_equal(criterion.graph.values, expected.values)
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from ahp import AHP, memo, stats
+from ahp.criterion import EVM
+
+from .conftest import consistent_triangle, xml_path
+
+
+@pytest.fixture
+def counting():
+    """ counts from zero, the previous counters and the switch are restored afterwards """
+    enabled, counters = stats.is_enabled(), dict(stats._counters)
+    stats.reset()
+    stats.enable()
+    yield
+    stats.enable(enabled)
+    stats.reset()
+    stats._counters.update(counters)
+
+
+def calls(name):
+    return stats.snapshot().get(name, {}).get('calls', 0)
+
+
+def test_weight_computations_and_cache_hits_are_counted(car_model, counting):
+    criterion = car_model.find_criterion('Goal')
+    criterion.calc_weight_method = EVM
+    matrix = consistent_triangle(criterion.size, seed=42)  # not cached yet
+    hits, misses = memo.cache.hits, memo.cache.misses
+    first = criterion.calculate_weights(matrix, True)
+    assert calls('calculate_weights') == 1 and calls(stats.EIGEN) == 1
+    assert memo.cache.misses == misses + 1 and memo.cache.hits == hits
+    assert criterion.calculate_weights(matrix, True).tolist() == first.tolist()
+    assert calls('calculate_weights') == 2 and calls(stats.EIGEN) == 1  # the cached weights, no eigen solve
+    assert memo.cache.misses == misses + 1 and memo.cache.hits == hits + 1
+    assert stats.snapshot()['calculate_weights']['seconds'] > 0
+
+
+def test_nothing_is_counted_when_disabled(car_model, counting):
+    stats.enable(False)
+    car_model.root_criterion.get_all_scores()
+    stats.count(stats.EIGEN)
+    assert stats.snapshot() == {}
+
+
+def test_loads_and_scores_are_counted(counting):
+    model = AHP(xml_path('car_selection.xml'))
+    model.root_criterion.get_all_scores()
+    model.get_scores_for([0, 1])
+    assert calls('load') == 1 and calls('get_all_scores') == 1 and calls('get_scores_for') == 1
+    assert calls('scores') >= 2  # the nested calls of every criterion are counted too
+
+
+def test_saved_counters_match_the_snapshot(car_model, counting, tmp_path):
+    car_model.root_criterion.get_all_scores()
+    stats.count('custom', 3)
+    filename = str(tmp_path / 'stats.json')
+    stats.save(filename)
+    with open(filename) as f:
+        saved = json.load(f)
+    assert saved == {'enabled': True, 'counters': stats.snapshot()}
+    assert saved['counters']['custom'] == {'calls': 3, 'seconds': 0.0}
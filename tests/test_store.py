@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from ahp import AHP
+from ahp.store import ModelStore
+
+from .conftest import same_model, xml_path
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ModelStore(str(tmp_path / 'studies.db'))
+    yield store
+    store.close()
+
+
+def test_a_loaded_study_equals_the_imported_file(store):
+    assert store.import_xml(xml_path('car_selection.xml')) == 'car_selection'
+    loaded = store.load('car_selection')
+    assert same_model(loaded, AHP(xml_path('car_selection.xml')))
+    assert np.allclose(loaded.root_criterion.get_all_scores()[0],
+                       AHP(xml_path('car_selection.xml')).root_criterion.get_all_scores()[0])
+
+
+def test_a_subtree_is_loaded_alone(store):
+    store.import_xml(xml_path('car_selection.xml'))
+    subtree = store.load('car_selection', 'cost')
+    full = AHP(xml_path('car_selection.xml'))
+    assert subtree.root_criterion.name == 'cost'
+    assert [child.name for child in subtree.root_criterion.children] == ['purchase price', 'fuel costs',
+                                                                          'maintenance cost']
+    assert subtree.find_criterion('safety') is None
+    assert np.allclose(subtree.root_criterion.get_all_scores()[0],
+                       full.find_criterion('cost').get_all_scores()[0])
+
+
+def test_commit_writes_only_the_changed_matrices(store):
+    store.import_xml(xml_path('car_selection.xml'))
+    ahp = store.load('car_selection')
+    assert store.commit(ahp) == 0
+    ahp.find_criterion('cost').set_matrix_values(0, [(0, 1, 3.0)])
+    assert store.commit(ahp) == 1
+    assert store.commit(ahp) == 0
+    assert same_model(store.load('car_selection'), ahp)
+
+
+def test_a_subtree_commit_keeps_the_rest(store):
+    store.import_xml(xml_path('car_selection.xml'))
+    subtree = store.load('car_selection', 'cost')
+    subtree.root_criterion.set_matrix_values(0, [(1, 2, 7.0)])
+    assert store.commit(subtree) == 1
+    reloaded = store.load('car_selection')
+    assert reloaded.find_criterion('cost').get_matrix(0)[1, 2] == 7
+    expected = AHP(xml_path('car_selection.xml'))
+    expected.find_criterion('cost').set_matrix_values(0, [(1, 2, 7.0)])
+    assert same_model(reloaded, expected)
+
+
+def test_the_structure_of_a_subtree_can_not_change(store):
+    store.import_xml(xml_path('car_selection.xml'))
+    subtree = store.load('car_selection', 'cost')
+    subtree.root_criterion.add_subcriterion('insurance')
+    with pytest.raises(AssertionError):
+        store.commit(subtree)
+
+
+def test_a_structure_change_rewrites_the_study(store):
+    store.import_xml(xml_path('car_selection.xml'))
+    ahp = store.load('car_selection')
+    ahp.add_alternative('Car 5')
+    ahp.find_criterion('design').add_subcriterion('style')
+    store.commit(ahp)
+    assert same_model(store.load('car_selection'), ahp)
+
+
+def test_the_matrices_of_an_expert(store):
+    ahp = AHP(xml_path('car_selection.xml'))
+    goal = ahp.root_criterion
+    second = goal.matrices[0] * 2
+    goal.add_matrix(second, True)
+    store.save(ahp, 'cars', ['Ann', 'Bob'])
+    store.import_xml(xml_path('phone.xml'), experts=['Bob'])
+    assert [expert for expert, _, _ in store.matrices('cars', 'Goal')] == ['Ann', 'Bob']
+    bobs = store.matrices_by_expert('Bob')
+    assert {study for study, _, _, _ in bobs} == {'cars', 'phone'}
+    assert [np.array_equal(matrix, second) for study, criterion, matrix, _ in bobs if study == 'cars'] == [True]
+
+
+def test_a_removed_matrix_keeps_the_other_experts(store):
+    ahp = AHP(xml_path('car_selection.xml'))
+    goal = ahp.root_criterion
+    goal.add_matrix(goal.matrices[0] * 2, True)
+    store.save(ahp, 'cars', ['Ann', 'Bob'])
+    ahp = store.load('cars')
+    ahp.root_criterion.remove_matrix(0)
+    assert store.commit(ahp) == 1
+    (expert, matrix, _), = store.matrices('cars', 'Goal')
+    assert expert == 'Bob' and np.array_equal(matrix, ahp.root_criterion.matrices[0])
@@ -0,0 +1,87 @@
+import glob
+import os
+
+import numpy as np
+import pytest
+
+from ahp import AHP, triangle
+from ahp.consistency import iterate_criteria
+from tests.conftest import XMLS, xml_path
+
+
+def test_condense_and_expand():
+    matrix = np.array([[1, 2, 0], [0.5, 1, 4], [0, 0.25, 1]])
+    condensed = triangle.condense(matrix)
+    assert condensed.tolist() == [2, 0, 4]
+    assert np.array_equal(triangle.expand(condensed, 3), matrix)
+    assert condensed[triangle.index(1, 2, 3)] == 4
+
+
+@pytest.mark.parametrize('n', [2, 3, 9])
+def test_pairs_of_positions(n):
+    rows, cols = triangle.pairs(np.arange(triangle.size(n)), n)
+    assert np.array_equal(rows, triangle.indices(n)[0]) and np.array_equal(cols, triangle.indices(n)[1])
+
+
+def test_insert_and_remove_keep_the_other_values():
+    condensed = np.array([2.0, 3, 4, 5, 6, 7])
+    inserted = triangle.insert(condensed, 4, 1)
+    assert np.array_equal(triangle.remove(inserted, 5, 1), condensed)
+    assert triangle.expand(inserted, 5)[1].tolist() == [0, 1, 0, 0, 0]
+
+
+def test_text_round_trip():
+    condensed = np.array([2.0, 1 / 3, 0, 9, 1 / 7, 0.5])
+    assert np.array_equal(triangle.from_text(triangle.to_text(condensed), 4), condensed)
+
+
+def test_text_of_a_whole_matrix():
+    assert triangle.from_text("1 2 -4  0.5 1 3  4 0.333 1", 3).tolist() == [2, 0.25, 3]
+    assert triangle.from_text("2 -4 3", 3).tolist() == [2, 0.25, 3]
+    assert len(triangle.from_text(None, 1)) == 0
+
+
+@pytest.mark.parametrize('text', [
+    "1 2",  # shape
+    "1 nan 3",  # not finite
+    "100 1e9 -0.001",  # out of the scale
+    "2 0.05 3",
+    "1 2 4  0.5 1 3  0.3 0.333 1",  # not reciprocal
+    "1 2 4  0.5 1 0  0.25 0.333 1",  # missing in one triangle only
+    "2 2 4  0.5 1 3  0.25 0.333 1",  # diagonal
+    "1 x 3",
+])
+def test_invalid_text_is_rejected(text):
+    with pytest.raises(ValueError):
+        triangle.from_text(text, 3)
+
+
+def test_rounded_scale_bounds_are_accepted():
+    assert triangle.from_text("0.111 9.0 0.1111", 3).tolist() == [0.111, 9, 0.1111]
+
+
+@pytest.mark.parametrize('filename', sorted(os.path.basename(f) for f in glob.glob(os.path.join(XMLS, '*.xml'))))
+def test_compact_xml_round_trip(tmp_path, filename):
+    model = AHP(xml_path(filename))
+    path = str(tmp_path / filename)
+    model.save_to_file(path, compact=True)
+    assert '<triangle>' in open(path).read() and '<value' not in open(path).read()
+    loaded = AHP(path)
+    assert loaded.compact
+    for a, b in zip(iterate_criteria(model.root_criterion), iterate_criteria(loaded.root_criterion)):
+        assert a.name == b.name and len(a.matrices) == len(b.matrices)
+        assert all(np.array_equal(x, y) for x, y in zip(a.matrices, b.matrices))
+    assert np.allclose(model.root_criterion.get_all_scores()[0], loaded.root_criterion.get_all_scores()[0])
+    loaded.save_to_file(path)  # keeps the encoding it was loaded from
+    assert '<value' not in open(path).read()
+
+
+def test_invalid_compact_matrix_rejects_the_file(tmp_path, car_model):
+    path = str(tmp_path / 'model.xml')
+    car_model.save_to_file(path, compact=True)
+    text = open(path).read()
+    start = text.index('<triangle>') + len('<triangle>')
+    with open(path, 'w') as f:
+        f.write(text[:start] + '100 ' + text[start:])
+    with pytest.raises(ValueError):
+        AHP(path)